@@ -1,24 +1,145 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from datetime import datetime
+from flask import Flask, Response, g, make_response, render_template, request, jsonify, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
+from datetime import datetime, timedelta, timezone
+import functools
+import itertools
+import logging
 import os
-from database import (init_database, search_patients, get_all_patients, add_patient, 
-                     get_patient_by_id, import_patients_from_csv, import_patients_from_json, 
-                     get_import_history, get_appointments_by_patient_id, create_appointment,
-                     get_all_appointments)
+import time
 from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import scheduling
+import streaming
+from logging_setup import REQUEST_LOGGER, configure_logging
+from records import CompactRecord
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the JSON store's compact records"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, CompactRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 
 app = Flask(__name__)
+app.json = RecordJSONProvider(app)
+
+# Logs go through a queue to a background writer; see logging_setup.py
+log_handler = configure_logging()
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger(REQUEST_LOGGER)
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = 'data/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['DATABASE_BACKEND'] = os.environ.get('DATABASE_BACKEND', 'json')  # 'json' or 'sqlite'
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 2))  # background import threads
+app.config['MAX_PAGE_SIZE'] = 500  # largest page the list endpoints return
+app.config['MAX_BATCH_SIZE'] = 500  # most records one batch request may create
+
+# Storage backend: both modules provide the same functions
+if app.config['DATABASE_BACKEND'] == 'sqlite':
+    import sqlite_database as db
+else:
+    import database as db
 
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Worker pool for imports started with async=1
+import_executor = ThreadPoolExecutor(max_workers=app.config['IMPORT_WORKERS'])
+
 # Initialize database on startup
-init_database()
+db.init_database()
+
+# Request latency per route, exposed with the storage metrics at /metrics
+REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', 'Time to handle a request', ['method', 'route', 'status'])
+metrics.collector('log_records_dropped_total', 'Log records dropped because the log queue was full', 'counter',
+                  collect=lambda: log_handler.dropped)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route pattern, not the path, so /appointments/<id> is one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        elapsed = time.perf_counter() - started
+        REQUEST_SECONDS.observe(elapsed, request.method, route, response.status_code)
+        if request_logger.isEnabledFor(logging.DEBUG):
+            request_logger.debug('%s %s %s', request.method, route, response.status_code,
+                                 extra={'method': request.method, 'route': route, 'status': response.status_code,
+                                        'duration_ms': round(elapsed * 1000, 3)})
+    return response
+
+def conditional(*tables):
+    """Serve a read endpoint with an ETag and Last-Modified tied to the tables it reads.
+
+    A request whose If-None-Match (or, without one, If-Modified-Since)
+    still matches the data gets an empty 304 before the view runs, so
+    nothing is loaded or serialized. Cache-Control: no-cache makes browsers
+    revalidate every time instead of reusing a stale copy.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Taken before the view reads anything: if the data changes in
+            # between, the client just refetches next time
+            try:
+                version = db.data_version(*tables)
+            except Exception as e:
+                logger.error("Error reading the data version: %s", e)
+                return view(*args, **kwargs)
+            # Last-Modified has one-second resolution, so it is left out
+            # while the data may still change within the current second
+            last_modified = None
+            if version['last_modified'] is not None and int(version['last_modified']) < int(time.time()):
+                last_modified = datetime.fromtimestamp(int(version['last_modified']), timezone.utc)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(version['etag'])
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak, as the same data is sent gzipped, deflated or as is
+            response.set_etag(version['etag'], weak=True)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def stream_list(key, items):
+    """Stream {"success": true, key: [items...], "count": n} without building it in memory.
+
+    The body is encoded a chunk of records at a time (see streaming.py) and
+    gzipped or deflated on the fly when the client accepts it.
+    """
+    chunks = streaming.json_list_chunks(key, items, {'success': True})
+    # Encode the first chunk now, so a failing query still gets an error response
+    body = itertools.chain([next(chunks)], chunks)
+    encoding = streaming.negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        body = streaming.compress_chunks(body, encoding)
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 # Form field data for the hospital form
 FORM_FIELDS = [
@@ -33,6 +154,9 @@ def index():
     """Main page route - displays the hospital search form"""
     return render_template('index.html', form_fields=FORM_FIELDS)
 
+# Fields of the similar-name suggestions shown when a search finds no one
+SIMILAR_PATIENT_FIELDS = ['id', 'lastname', 'firstname', 'middlename', 'suffix', 'birthday']
+
 @app.route('/search', methods=['POST'])
 def search_patient():
     """Handle patient search form submission"""
@@ -42,35 +166,57 @@ def search_patient():
     middlename = request.form.get('middlename', '').strip()
     suffix = request.form.get('suffix', '').strip()
     birthday = request.form.get('birthday', '').strip()
+    fuzzy = request.form.get('fuzzy', '').lower() in ('1', 'true', 'on')
     
-    # Debug: print received values
-    print(f"Received search: lastname='{lastname}', firstname='{firstname}', middlename='{middlename}', suffix='{suffix}', birthday='{birthday}'")
+    # Opt-in debug output; it names the fields given, never their values
+    if request_logger.isEnabledFor(logging.DEBUG):
+        given = [name for name, value in (('lastname', lastname), ('firstname', firstname),
+                                          ('middlename', middlename), ('suffix', suffix),
+                                          ('birthday', birthday)) if value]
+        request_logger.debug('Patient search', extra={'fields': given, 'fuzzy': fuzzy})
+
+    # Fuzzy searches rank approximate matches and need only lastname and firstname
+    if fuzzy and not (lastname and firstname):
+        return jsonify({
+            'success': False,
+            'message': 'Please provide lastname and firstname for search.'
+        }), 400
 
     # Validate that at least lastname, firstname, and middlename are provided
-    if not (lastname and firstname and middlename):
+    if not fuzzy and not (lastname and firstname and middlename):
         return jsonify({
             'success': False,
             'message': 'Please provide lastname, firstname, and middlename for search.'
         }), 400
 
     try:
-        # Debug: print parameters to be used for search
-        print(f"Searching with: lastname={lastname}, firstname={firstname}, middlename={middlename}, suffix={suffix if suffix else None}, birthday={birthday if birthday else None}")
-        
         # Search database for matching patients
-        patients = search_patients(
+        patients = db.search_patients(
             lastname=lastname,
             firstname=firstname,
             middlename=middlename,
             suffix=suffix if suffix else None,
-            birthday=birthday if birthday else None
+            birthday=birthday if birthday else None,
+            fuzzy=fuzzy
         )
         
+        # No exact match: offer close spellings so the clerk does not register a
+        # duplicate. These are other people, so only who they are is sent.
+        similar_patients = []
+        if not patients and not fuzzy:
+            similar_patients = [
+                {field: patient.get(field) for field in SIMILAR_PATIENT_FIELDS}
+                for patient in db.search_patients(lastname=lastname, firstname=firstname,
+                                                  middlename=middlename, fuzzy=True)[:5]
+            ]
+        
         return jsonify({
             'success': True,
             'message': f'Found {len(patients)} patient(s)',
             'data': {
                 'patients': patients,
+                'similar_patients': similar_patients,
+                'fuzzy': fuzzy,
                 'search_criteria': {
                     'lastname': lastname,
                     'firstname': firstname,
@@ -82,22 +228,78 @@ def search_patient():
             }
         })
     except Exception as e:
-        print(f"Database search error: {str(e)}")
+        logger.error("Database search error: %s", e)
         return jsonify({
             'success': False,
             'message': f'Database error: {str(e)}'
         }), 500
 
-@app.route('/patients')
-def list_patients():
-    """API endpoint to get all patients (for testing)"""
+@app.route('/autocomplete')
+def autocomplete():
+    """Suggest patient lastnames or firstnames starting with the typed prefix"""
+    field = request.args.get('field', 'lastname')
+    prefix = request.args.get('prefix', '')
+    limit = request.args.get('limit', 10, type=int)
     try:
-        patients = get_all_patients()
+        suggestions = db.autocomplete_patient_names(field, prefix, limit)
         return jsonify({
             'success': True,
-            'data': patients,
-            'count': len(patients)
+            'field': field,
+            'prefix': prefix,
+            'suggestions': suggestions
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Database error: {str(e)}'
+        }), 500
+
+# Query parameters that switch the list endpoints to paginated responses
+PAGE_PARAMS = ('limit', 'after', 'q', 'sort', 'order', 'status', 'date_from', 'date_to')
+
+def page_args(default_sort, default_order):
+    """Read the pagination, sorting and search parameters of a list request"""
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(0, min(limit, app.config['MAX_PAGE_SIZE']))
+    return {
+        'limit': limit,
+        'after': request.args.get('after') or None,
+        'q': request.args.get('q') or None,
+        'order_by': request.args.get('sort', default_sort),
+        'descending': request.args.get('order', default_order).lower() == 'desc'
+    }
+
+@app.route('/patients')
+@conditional('patients')
+def list_patients():
+    """API endpoint to get all patients (for testing).
+
+    With any of limit, after, q, sort or order the patients are returned a
+    page at a time: pass the returned next_cursor as `after` to continue.
+    """
+    try:
+        if any(param in request.args for param in PAGE_PARAMS):
+            page = db.get_patients_page(**page_args('name', 'asc'))
+            return jsonify({
+                'success': True,
+                'data': page['data'],
+                'count': len(page['data']),
+                'total': page['total'],
+                'next_cursor': page['next_cursor']
+            })
+        
+        return stream_list('data', db.iter_all_patients())
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -106,12 +308,112 @@ def list_patients():
 
 @app.route('/health')
 def health_check():
-    """Simple health check endpoint"""
+    """Report whether storage is readable and writable, and how long its last load took"""
+    try:
+        storage = db.storage_status()
+    except Exception as e:
+        storage = {'status': 'error', 'problems': [str(e)]}
+    healthy = storage['status'] == 'ok'
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if healthy else 'unhealthy',
         'timestamp': datetime.now().isoformat(),
-        'database': 'connected'
-    })
+        'database': storage
+    }), 200 if healthy else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request and storage metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Patient fields other than the required ones, stored as None when blank
+OPTIONAL_PATIENT_FIELDS = ['suffix', 'phone', 'email', 'emergency_contact_name', 'emergency_contact_phone',
+                           'medical_history', 'allergies', 'blood_type']
+
+def patient_fields(data):
+    """The add_patient fields of a request body, and an error message if they are invalid"""
+    fields = {field: (data.get(field) or '').strip() for field in
+              ['lastname', 'firstname', 'middlename', 'birthday', 'address']}
+    for field in OPTIONAL_PATIENT_FIELDS:
+        fields[field] = (data.get(field) or '').strip() or None
+    
+    # Validate required fields
+    if not (fields['lastname'] and fields['firstname'] and fields['middlename'] and fields['birthday']
+            and fields['address']):
+        return fields, 'All required fields must be provided (lastname, firstname, middlename, birthday, address).'
+    
+    # Validate birthday format (should be YYYY-MM-DD)
+    try:
+        datetime.strptime(fields['birthday'], '%Y-%m-%d')
+    except ValueError:
+        return fields, 'Invalid birthday format. Please use YYYY-MM-DD format.'
+    return fields, None
+
+def appointment_fields(data):
+    """The create_appointment fields of a request body, and an error message if they are invalid"""
+    fields = {
+        'patient_id': data.get('patient_id'),
+        'appointment_date': data.get('appointment_date'),
+        'appointment_time': data.get('appointment_time', '09:00'),
+        'type': data.get('type', 'Consultation'),
+        'reason': data.get('reason', ''),
+        'doctor_name': data.get('doctor_name', '')
+    }
+    return fields, scheduling.booking_error(fields)
+
+def run_batch(items, validate, create):
+    """Validate each item of a batch request, create the valid ones with one create() call.
+
+    Returns the response: one result per item, in order, with its index.
+    """
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'Expected a non-empty list of records'}), 400
+    if len(items) > app.config['MAX_BATCH_SIZE']:
+        return jsonify({
+            'success': False,
+            'message': f"Batches are limited to {app.config['MAX_BATCH_SIZE']} records"
+        }), 400
+    
+    results = [None] * len(items)
+    valid = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[position] = {'success': False, 'error': 'Expected an object'}
+            continue
+        try:
+            fields, error = validate(item)
+        except (AttributeError, TypeError):
+            fields, error = None, 'Invalid field values'
+        if error:
+            results[position] = {'success': False, 'error': error}
+        else:
+            valid.append((position, fields))
+    
+    if valid:
+        outcome = create([fields for position, fields in valid])
+        if not outcome['success']:
+            return jsonify({'success': False, 'message': outcome['error']}), 500
+        for (position, fields), result in zip(valid, outcome['results']):
+            results[position] = result
+    
+    created = sum(result['success'] for result in results)
+    return jsonify({
+        'success': True,
+        'created': created,
+        'failed': len(results) - created,
+        'results': [{'index': position, **result} for position, result in enumerate(results)]
+    }), 201 if created == len(results) else 200
+
+@app.route('/add_patients', methods=['POST'])
+def add_patients_route():
+    """Add a list of patients in one write, reporting the outcome of each"""
+    try:
+        return run_batch(request.get_json(), patient_fields, db.add_patients)
+    except Exception as e:
+        logger.error("Error in add_patients_route: %s", e)
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
 
 @app.route('/add_patient', methods=['POST'])
 def add_patient_route():
@@ -126,70 +428,24 @@ def add_patient_route():
                 'message': 'No data provided'
             }), 400
         
-        # Extract and validate required fields
-        lastname = data.get('lastname', '').strip()
-        firstname = data.get('firstname', '').strip()
-        middlename = data.get('middlename', '').strip()
-        suffix = data.get('suffix', '').strip() or None
-        birthday = data.get('birthday', '').strip()
-        address = data.get('address', '').strip()
-        
-        # Optional fields
-        phone = data.get('phone', '').strip() or None
-        email = data.get('email', '').strip() or None
-        emergency_contact_name = data.get('emergency_contact_name', '').strip() or None
-        emergency_contact_phone = data.get('emergency_contact_phone', '').strip() or None
-        medical_history = data.get('medical_history', '').strip() or None
-        allergies = data.get('allergies', '').strip() or None
-        blood_type = data.get('blood_type', '').strip() or None
-
-        # Validate required fields
-        if not (lastname and firstname and middlename and birthday and address):
-            return jsonify({
-                'success': False,
-                'message': 'All required fields must be provided (lastname, firstname, middlename, birthday, address).'
-            }), 400
-
-        # Validate birthday format (should be YYYY-MM-DD)
-        try:
-            datetime.strptime(birthday, '%Y-%m-%d')
-        except ValueError:
+        fields, error = patient_fields(data)
+        if error:
             return jsonify({
                 'success': False,
-                'message': 'Invalid birthday format. Please use YYYY-MM-DD format.'
+                'message': error
             }), 400
+        lastname = fields['lastname']
+        firstname = fields['firstname']
 
-        # Check if patient already exists
-        existing_patients = search_patients(
-            lastname=lastname,
-            firstname=firstname,
-            middlename=middlename,
-            suffix=suffix,
-            birthday=birthday
-        )
+        # Check for the same patient and add in one locked step
+        result = db.add_patient_if_absent(**fields)
         
-        if existing_patients:
+        if result.get('duplicate'):
             return jsonify({
                 'success': False,
-                'message': f'Patient "{firstname} {lastname}" with the same details already exists in the database.'
+                'message': f'Patient "{firstname} {lastname}" with the same details already exists in the database.',
+                'existing_id': result['existing_id']
             }), 409
-
-        # Add patient to database
-        result = add_patient(
-            lastname=lastname,
-            firstname=firstname,
-            middlename=middlename,
-            suffix=suffix,
-            birthday=birthday,
-            address=address,
-            phone=phone,
-            email=email,
-            emergency_contact_name=emergency_contact_name,
-            emergency_contact_phone=emergency_contact_phone,
-            medical_history=medical_history,
-            allergies=allergies,
-            blood_type=blood_type
-        )
         
         if result['success']:
             return jsonify({
@@ -205,7 +461,7 @@ def add_patient_route():
             }), 500
             
     except Exception as e:
-        print(f"Error in add_patient_route: {str(e)}")
+        logger.error("Error in add_patient_route: %s", e)
         return jsonify({
             'success': False,
             'message': f'Server error: {str(e)}'
@@ -238,26 +494,35 @@ def import_patients():
                 'message': 'Only CSV and JSON files are supported'
             }), 400
         
-        # Save uploaded file
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Background mode: save the upload, queue it and return the job id right away
+        if request.values.get('async', '').lower() in ('1', 'true', 'yes'):
+            job_id = db.create_import_record(filename, file_ext, status='queued')
+            file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'import_{job_id}_{filename}')
+            try:
+                file.save(file_path)
+            except Exception as e:
+                db.update_import_record(job_id, status='failed', error=str(e))
+                raise
+            import_executor.submit(run_import_job, job_id, file_path, file_ext, filename)
+            return jsonify({
+                'success': True,
+                'message': 'Import started',
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('import_job', job_id=job_id)
+            }), 202
         
-        # Import based on file type
+        # Import straight from the upload stream, without a temporary copy
         if file_ext == 'csv':
-            result = import_patients_from_csv(file_path)
+            result = db.import_patients_from_csv(file.stream, filename=filename)
         else:  # json
-            result = import_patients_from_json(file_path)
-        
-        # Clean up uploaded file
-        try:
-            os.remove(file_path)
-        except:
-            pass
+            result = db.import_patients_from_json(file.stream, filename=filename)
         
         if result['success']:
             return jsonify({
                 'success': True,
                 'message': f'Successfully imported {result["imported_count"]} patients',
+                'import_id': result['import_id'],
                 'imported_count': result['imported_count'],
                 'errors': result['errors'],
                 'total_errors': result['total_errors']
@@ -271,17 +536,47 @@ def import_patients():
             }), 500
             
     except Exception as e:
-        print(f"Error in import_patients: {str(e)}")
+        logger.error("Error in import_patients: %s", e)
         return jsonify({
             'success': False,
             'message': f'Server error: {str(e)}'
         }), 500
 
+def run_import_job(job_id, file_path, file_ext, filename):
+    """Import a saved upload on the worker pool, then remove it"""
+    try:
+        if file_ext == 'csv':
+            db.import_patients_from_csv(file_path, filename=filename, import_id=job_id)
+        else:  # json
+            db.import_patients_from_json(file_path, filename=filename, import_id=job_id)
+    except Exception:
+        logger.exception("Error in import job %s", job_id)
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+@app.route('/import_jobs/<int:job_id>')
+def import_job(job_id):
+    """Get the status and progress of an import job"""
+    job = db.get_import_job(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Import job not found'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 @app.route('/import_history')
+@conditional('imports')
 def import_history():
     """Get the history of data imports"""
     try:
-        imports = get_import_history()
+        imports = db.get_import_history()
         return jsonify({
             'success': True,
             'imports': imports
@@ -293,11 +588,12 @@ def import_history():
         }), 500
 
 @app.route('/appointments/<int:patient_id>', methods=['GET'])
+@conditional('patients', 'appointments')
 def get_appointments(patient_id):
     """Get all appointments for a patient"""
     try:
         # First check if patient exists
-        patient = get_patient_by_id(patient_id)
+        patient = db.get_patient_by_id(patient_id)
         if not patient:
             return jsonify({
                 "success": False, 
@@ -305,7 +601,7 @@ def get_appointments(patient_id):
             }), 404
         
         # Get appointments for the patient
-        appointments = get_appointments_by_patient_id(patient_id)
+        appointments = db.get_appointments_by_patient_id(patient_id)
         
         return jsonify({
             "success": True, 
@@ -314,7 +610,7 @@ def get_appointments(patient_id):
         })
         
     except Exception as e:
-        print(f"Error getting appointments: {str(e)}")
+        logger.error("Error getting appointments: %s", e)
         return jsonify({
             "success": False, 
             "message": f"Database error: {str(e)}"
@@ -332,43 +628,28 @@ def create_appointment_route():
                 "message": "No data provided"
             }), 400
         
-        patient_id = data.get('patient_id')
-        appointment_date = data.get('appointment_date')
-        appointment_time = data.get('appointment_time', '09:00')
-        appointment_type = data.get('type', 'Consultation')
-        reason = data.get('reason', '')
-        doctor_name = data.get('doctor_name', '')
-        
-        if not patient_id or not appointment_date:
+        fields, error = appointment_fields(data)
+        if error:
             return jsonify({
                 "success": False, 
-                "message": "Missing patient_id or appointment_date"
+                "message": error
             }), 400
         
         # Validate that patient exists
-        patient = get_patient_by_id(patient_id)
+        patient = db.get_patient_by_id(fields['patient_id'])
         if not patient:
             return jsonify({
                 "success": False, 
                 "message": "Patient not found"
             }), 404
         
-        # Validate date format
-        try:
-            datetime.strptime(appointment_date, '%Y-%m-%d')
-        except ValueError:
-            return jsonify({
-                "success": False, 
-                "message": "Invalid date format. Please use YYYY-MM-DD format."
-            }), 400
-        
-        result = create_appointment(
-            patient_id=patient_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time,
-            appointment_type=appointment_type,
-            reason=reason,
-            doctor_name=doctor_name
+        result = db.create_appointment(
+            patient_id=fields['patient_id'],
+            appointment_date=fields['appointment_date'],
+            appointment_time=fields['appointment_time'],
+            appointment_type=fields['type'],
+            reason=fields['reason'],
+            doctor_name=fields['doctor_name']
         )
         
         if result['success']:
@@ -377,6 +658,12 @@ def create_appointment_route():
                 "message": "Appointment created successfully",
                 "appointment_id": result['appointment_id']
             }), 201
+        elif result.get('conflict'):
+            return jsonify({
+                "success": False, 
+                "message": result['error'],
+                "conflict": result['conflict']
+            }), 409
         else:
             return jsonify({
                 "success": False, 
@@ -384,12 +671,113 @@ def create_appointment_route():
             }), 500
         
     except Exception as e:
-        print(f"Error creating appointment: {str(e)}")
+        logger.error("Error creating appointment: %s", e)
+        return jsonify({
+            "success": False, 
+            "message": f"Database error: {str(e)}"
+        }), 500
+
+@app.route('/appointments/upcoming', methods=['GET'])
+def upcoming_appointments():
+    """Scheduled appointments from today on, soonest first.
+
+    Optional limit (MAX_PAGE_SIZE at most) and an inclusive
+    date_from/date_to window.
+    """
+    try:
+        limit = max(0, min(request.args.get('limit', app.config['MAX_PAGE_SIZE'], type=int),
+                           app.config['MAX_PAGE_SIZE']))
+        appointments = db.get_upcoming_appointments(
+            limit=limit,
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None
+        )
+        return jsonify({
+            "success": True,
+            "appointments": appointments,
+            "count": len(appointments)
+        })
+    except Exception as e:
+        logger.error("Error getting upcoming appointments: %s", e)
+        return jsonify({
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }), 500
+
+@app.route('/patients/<int:patient_id>/summary', methods=['GET'])
+@conditional('patients', 'appointments')
+def patient_summary(patient_id):
+    """A patient with their appointment count and latest appointment date"""
+    try:
+        patient = db.get_patient_summary(patient_id)
+        if not patient:
+            return jsonify({
+                "success": False,
+                "message": "Patient not found"
+            }), 404
+        return jsonify({
+            "success": True,
+            "patient": patient
+        })
+    except Exception as e:
+        logger.error("Error getting patient summary: %s", e)
+        return jsonify({
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }), 500
+
+@app.route('/appointments/batch', methods=['POST'])
+def create_appointments_route():
+    """Create a list of appointments in one write, reporting the outcome of each"""
+    try:
+        return run_batch(request.get_json(), appointment_fields, db.create_appointments)
+    except Exception as e:
+        logger.error("Error creating appointments: %s", e)
         return jsonify({
             "success": False, 
             "message": f"Database error: {str(e)}"
         }), 500
 
+@app.route('/appointments/free_slots', methods=['GET'])
+def free_slots():
+    """Free appointment start times per doctor and day.
+
+    Query parameters: doctor (else every doctor who takes the type), type
+    (sets the slot length), date_from (today by default) and date_to (a
+    week on from date_from by default).
+    """
+    try:
+        date_from = request.args.get('date_from') or datetime.now().date().isoformat()
+        date_to = request.args.get('date_to')
+        if not date_to:
+            try:
+                date_to = (datetime.strptime(date_from, '%Y-%m-%d') + timedelta(days=6)).date().isoformat()
+            except ValueError:
+                date_to = None
+        appointment_type = request.args.get('type') or None
+        availability = db.get_free_slots(
+            date_from,
+            date_to,
+            doctor_name=request.args.get('doctor') or None,
+            appointment_type=appointment_type
+        )
+        return jsonify({
+            "success": True,
+            "duration_minutes": scheduling.duration(appointment_type),
+            "availability": availability
+        })
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        logger.error("Error getting free slots: %s", e)
+        return jsonify({
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }), 500
+
 @app.route('/admin/login', methods=['POST'])
 def admin_login():
     """Handle admin login"""
@@ -418,26 +806,62 @@ def admin_login():
             }), 401
             
     except Exception as e:
-        print(f"Error in admin login: {str(e)}")
+        logger.error("Error in admin login: %s", e)
         return jsonify({
             'success': False,
             'message': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/admin/stats', methods=['GET'])
+def admin_stats():
+    """Counts for the admin dashboard: patients, and appointments past, today and upcoming
+    with breakdowns by type, doctor and status"""
+    try:
+        return jsonify({
+            "success": True,
+            "date": datetime.now().date().isoformat(),
+            "stats": db.get_dashboard_stats()
+        })
+    except Exception as e:
+        logger.error("Error getting dashboard stats: %s", e)
+        return jsonify({
+            "success": False,
+            "message": f"Database error: {str(e)}"
+        }), 500
+
 @app.route('/admin/appointments', methods=['GET'])
+@conditional('patients', 'appointments')
 def get_all_appointments_route():
-    """Get all appointments with patient information for admin dashboard"""
+    """Get all appointments with patient information for admin dashboard.
+
+    Paginated like /patients, and also filterable by status and an
+    inclusive date_from/date_to range of appointment dates.
+    """
     try:
-        appointments = get_all_appointments()
+        if any(param in request.args for param in PAGE_PARAMS):
+            page = db.get_appointments_page(
+                status=request.args.get('status') or None,
+                date_from=request.args.get('date_from') or None,
+                date_to=request.args.get('date_to') or None,
+                **page_args('date', 'desc')
+            )
+            return jsonify({
+                "success": True,
+                "appointments": page['data'],
+                "count": len(page['data']),
+                "total": page['total'],
+                "next_cursor": page['next_cursor']
+            })
         
-        return jsonify({
-            "success": True, 
-            "appointments": appointments,
-            "count": len(appointments)
-        })
+        return stream_list('appointments', db.iter_all_appointments())
         
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
     except Exception as e:
-        print(f"Error getting all appointments: {str(e)}")
+        logger.error("Error getting all appointments: %s", e)
         return jsonify({
             "success": False, 
             "message": f"Database error: {str(e)}"
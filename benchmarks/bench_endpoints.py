@@ -0,0 +1,267 @@
+"""Benchmark the patient and appointment endpoints on a generated store.
+
+Generates a seeded store of --patients patients (see generate_data.py) in a
+temporary directory, then times each operation behind /search,
+/add_patient, /import_patients, /patients, /appointments/<id> and
+/admin/appointments, both as direct calls into the storage backend and as
+requests through Flask's test client. Reports p50/p99 latency and
+throughput per operation and writes everything, with the run's settings,
+to --output as JSON so runs can be compared.
+
+The first call of each operation is reported separately as first_ms: it
+includes building the lazily built indexes it needs.
+
+    python benchmarks/bench_endpoints.py --patients 100000 --output results.json
+    python benchmarks/bench_endpoints.py --backend sqlite --targets database
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import database
+import generate_data
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def run(operation, count):
+    """Call operation() once cold and count more times; latency stats in ms"""
+    failures = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        failures += operation() is False
+        first = time.perf_counter() - start
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            failures += operation() is False
+            timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    timings.sort()
+    return {
+        'count': count,
+        'failures': failures,
+        'first_ms': round(first * 1000, 3),
+        'mean_ms': round(total / count * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+        'ops_per_sec': round(count / total, 1) if total else None,
+    }
+
+
+def misspell(rng, name):
+    """Drop or double one letter of a name"""
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:] if rng.random() < 0.5 else name[:i] + name[i] + name[i:]
+
+
+class Workload:
+    """Seeded request arguments drawn from the generated store"""
+
+    def __init__(self, rng, patients, import_rows):
+        self.rng = rng
+        self.patients = [patient for patient in patients if patient['status'] == 'active']
+        self.import_rows = import_rows
+        self.now = datetime.now()
+
+    def patient(self):
+        return self.rng.choice(self.patients)
+
+    def new_patient(self):
+        return generate_data.make_patient(self.rng, self.now)
+
+    def import_file(self, extension):
+        """A fresh upload of new patients, as (bytes, filename)"""
+        rows = [self.new_patient() for _ in range(self.import_rows)]
+        path = f'upload.{extension}'
+        generate_data.write_import_file(path, rows)
+        with open(path, 'rb') as f:
+            return f.read(), path
+
+
+def database_operations(db, work):
+    """(name, operation, is_bulk) for direct backend calls"""
+    def search():
+        patient = work.patient()
+        return bool(db.search_patients(lastname=patient['lastname'], firstname=patient['firstname'],
+                                       middlename=patient['middlename']))
+
+    def fuzzy_search():
+        patient = work.patient()
+        db.search_patients(lastname=misspell(work.rng, patient['lastname']),
+                           firstname=misspell(work.rng, patient['firstname']), fuzzy=True)
+
+    def add_patient():
+        return db.add_patient(**work.new_patient())['success']
+
+    def import_csv():
+        content, filename = work.import_file('csv')
+        return db.import_patients_from_csv(io.BytesIO(content), filename)['success']
+
+    def patients_page():
+        db.get_patients_page(limit=50, q=work.patient()['lastname'][:3])
+
+    def appointments_for_patient():
+        patient_id = work.patient()['id']
+        db.get_patient_by_id(patient_id)
+        db.get_appointments_by_patient_id(patient_id)
+
+    return [
+        ('search_patients', search, False),
+        ('search_patients fuzzy', fuzzy_search, False),
+        ('get_patients_page q', patients_page, False),
+        ('get_all_patients', db.get_all_patients, True),
+        ('get_appointments_by_patient_id', appointments_for_patient, False),
+        ('get_appointments_page', lambda: db.get_appointments_page(limit=50), False),
+        ('get_all_appointments', db.get_all_appointments, True),
+        ('add_patient', add_patient, False),
+        ('import_patients_from_csv', import_csv, True),
+    ]
+
+
+def flask_operations(client, work):
+    """(name, operation, is_bulk) for requests through the Flask test client"""
+    def ok(response):
+        return response.status_code == 200
+
+    def search():
+        patient = work.patient()
+        return ok(client.post('/search', data={'lastname': patient['lastname'], 'firstname': patient['firstname'],
+                                               'middlename': patient['middlename']}))
+
+    def fuzzy_search():
+        patient = work.patient()
+        return ok(client.post('/search', data={'lastname': misspell(work.rng, patient['lastname']),
+                                               'firstname': misspell(work.rng, patient['firstname']),
+                                               'fuzzy': '1'}))
+
+    def add_patient():
+        patient = {key: value for key, value in work.new_patient().items() if value is not None}
+        return ok(client.post('/add_patient', json=patient))
+
+    def import_csv():
+        content, filename = work.import_file('csv')
+        return ok(client.post('/import_patients', data={'file': (io.BytesIO(content), filename)},
+                              content_type='multipart/form-data'))
+
+    return [
+        ('POST /search', search, False),
+        ('POST /search fuzzy', fuzzy_search, False),
+        ('GET /patients?limit=50', lambda: ok(client.get(f"/patients?limit=50&q={work.patient()['lastname'][:3]}")),
+         False),
+        ('GET /patients', lambda: ok(client.get('/patients')), True),
+        ('GET /appointments/<id>', lambda: ok(client.get(f"/appointments/{work.patient()['id']}")), False),
+        ('GET /admin/appointments?limit=50', lambda: ok(client.get('/admin/appointments?limit=50')), False),
+        ('GET /admin/appointments', lambda: ok(client.get('/admin/appointments')), True),
+        ('POST /add_patient', add_patient, False),
+        ('POST /import_patients', import_csv, True),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=100000)
+    parser.add_argument('--appointments-per-patient', type=float, default=2.0)
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--targets', nargs='+', choices=['database', 'flask'], default=['database', 'flask'])
+    parser.add_argument('--requests', type=int, default=200, help='timed calls per operation')
+    parser.add_argument('--bulk-requests', type=int, default=5,
+                        help='timed calls per whole-store operation and import')
+    parser.add_argument('--import-rows', type=int, default=1000, help='patients per import upload')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    rng = random.Random(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        start = time.perf_counter()
+        patients = generate_data.generate_patients(rng, args.patients)
+        appointments = generate_data.generate_appointments(rng, patients, args.appointments_per_patient)
+        generate_data.write_store(patients, appointments, args.backend)
+        print(f"Generated {len(patients):,} patients and {len(appointments):,} appointments "
+              f"in {time.perf_counter() - start:.1f}s")
+        work = Workload(rng, patients, args.import_rows)
+        del appointments
+
+        targets = []
+        if 'database' in args.targets:
+            if args.backend == 'sqlite':
+                import sqlite_database as db
+            else:
+                db = database
+            targets.append(('database', database_operations(db, work)))
+        if 'flask' in args.targets:
+            os.environ['DATABASE_BACKEND'] = args.backend
+            # Keep the app's log lines out of the report
+            os.environ.setdefault('LOG_LEVEL', 'WARNING')
+            try:
+                import app
+            except ImportError as e:
+                print(f"Skipping the Flask endpoints: {e}")
+            else:
+                app.app.config['TESTING'] = True
+                targets.append(('flask', flask_operations(app.app.test_client(), work)))
+
+        print(f"{'target':<9} {'operation':<34} {'first':>9} {'p50':>9} {'p99':>9} {'ops/s':>9}")
+        for target, operations in targets:
+            for name, operation, bulk in operations:
+                stats = run(operation, args.bulk_requests if bulk else args.requests)
+                results.append({'target': target, 'operation': name, **stats})
+                print(f"{target:<9} {name:<34} {stats['first_ms']:8.2f}ms {stats['p50_ms']:8.2f}ms "
+                      f"{stats['p99_ms']:8.2f}ms {stats['ops_per_sec'] or 0:9.1f}"
+                      + (f"  ({stats['failures']} failed)" if stats['failures'] else ''))
+
+    report = {
+        'run': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'storage_mode': database.STORAGE_MODE,
+            'data_format': database.DATA_FORMAT,
+            'data_compression': database.DATA_COMPRESSION,
+            'patients': args.patients,
+            'appointments_per_patient': args.appointments_per_patient,
+            'requests': args.requests,
+            'bulk_requests': args.bulk_requests,
+            'import_rows': args.import_rows,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark fuzzy patient search latency and recall on a large store.
+
+Builds a store of --patients patients in a temporary directory, with names
+drawn from a few thousand syllable-built lastnames and firstnames, then
+searches for randomly chosen patients under misspelled names and reports
+latency percentiles and how often the patient was among the results.
+
+    python benchmarks/bench_fuzzy_search.py --patients 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+SYLLABLES = ['ba', 'ca', 'cru', 'de', 'del', 'fer', 'gar', 'gon', 'ja', 'la', 'lo', 'ma', 'men',
+             'na', 'pe', 'qui', 're', 'ri', 'ro', 'san', 'ta', 'to', 'val', 'vi', 'ya', 'za']
+ENDINGS = ['s', 'z', 'no', 'do', 'les', 'lez', 'nez', 'ra', 'ta', 'yes', 'rez', '']
+
+
+def make_name(rng, parts):
+    """A capitalized name of a few syllables"""
+    return ''.join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize() + rng.choice(ENDINGS)
+
+
+def misspell(rng, name):
+    """The kind of variant a clerk types: swapped letters, a dropped letter or a split name"""
+    variants = [
+        name.replace('z', 's') if 'z' in name else name.replace('s', 'z'),
+        name.replace('c', 'k') if 'c' in name else name + 'h',
+        name[:len(name) // 2] + name[len(name) // 2 + 1:],
+        name[:len(name) // 2] + ' ' + name[len(name) // 2:],
+        name.replace('v', 'b') if 'v' in name else name.lower(),
+    ]
+    return rng.choice(variants)
+
+
+def build_store(rng, count, lastnames, firstnames):
+    """Write a patients.json with `count` patients"""
+    patients = []
+    for i in range(count):
+        patients.append({
+            'id': i + 1,
+            'lastname': rng.choice(lastnames),
+            'firstname': rng.choice(firstnames),
+            'middlename': rng.choice(lastnames),
+            'birthday': f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'address': 'Imus, Cavite',
+            'status': 'active'
+        })
+    database.save_json_file(database.PATIENTS_FILE, patients)
+    return patients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--lastnames', type=int, default=20000, help='distinct lastnames')
+    parser.add_argument('--firstnames', type=int, default=5000, help='distinct firstnames')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lastnames = list({make_name(rng, rng.randint(2, 3)) for _ in range(args.lastnames)})
+    firstnames = list({make_name(rng, rng.randint(1, 2)) for _ in range(args.firstnames)})
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        patients = build_store(rng, args.patients, lastnames, firstnames)
+
+        start = time.perf_counter()
+        database.search_patients(lastname='warmup', firstname='warmup', fuzzy=True)
+        print(f"built fuzzy index over {args.patients:,} patients in {time.perf_counter() - start:.1f}s")
+
+        timings = []
+        found = 0
+        for _ in range(args.queries):
+            patient = rng.choice(patients)
+            start = time.perf_counter()
+            results = database.search_patients(
+                lastname=misspell(rng, patient['lastname']),
+                firstname=misspell(rng, patient['firstname']),
+                middlename=patient['middlename'],
+                fuzzy=True
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            found += any(result['id'] == patient['id'] for result in results)
+
+        timings.sort()
+        print(f"{args.queries} misspelled queries: "
+              f"p50 {statistics.median(timings):.1f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)]:.1f} ms, "
+              f"max {timings[-1]:.1f} ms, "
+              f"patient in results {found / args.queries:.0%}")
+
+
+if __name__ == '__main__':
+    main()
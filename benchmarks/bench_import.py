@@ -0,0 +1,95 @@
+"""Benchmark CSV/JSON patient imports against a large existing store.
+
+Builds a store of --existing patients in a temporary directory, writes an
+import file of --rows new patients, and reports rows/sec for
+import_patients_from_csv and import_patients_from_json.
+
+    python benchmarks/bench_import.py --existing 200000 --rows 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+LASTNAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Gonzales', 'Ramos']
+FIRSTNAMES = ['Maria', 'Juan', 'Jose', 'Ana', 'Pedro', 'Rosa', 'Carlos', 'Luz', 'Miguel', 'Carmen']
+MIDDLENAMES = ['Dela Cruz', 'Aquino', 'Villanueva', 'Castillo', 'Fernandez', 'Jimenez', 'Martinez', 'Lopez']
+
+
+def make_patient(rng, n):
+    """Build a patient row that is unique by its numbered lastname"""
+    return {
+        'lastname': f"{rng.choice(LASTNAMES)}{n}",
+        'firstname': rng.choice(FIRSTNAMES),
+        'middlename': rng.choice(MIDDLENAMES),
+        'suffix': None,
+        'birthday': f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'address': f"{rng.randint(1, 999)} Rizal St., Imus, Cavite",
+        'phone': f"0917{rng.randint(0, 9999999):07d}",
+    }
+
+
+def build_store(rng, count):
+    """Write a patients.json with `count` existing patients"""
+    patients = []
+    for i in range(count):
+        patient = make_patient(rng, i)
+        patient.update({'id': i + 1, 'status': 'active', 'is_new': 0,
+                        'created_at': '2025-01-01T00:00:00', 'updated_at': '2025-01-01T00:00:00'})
+        patients.append(patient)
+    database.save_json_file(database.PATIENTS_FILE, patients)
+    database.clear_cache()
+
+
+def write_import_file(rng, path, fmt, start, count):
+    """Write `count` new patients to an import file in the given format"""
+    rows = [make_patient(rng, start + i) for i in range(count)]
+    if fmt == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--existing', type=int, default=200000, help='patients already in the store')
+    parser.add_argument('--rows', type=int, default=100000, help='rows in the import file')
+    parser.add_argument('--format', choices=['csv', 'json', 'both'], default='both')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    formats = ['csv', 'json'] if args.format == 'both' else [args.format]
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for fmt in formats:
+            rng = random.Random(args.seed)
+            build_store(rng, args.existing)
+            import_path = os.path.join(workdir, f'import.{fmt}')
+            write_import_file(rng, import_path, fmt, args.existing, args.rows)
+
+            importer = database.import_patients_from_csv if fmt == 'csv' else database.import_patients_from_json
+            started = time.perf_counter()
+            result = importer(import_path)
+            elapsed = time.perf_counter() - started
+
+            if not result['success']:
+                print(f"{fmt}: import failed: {result['error']}")
+                continue
+            print(f"{fmt}: imported {result['imported_count']} rows into a store of {args.existing} "
+                  f"in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec, {result['total_errors']} errors)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark memory per patient for dict records versus compact records.
+
+Writes --patients generated 18-field patients to a temporary patients.json, then
+loads it once as the plain dicts json.load returns and once through
+database.load_json_file, which holds compact records, and reports the
+traced allocation per patient and the load time of each.
+
+    python benchmarks/bench_record_memory.py --patients 200000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import generate_data
+
+
+def measure(load):
+    """Traced bytes held by what load() returns, and how long it took"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return data, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        database.ensure_data_directory()
+        with open(database.PATIENTS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(generate_data.generate_patients(rng, args.patients), f, ensure_ascii=False)
+
+        def load_dicts():
+            with open(database.PATIENTS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        dicts, dict_bytes, dict_time = measure(load_dicts)
+        del dicts
+        database.clear_cache()
+        records, record_bytes, record_time = measure(lambda: database.load_json_file(database.PATIENTS_FILE))
+
+        print(f"{args.patients:,} patients")
+        print(f"  dicts:   {dict_bytes / args.patients:7.0f} bytes/patient, loaded in {dict_time:.2f}s")
+        print(f"  records: {record_bytes / args.patients:7.0f} bytes/patient, loaded in {record_time:.2f}s "
+              f"({type(records[0]).__name__}, {1 - record_bytes / dict_bytes:.0%} smaller)")
+
+
+if __name__ == '__main__':
+    main()
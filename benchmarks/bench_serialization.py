@@ -0,0 +1,60 @@
+"""Benchmark save time, load time and file size of each data file format.
+
+For every --patients size, writes a patients file of that many full
+patients with database.save_json_file in each format and compression, then
+loads it back cold through database.load_json_file.
+
+    python benchmarks/bench_serialization.py --patients 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import generate_data
+import serializers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--formats', nargs='+', choices=serializers.FORMATS, default=list(serializers.FORMATS))
+    parser.add_argument('--compressions', nargs='+', choices=serializers.COMPRESSIONS,
+                        default=list(serializers.COMPRESSIONS))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for count in args.patients:
+            patients = generate_data.generate_patients(random.Random(args.seed), count)
+            database.save_json_file(database.PATIENTS_FILE, patients)
+            patients = database.load_json_file(database.PATIENTS_FILE)
+            print(f"{count:,} patients")
+            print(f"  {'format':<18} {'save':>8} {'load':>8} {'size':>12}")
+            for format in args.formats:
+                for compression in args.compressions:
+                    start = time.perf_counter()
+                    database.save_json_file(database.PATIENTS_FILE, patients,
+                                            format=format, compression=compression)
+                    save_time = time.perf_counter() - start
+                    size = os.path.getsize(database.PATIENTS_FILE)
+
+                    database.clear_cache()
+                    start = time.perf_counter()
+                    loaded = database.load_json_file(database.PATIENTS_FILE, strict=True)
+                    load_time = time.perf_counter() - start
+                    assert len(loaded) == count and loaded[-1] == patients[-1]
+
+                    label = format if compression == 'none' else f"{format}+{compression}"
+                    print(f"  {label:<18} {save_time:7.2f}s {load_time:7.2f}s {size / 1e6:9.1f} MB")
+                    patients = loaded
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Generate a seeded synthetic patient store for benchmarks and load tests.
+
+Patients get Filipino names, middle names taken from common surnames,
+Cavite and Metro Manila addresses, mobile numbers and a realistic spread of
+ages, blood types and histories. Each patient has a few appointments spread
+over the past two years and the next three months with the hospital's
+doctors; past ones are completed, cancelled or missed, future ones
+scheduled. The same seed always gives the same data.
+
+    python benchmarks/generate_data.py --patients 100000 --appointments-per-patient 2
+    python benchmarks/generate_data.py --patients 0 --import-file new.csv --import-rows 10000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+LASTNAMES = [
+    'Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres', 'Tomas', 'Andrada',
+    'Castillo', 'Flores', 'Villanueva', 'Ramos', 'Castro', 'Rivera', 'Aquino', 'Navarro', 'Salazar',
+    'Mercado', 'Dela Cruz', 'De Leon', 'Gonzales', 'Lopez', 'Fernandez', 'Aguilar', 'Pascual', 'Soriano',
+    'Gutierrez', 'Domingo', 'Valdez', 'Manalo', 'Dizon', 'Santiago', 'Del Rosario', 'Francisco',
+    'Mariano', 'Marquez', 'Lim', 'Tan', 'Sy', 'Co', 'Panganiban', 'Macaraeg', 'Dimaculangan', 'Lacson',
+    'Magbanua', 'Evangelista', 'Manansala', 'Bernardo', 'Sarmiento', 'Jimenez', 'Buenaventura',
+    'Pangilinan', 'Quiambao', 'Tolentino', 'Cabrera', 'Delos Santos', 'Villareal', 'Galang', 'Ignacio',
+    'Javier', 'Lazaro', 'Malabanan', 'Natividad', 'Padilla', 'Quizon', 'Roque', 'Samonte', 'Umali',
+    'Vergara', 'Yap', 'Zamora', 'Agbayani', 'Baltazar', 'Cayabyab', 'Dumalagan', 'Espiritu', 'Hernandez',
+]
+FEMALE_FIRSTNAMES = [
+    'Maria', 'Ana', 'Angelica', 'Kristine', 'Jennifer', 'Patricia', 'Rosa', 'Liza', 'Maricel', 'Jocelyn',
+    'Marites', 'Rowena', 'Lorna', 'Cristina', 'Teresita', 'Corazon', 'Luzviminda', 'Erlinda', 'Jasmine',
+    'Princess', 'Nicole', 'Camille', 'Andrea', 'Bea', 'Czarina', 'Divina', 'Grace', 'Joy', 'Mylene',
+    'Shiela', 'Rhea', 'Almira', 'Ligaya', 'Marisol', 'Katrina', 'Trisha', 'Aira', 'Hazel', 'Mae',
+]
+MALE_FIRSTNAMES = [
+    'Jose', 'Juan', 'Mark', 'John Paul', 'Michael', 'Carlo', 'Miguel', 'Ramon', 'Rodrigo', 'Ernesto',
+    'Roberto', 'Eduardo', 'Antonio', 'Danilo', 'Romeo', 'Rogelio', 'Renato', 'Jerome', 'Christian',
+    'Joshua', 'Paolo', 'Angelo', 'Jericho', 'Bong', 'Jun', 'Dindo', 'Nestor', 'Arnel', 'Rey', 'Aldrin',
+    'Jomar', 'Kenneth', 'Raffy', 'Emmanuel', 'Francis', 'Gilbert', 'Jayson', 'Vincent', 'Noel',
+]
+SUFFIXES = ['Jr.', 'Sr.', 'II', 'III']
+STREETS = ['Rizal St.', 'Bonifacio Ave.', 'Mabini St.', 'Aguinaldo Hwy.', 'Luna St.', 'Burgos St.',
+           'Del Pilar St.', 'Palico Rd.', 'Quezon Blvd.', 'Magsaysay Ave.', 'Nueno Ave.', 'Tirona Hwy.']
+TOWNS = [('Imus', 'Cavite'), ('Bacoor', 'Cavite'), ('Dasmariñas', 'Cavite'), ('Kawit', 'Cavite'),
+         ('General Trias', 'Cavite'), ('Silang', 'Cavite'), ('Tanza', 'Cavite'), ('Noveleta', 'Cavite'),
+         ('Las Piñas', 'Metro Manila'), ('Muntinlupa', 'Metro Manila'), ('Parañaque', 'Metro Manila')]
+# Approximate distribution in the Philippines; Rh-negative types are rare
+BLOOD_TYPES = ['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-', None]
+BLOOD_TYPE_WEIGHTS = [44, 22, 24, 5, 0.3, 0.2, 0.2, 0.1, 4]
+CONDITIONS = ['Hypertension', 'Diabetes Type 2', 'Asthma', 'Tuberculosis (treated)', 'Dengue (recovered)',
+              'High cholesterol', 'Arthritis', 'Migraine', 'Hyperthyroidism', 'Chronic kidney disease']
+ALLERGIES = ['Penicillin', 'Shellfish', 'Peanuts', 'Dust', 'Latex', 'Aspirin', 'Iodine', 'Sulfa drugs']
+DOCTORS = ['Dr. Santos', 'Dr. Reyes', 'Dr. Lim', 'Dr. Mendoza', 'Dr. Villanueva', 'Dr. Tan', 'Dr. Garcia',
+           'Dr. Aquino', 'Dr. Manalo', 'Dr. Dizon', 'Dr. Soriano', 'Dr. Evangelista', 'Dr. Pascual',
+           'Dr. Cabrera', 'Dr. Natividad', 'Dr. Yap']
+APPOINTMENT_TYPES = {
+    'Consultation': ['Fever and cough', 'Headache', 'Stomach pain', 'Skin rash', 'Body pain'],
+    'Follow-up': ['Blood pressure monitoring', 'Diabetes check', 'Post-surgery check', 'Lab results'],
+    'Imaging': ['Chest X-ray', 'Ultrasound', 'CT scan'],
+    'Vaccination': ['Flu vaccine', 'Anti-rabies', 'Hepatitis B', 'Pneumococcal'],
+    'Laboratory': ['CBC and urinalysis', 'Fasting blood sugar', 'Lipid profile', 'Annual physical labs'],
+}
+APPOINTMENT_TIMES = [f"{hour:02d}:{minute:02d}" for hour in range(8, 17) for minute in (0, 30)]
+
+
+def _person(rng):
+    """A (lastname, firstname) pair"""
+    firstnames = FEMALE_FIRSTNAMES if rng.random() < 0.5 else MALE_FIRSTNAMES
+    firstname = rng.choice(firstnames)
+    if rng.random() < 0.15:
+        # Double first names are common: Maria Cristina, John Paul
+        firstname = f"{firstname} {rng.choice(firstnames)}"
+    return rng.choice(LASTNAMES), firstname
+
+
+def make_patient(rng, now: datetime) -> dict:
+    """Patient fields as a clerk would enter them, without id or bookkeeping fields"""
+    lastname, firstname = _person(rng)
+    age_days = int(rng.triangular(0, 95, 35) * 365.25)
+    town, province = rng.choice(TOWNS)
+    handle = f"{firstname}.{lastname}".lower().replace(' ', '')
+    return {
+        'lastname': lastname,
+        'firstname': firstname,
+        'middlename': rng.choice(LASTNAMES),
+        'suffix': rng.choice(SUFFIXES) if rng.random() < 0.05 else None,
+        'birthday': (now - timedelta(days=age_days)).strftime('%Y-%m-%d'),
+        'address': f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {town}, {province}",
+        'phone': f"09{rng.choice([17, 18, 19, 27, 28, 39, 45, 56, 66, 77, 95, 98])}{rng.randint(0, 9999999):07d}",
+        'email': f"{handle}{rng.randint(1, 999)}@email.com" if rng.random() < 0.6 else None,
+        'emergency_contact_name': f"{_person(rng)[1]} {lastname}",
+        'emergency_contact_phone': f"0917{rng.randint(0, 9999999):07d}",
+        'medical_history': rng.choice(CONDITIONS) if rng.random() < 0.35 else 'None',
+        'allergies': rng.choice(ALLERGIES) if rng.random() < 0.2 else 'None',
+        'blood_type': rng.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0],
+    }
+
+
+def generate_patients(rng, count: int, now: datetime = None, start_id: int = 1) -> list:
+    """count complete patient records with ids from start_id"""
+    now = now or datetime.now()
+    patients = []
+    for patient_id in range(start_id, start_id + count):
+        patient = make_patient(rng, now)
+        created_at = (now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400))).isoformat(timespec='seconds')
+        patient.update({
+            'id': patient_id,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'is_new': int(rng.random() < 0.1),
+            'status': 'active' if rng.random() < 0.98 else 'inactive'
+        })
+        patients.append(patient)
+    return patients
+
+
+def generate_appointments(rng, patients: list, per_patient: float, now: datetime = None) -> list:
+    """About per_patient appointments per patient, from two years back to three months ahead"""
+    now = now or datetime.now()
+    today = now.date()
+    appointments = []
+    for patient in patients:
+        # Geometric number of visits with the requested mean
+        count = 0
+        while per_patient and rng.random() < per_patient / (per_patient + 1):
+            count += 1
+        for _ in range(count):
+            date = today + timedelta(days=rng.randint(-730, 90))
+            appointment_type = rng.choice(list(APPOINTMENT_TYPES))
+            if date > today:
+                status = 'scheduled'
+            else:
+                status = rng.choices(['completed', 'cancelled', 'no-show'], [85, 10, 5])[0]
+            appointments.append({
+                'id': len(appointments) + 1,
+                'patient_id': patient['id'],
+                'appointment_date': date.isoformat(),
+                'appointment_time': rng.choice(APPOINTMENT_TIMES),
+                'type': appointment_type,
+                'reason': rng.choice(APPOINTMENT_TYPES[appointment_type]),
+                'status': status,
+                'doctor_name': rng.choice(DOCTORS),
+                'notes': '',
+                'created_at': datetime.combine(min(date, today) - timedelta(days=rng.randint(0, 30)),
+                                               datetime.min.time()).isoformat(timespec='seconds')
+            })
+    return appointments
+
+
+def write_store(patients: list, appointments: list, backend: str = 'json'):
+    """Replace the store in the current directory's data/ with the given records"""
+    database.save_json_file(database.PATIENTS_FILE, patients)
+    database.save_json_file(database.APPOINTMENTS_FILE, appointments)
+    database.save_json_file(database.IMPORTS_FILE, [])
+    if backend == 'sqlite':
+        import sqlite_database
+        if os.path.exists(sqlite_database.SQLITE_PATH):
+            os.remove(sqlite_database.SQLITE_PATH)
+        sqlite_database.migrate_from_json()
+    database.clear_cache()
+
+
+def write_import_file(path: str, rows: list):
+    """Write patient rows as an import upload, CSV or JSON by the file's extension"""
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--appointments-per-patient', type=float, default=2.0)
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--import-file', help='also write new patients to this .csv or .json upload')
+    parser.add_argument('--import-rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    if args.patients:
+        patients = generate_patients(rng, args.patients, now)
+        appointments = generate_appointments(rng, patients, args.appointments_per_patient, now)
+        write_store(patients, appointments, args.backend)
+        print(f"Wrote {len(patients):,} patients and {len(appointments):,} appointments "
+              f"to {database.DATA_DIR}/ ({args.backend})")
+    if args.import_file:
+        write_import_file(args.import_file, [make_patient(rng, now) for _ in range(args.import_rows)])
+        print(f"Wrote {args.import_rows:,} new patients to {args.import_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Stress test concurrent writes to the JSON data files from many processes.
+
+Starts --processes worker processes that each insert --inserts patients and
+appointments at the same time, then reloads the data files and checks that
+every record is present exactly once with a unique id.
+
+    python benchmarks/stress_concurrent_writes.py --processes 8 --inserts 100
+    STORAGE_MODE=journal python benchmarks/stress_concurrent_writes.py
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def worker(worker_id, inserts, start_event, failures):
+    """Insert patients and appointments as fast as possible"""
+    start_event.wait()
+    for i in range(inserts):
+        result = database.add_patient(
+            lastname=f"Worker{worker_id}", firstname=f"Patient{i}", middlename='Stress',
+            birthday='2000-01-01', address='Imus, Cavite'
+        )
+        if not result['success']:
+            failures.put(f"worker {worker_id} patient {i}: {result['error']}")
+        result = database.create_appointment(
+            patient_id=1, appointment_date='2025-06-01', reason=f"worker {worker_id} #{i}"
+        )
+        if not result['success']:
+            failures.put(f"worker {worker_id} appointment {i}: {result['error']}")
+
+
+def check(filepath, expected, label):
+    """Verify a data file holds the expected number of records with unique ids"""
+    records = database.load_json_file(filepath, [], strict=True)
+    ids = [r['id'] for r in records]
+    problems = []
+    if len(records) != expected:
+        problems.append(f"{label}: expected {expected} records, found {len(records)}")
+    if len(set(ids)) != len(ids):
+        problems.append(f"{label}: {len(ids) - len(set(ids))} duplicate ids")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--inserts', type=int, default=100, help='patients and appointments per process')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        database.init_database()
+        base_patients = len(database.load_json_file(database.PATIENTS_FILE, []))
+        base_appointments = len(database.load_json_file(database.APPOINTMENTS_FILE, []))
+
+        start_event = multiprocessing.Event()
+        failures = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(n, args.inserts, start_event, failures))
+            for n in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        database.clear_cache()
+        total = args.processes * args.inserts
+        problems = []
+        while not failures.empty():
+            problems.append(failures.get())
+        problems += check(database.PATIENTS_FILE, base_patients + total, 'patients')
+        problems += check(database.APPOINTMENTS_FILE, base_appointments + total, 'appointments')
+
+        print(f"{args.processes} processes x {args.inserts} inserts ({database.STORAGE_MODE} mode) "
+              f"in {elapsed:.2f}s ({2 * total / elapsed:,.0f} writes/sec)")
+        if problems:
+            for problem in problems:
+                print(f"FAIL {problem}")
+            sys.exit(1)
+        print("OK: no records lost, all ids unique")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Convert the JSON store's data files to another on-disk format.
+
+Each file is rewritten in place, journal included, while holding its write
+lock. The store reads every format, but writes in DATA_FORMAT and
+DATA_COMPRESSION, so set those to match or the next write converts the
+file back.
+
+    python convert_data.py --format binary --compression gzip
+    python convert_data.py --format json data/patients.json
+"""
+import argparse
+import os
+
+import database
+import serializers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*',
+                        help='data files to convert (default: patients, appointments and imports)')
+    parser.add_argument('--format', choices=serializers.FORMATS, required=True)
+    parser.add_argument('--compression', choices=serializers.COMPRESSIONS, default='none')
+    args = parser.parse_args()
+
+    files = args.files or [database.PATIENTS_FILE, database.APPOINTMENTS_FILE, database.IMPORTS_FILE]
+    for filepath in files:
+        if not os.path.exists(filepath):
+            print(f"{filepath}: not found, skipped")
+            continue
+        before = os.path.getsize(filepath)
+        try:
+            converted = database.convert_data_file(filepath, args.format, args.compression)
+        except (ValueError, EOFError, IOError) as e:
+            print(f"{filepath}: unreadable, skipped ({e})")
+            continue
+        if converted:
+            print(f"{filepath}: {before:,} -> {os.path.getsize(filepath):,} bytes "
+                  f"({args.format}, {args.compression})")
+        else:
+            print(f"{filepath}: conversion failed")
+
+    if (args.format, args.compression) != (database.DATA_FORMAT, database.DATA_COMPRESSION):
+        print(f"Set DATA_FORMAT={args.format} DATA_COMPRESSION={args.compression} "
+              f"to keep writing in this format")
+
+
+if __name__ == '__main__':
+    main()
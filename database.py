@@ -1,41 +1,525 @@
+import base64
+import bisect
+import codecs
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import logging
 import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 
+import metrics
+import scheduling
+import serializers
+import stats
+from records import AppointmentRecord, PatientRecord, compact_records, to_json
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to locking within this process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
 # File paths for JSON storage
 DATA_DIR = 'data'
 PATIENTS_FILE = os.path.join(DATA_DIR, 'patients.json')
 APPOINTMENTS_FILE = os.path.join(DATA_DIR, 'appointments.json')
 IMPORTS_FILE = os.path.join(DATA_DIR, 'imports.json')
 
+# Data file of each table, as named by data_version()
+TABLE_FILES = {'patients': PATIENTS_FILE, 'appointments': APPOINTMENTS_FILE, 'imports': IMPORTS_FILE}
+
+# Patients and appointments are held in memory as compact records rather
+# than dicts; they are converted back to plain objects when written out.
+_RECORD_TYPES = {PATIENTS_FILE: PatientRecord, APPOINTMENTS_FILE: AppointmentRecord}
+
+# Storage mode for patients and appointments: 'snapshot' rewrites the whole
+# JSON file on every insert, 'journal' appends inserted records to a JSONL
+# journal next to it and folds the journal back into the snapshot once it
+# grows past JOURNAL_COMPACT_BYTES.
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'snapshot')
+JOURNAL_COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', 8 * 1024 * 1024))
+
+# On-disk format of data files: 'json' (indented), 'compact' (JSON without
+# whitespace) or 'binary', optionally gzip-compressed. Files are read in
+# whatever format they are in and written in this one; see serializers.py.
+DATA_FORMAT = os.environ.get('DATA_FORMAT', 'json')
+DATA_COMPRESSION = os.environ.get('DATA_COMPRESSION', 'none')
+
+# In-process cache of parsed data files, keyed by path. Each entry remembers
+# the file version it was parsed from so edits made by other processes (or by
+# hand) are picked up on the next load. Its generation changes whenever its
+# indexes are dropped, and count is how many records they cover.
+_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.RLock()
+_cache_generations = itertools.count(1)
+_cache_stats = {'hits': 0, 'misses': 0}
+_compacting = set()
+
+# Per-file write locks. Each read-modify-write of a data file holds the
+# file's thread lock and, across processes, an flock on a sibling .lock file.
+_file_locks: Dict[str, Dict[str, Any]] = {}
+_file_locks_guard = threading.Lock()
+
+# Timings of storage work, exposed by the /metrics endpoint. The last full
+# load of a data file is also kept for the health check.
+STORAGE_LOAD_SECONDS = metrics.histogram(
+    'storage_load_duration_seconds', 'Time to read and parse a data file on a cache miss', ['file'])
+STORAGE_WRITE_SECONDS = metrics.histogram(
+    'storage_write_duration_seconds', 'Time to write a data file snapshot or journal append', ['file', 'kind'])
+STORAGE_CALL_SECONDS = metrics.histogram(
+    'storage_call_duration_seconds', 'Time spent in storage backend functions', ['backend', 'function'])
+_last_load: Dict[str, Any] = {}
+
+def _timed(function):
+    """Record the durations of calls to a storage function"""
+    return metrics.timed(STORAGE_CALL_SECONDS, 'json', function.__name__)(function)
+
 def ensure_data_directory():
     """Ensure the data directory exists"""
     os.makedirs(DATA_DIR, exist_ok=True)
 
-def load_json_file(filepath: str, default_data: Any = None) -> Any:
-    """Load data from a JSON file"""
+def _journal_path(filepath: str) -> str:
+    """Path of the append-only journal kept next to a data file"""
+    return os.path.splitext(filepath)[0] + '.journal.jsonl'
+
+def _stat_version(path: str) -> Optional[tuple]:
+    """Return a (mtime_ns, size, inode) tuple identifying a file's contents, or None if missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _file_version(filepath: str) -> Optional[tuple]:
+    """Return the combined version of a data file and its journal, or None if neither exists"""
+    version = (_stat_version(filepath), _stat_version(_journal_path(filepath)))
+    if version == (None, None):
+        return None
+    return version
+
+@contextmanager
+def locked_data_file(filepath: str):
+    """Hold the exclusive write lock for a data file; re-entrant within a thread"""
+    with _file_locks_guard:
+        state = _file_locks.setdefault(filepath, {'lock': threading.RLock(), 'fd': None, 'depth': 0})
+    
+    with state['lock']:
+        if state['depth'] == 0 and fcntl is not None:
+            ensure_data_directory()
+            fd = os.open(filepath + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            state['fd'] = fd
+        state['depth'] += 1
+        try:
+            yield
+        finally:
+            state['depth'] -= 1
+            if state['depth'] == 0 and state['fd'] is not None:
+                fcntl.flock(state['fd'], fcntl.LOCK_UN)
+                os.close(state['fd'])
+                state['fd'] = None
+
+def get_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counters for the data file cache"""
+    with _cache_lock:
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'entries': len(_cache)
+        }
+
+def clear_cache():
+    """Drop all cached file contents and reset the counters"""
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats['hits'] = 0
+        _cache_stats['misses'] = 0
+
+def _data_file_sizes() -> Dict[tuple, int]:
+    """Sizes of the data files and their journals, keyed by (file, kind)"""
+    sizes = {}
+    for filepath in (PATIENTS_FILE, APPOINTMENTS_FILE, IMPORTS_FILE):
+        for kind, path in (('snapshot', filepath), ('journal', _journal_path(filepath))):
+            version = _stat_version(path)
+            if version is not None:
+                sizes[(os.path.basename(filepath), kind)] = version[1]
+    return sizes
+
+metrics.collector('storage_cache_hits_total', 'Data file loads served from the in-process cache', 'counter',
+                  collect=lambda: _cache_stats['hits'])
+metrics.collector('storage_cache_misses_total', 'Data file loads that had to read the file', 'counter',
+                  collect=lambda: _cache_stats['misses'])
+metrics.collector('storage_cache_entries', 'Data files held in the in-process cache',
+                  collect=lambda: len(_cache))
+metrics.collector('storage_data_file_size_bytes', 'Size of each data file and its journal',
+                  labels=['file', 'kind'], collect=_data_file_sizes)
+
+def storage_status() -> Dict[str, Any]:
+    """Check that the data files can be read and the data directory written.
+
+    Loads are served from the cache while the files are unchanged, so this
+    is cheap to call often.
+    """
+    problems = []
+    files = {}
+    if not os.path.isdir(DATA_DIR):
+        problems.append(f'{DATA_DIR} does not exist')
+    elif not os.access(DATA_DIR, os.W_OK):
+        problems.append(f'{DATA_DIR} is not writable')
+    for filepath in (PATIENTS_FILE, APPOINTMENTS_FILE, IMPORTS_FILE):
+        name = os.path.basename(filepath)
+        snapshot, journal = _file_version(filepath) or (None, None)
+        info = {'size': snapshot[1] if snapshot else None, 'journal_size': journal[1] if journal else None}
+        try:
+            info['records'] = len(load_json_file(filepath, [], strict=True))
+        except (ValueError, EOFError, IOError) as e:
+            info['error'] = str(e)
+            problems.append(f'{name} is unreadable: {e}')
+        files[name] = info
+    return {
+        'status': 'error' if problems else 'ok',
+        'backend': 'json',
+        'problems': problems,
+        'files': files,
+        'cache': get_cache_stats(),
+        'last_load': dict(_last_load) or None
+    }
+
+@_timed
+def data_version(*tables) -> Dict[str, Any]:
+    """Identify the current contents of the given tables without loading them.
+
+    'etag' changes whenever any of the tables' files or journals change;
+    'last_modified' is the newest of their modification times as a Unix
+    timestamp, or None if none of them exist yet.
+    """
+    versions = []
+    for table in tables:
+        if table not in TABLE_FILES:
+            raise ValueError(f'Unknown table: {table}')
+        versions.append(_file_version(TABLE_FILES[table]))
+    mtimes = [stat[0] for version in versions if version for stat in version if stat]
+    digest = hashlib.blake2b(repr(versions).encode(), digest_size=8).hexdigest()
+    return {'etag': f'json-{digest}', 'last_modified': max(mtimes) / 1e9 if mtimes else None}
+
+def _replay_journal(journal_path: str, data: List[Dict], record_type=None):
+    """Append the journaled records that are not yet part of the snapshot to data, as record_type if given"""
+    # Ids only ever grow, so anything at or below the snapshot's highest id
+    # was already folded in by a compaction that did not get to remove the
+    # journal.
+    last_id = max((item.get('id', 0) for item in data), default=0)
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                # Torn final write from a crash; the insert never completed
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn write that a later append terminated
+                continue
+            if record.get('id', 0) > last_id:
+                data.append(record_type.from_dict(record) if record_type else record)
+
+def load_json_file(filepath: str, default_data: Any = None, strict: bool = False) -> Any:
+    """Load data from a data file, served from the cache while the file is unchanged.
+
+    The file may be in any of the serializers formats.
+
+    Records in the file's journal, if it has one, are replayed on top of the
+    snapshot. The returned object is shared with the cache: callers that
+    modify it must write it back with save_json_file or append_json_records,
+    while holding locked_data_file. Writers pass strict=True so that an
+    unreadable file raises instead of being overwritten as if it were empty.
+    """
     if default_data is None:
         default_data = []
     
+    version = _file_version(filepath)
+    if version is None:
+        return default_data
+    
+    with _cache_lock:
+        entry = _cache.get(filepath)
+        if entry is not None and entry['version'] == version:
+            _cache_stats['hits'] += 1
+            return entry['data']
+        _cache_stats['misses'] += 1
+    
+    record_type = _RECORD_TYPES.get(filepath)
+    start = time.perf_counter()
     try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        if version[0] is not None:
+            data = serializers.load_file(filepath, record_type)
         else:
-            return default_data
-    except (json.JSONDecodeError, IOError):
+            data = []
+        if version[1] is not None:
+            _replay_journal(_journal_path(filepath), data, record_type)
+    except (ValueError, EOFError, IOError):
+        if strict:
+            raise
         return default_data
+    elapsed = time.perf_counter() - start
+    STORAGE_LOAD_SECONDS.observe(elapsed, os.path.basename(filepath))
+    _last_load.update(file=os.path.basename(filepath), seconds=round(elapsed, 6),
+                      records=len(data) if isinstance(data, list) else None,
+                      finished_at=datetime.now().isoformat())
+    
+    with _cache_lock:
+        _cache[filepath] = {'version': version, 'data': data, 'indexes': {},
+                            'generation': next(_cache_generations), 'count': len(data)}
+    return data
+
+def _refresh_cache_entry(filepath: str, data: Any, appended: Optional[List[Dict]], version: Optional[tuple]):
+    """Point the cache at data after a write, carrying its indexes forward across an append"""
+    with _cache_lock:
+        previous = _cache.get(filepath)
+        indexes = {}
+        generation = None
+        if appended is not None and previous is not None and previous['data'] is data:
+            indexes = previous.get('indexes', {})
+            generation = previous['generation']
+            for name, index in indexes.items():
+                for record in appended:
+                    _INDEX_UPDATERS[name](index, record)
+        if version is None:
+            _cache.pop(filepath, None)
+        else:
+            _cache[filepath] = {'version': version, 'data': data, 'indexes': indexes,
+                                'generation': generation or next(_cache_generations), 'count': len(data)}
 
-def save_json_file(filepath: str, data: Any) -> bool:
-    """Save data to a JSON file"""
+def save_json_file(filepath: str, data: Any, appended: Optional[List[Dict]] = None,
+                   format: Optional[str] = None, compression: Optional[str] = None) -> bool:
+    """Save data to a data file and refresh its cache entry.
+
+    The data must be the complete contents, so any journal is folded in and
+    removed. The file is replaced atomically, written in DATA_FORMAT and
+    DATA_COMPRESSION unless a format or compression is given. When the write
+    only appended `appended` records to the cached list, the derived indexes
+    of that list are updated in place instead of being rebuilt on the next
+    lookup.
+    """
     try:
         ensure_data_directory()
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        return True
+        # Write to a temporary file and rename it over the target, so readers
+        # and crashes only ever see the old or the new contents
+        start = time.perf_counter()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or '.', prefix='.tmp-')
+        try:
+            try:
+                os.chmod(tmp_path, os.stat(filepath).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, 0o644)
+            with os.fdopen(fd, 'wb') as f:
+                serializers.dump(data, f, format or DATA_FORMAT, compression or DATA_COMPRESSION)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if os.path.exists(_journal_path(filepath)):
+            os.remove(_journal_path(filepath))
+        STORAGE_WRITE_SECONDS.observe(time.perf_counter() - start, os.path.basename(filepath), 'snapshot')
     except IOError:
+        # The caller may have modified the cached object in place; make sure
+        # the next load re-reads what is actually on disk.
+        with _cache_lock:
+            _cache.pop(filepath, None)
         return False
+    
+    if appended is None and filepath in _RECORD_TYPES and isinstance(data, list):
+        compact_records(_RECORD_TYPES[filepath], data)
+    _refresh_cache_entry(filepath, data, appended, _file_version(filepath))
+    return True
+
+def append_json_records(filepath: str, data: List[Dict], records: List[Dict]) -> bool:
+    """Persist records that the caller has just appended to data, the loaded contents of filepath.
+
+    In journal mode this is a single append of one JSON line per record;
+    otherwise the whole file is rewritten with save_json_file.
+    """
+    if STORAGE_MODE != 'journal':
+        return save_json_file(filepath, data, appended=records)
+    
+    journal = _journal_path(filepath)
+    payload = ''.join(json.dumps(r, ensure_ascii=False, default=to_json) + '\n' for r in records).encode('utf-8')
+    with locked_data_file(filepath):
+        try:
+            start = time.perf_counter()
+            ensure_data_directory()
+            before = _file_version(filepath)
+            fd = os.open(journal, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b'\n':
+                    # Start on a fresh line after a torn write
+                    payload = b'\n' + payload
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+            STORAGE_WRITE_SECONDS.observe(time.perf_counter() - start, os.path.basename(filepath), 'journal')
+        except OSError:
+            with _cache_lock:
+                _cache.pop(filepath, None)
+            return False
+        after = _file_version(filepath)
+    
+    # Only keep the cached copy if nobody else wrote to the files around our
+    # append; otherwise let the next load pick up both writes.
+    journal_before = (before or (None, None))[1]
+    expected_size = (journal_before[1] if journal_before else 0) + len(payload)
+    journal_size = after[1][1] if after is not None and after[1] is not None else 0
+    with _cache_lock:
+        entry = _cache.get(filepath)
+        unchanged = entry is not None and entry['data'] is data and entry['version'] == before
+    if unchanged and journal_size == expected_size:
+        _refresh_cache_entry(filepath, data, records, after)
+    else:
+        _refresh_cache_entry(filepath, data, records, None)
+    
+    if journal_size >= JOURNAL_COMPACT_BYTES:
+        _start_background_compaction(filepath)
+    return True
+
+def compact_journal(filepath: str) -> bool:
+    """Fold a data file's journal back into its snapshot"""
+    with locked_data_file(filepath):
+        if not os.path.exists(_journal_path(filepath)):
+            return True
+        data = load_json_file(filepath, [], strict=True)
+        return save_json_file(filepath, data, appended=[])
+
+def convert_data_file(filepath: str, format: str, compression: str = 'none') -> bool:
+    """Rewrite a data file, journal included, in the given format and compression"""
+    with locked_data_file(filepath):
+        if _file_version(filepath) is None:
+            return False
+        data = load_json_file(filepath, [], strict=True)
+        return save_json_file(filepath, data, appended=[], format=format, compression=compression)
+
+def _start_background_compaction(filepath: str):
+    """Compact a journal on a daemon thread unless a compaction is already running"""
+    with _cache_lock:
+        if filepath in _compacting:
+            return
+        _compacting.add(filepath)
+    
+    def run():
+        try:
+            compact_journal(filepath)
+        finally:
+            with _cache_lock:
+                _compacting.discard(filepath)
+    
+    threading.Thread(target=run, name=f'compact-{os.path.basename(filepath)}', daemon=True).start()
+
+# Derived lookup structures are attached to the cache entry of the file they
+# are built from, so they share its lifetime: a new file version starts with
+# no indexes and each one is rebuilt lazily on first use.
+_INDEX_UPDATERS: Dict[str, Any] = {}
+
+# Times an index build is retried when writes keep dropping the indexes
+# under it, before it is built while holding the cache lock
+INDEX_BUILD_ATTEMPTS = 3
+
+def _get_index(filepath: str, name: str, build) -> Any:
+    """Get the named index over the current contents of filepath, building it if needed.
+
+    The index is built outside the cache lock over the records the cached
+    indexes cover at that point. Records appended while it builds are added
+    with its updater before it is attached; if the indexes were dropped
+    meanwhile, by a rewrite or a reload, the build starts over.
+    """
+    for _ in range(INDEX_BUILD_ATTEMPTS):
+        data = load_json_file(filepath, [])
+        with _cache_lock:
+            entry = _cache.get(filepath)
+            if entry is None or entry['data'] is not data:
+                # Not cached, so there is nothing to keep the index in step with
+                return build(data)
+            if name in entry['indexes']:
+                return entry['indexes'][name]
+            generation, count = entry['generation'], entry['count']
+            records = data[:count]
+        
+        index = build(records)
+        with _cache_lock:
+            entry = _cache.get(filepath)
+            if entry is not None and entry['data'] is data and entry['generation'] == generation:
+                if name not in entry['indexes']:
+                    for record in data[count:entry['count']]:
+                        _INDEX_UPDATERS[name](index, record)
+                    entry['indexes'][name] = index
+                return entry['indexes'][name]
+    
+    with _cache_lock:
+        data = load_json_file(filepath, [])
+        entry = _cache.get(filepath)
+        if entry is None or entry['data'] is not data:
+            return build(data)
+        return entry['indexes'].setdefault(name, build(data[:entry['count']]))
+
+def _normalize(value: Optional[str]) -> str:
+    """Normalize a name field the way patient searches compare it"""
+    return (value or '').lower().strip()
+
+def _build_patient_name_index(patients: List[Dict]) -> Dict[str, Dict[tuple, List[Dict]]]:
+    """Index active patients by normalized (lastname, firstname, middlename) plus suffix and/or birthday"""
+    index = {'name': {}, 'suffix': {}, 'birthday': {}, 'full': {}}
+    for patient in patients:
+        _add_to_patient_name_index(index, patient)
+    return index
+
+def _add_to_patient_name_index(index: Dict[str, Dict[tuple, List[Dict]]], patient: Dict):
+    """Add one patient record to the name index"""
+    if patient.get('status') != 'active':
+        return
+    
+    name = (
+        _normalize(patient.get('lastname')),
+        _normalize(patient.get('firstname')),
+        _normalize(patient.get('middlename'))
+    )
+    suffix = _normalize(patient.get('suffix'))
+    birthday = (patient.get('birthday') or '').strip()
+    
+    index['name'].setdefault(name, []).append(patient)
+    index['suffix'].setdefault(name + (suffix,), []).append(patient)
+    index['birthday'].setdefault(name + (birthday,), []).append(patient)
+    index['full'].setdefault(name + (suffix, birthday), []).append(patient)
+
+_INDEX_UPDATERS['patient_name'] = _add_to_patient_name_index
+
+def patient_import_key(record: Dict) -> tuple:
+    """Natural key the importers use to detect a patient that is already on file"""
+    return (
+        record['lastname'].lower(),
+        record['firstname'].lower(),
+        (record.get('middlename') or '').lower(),
+        record['birthday']
+    )
+
+def _build_patient_import_keys(patients: List[Dict]) -> set:
+    """Collect the import keys of every stored patient, active or not"""
+    return {patient_import_key(p) for p in patients}
+
+def _add_to_patient_import_keys(keys: set, patient: Dict):
+    """Add one patient record to the import key set"""
+    keys.add(patient_import_key(patient))
+
+_INDEX_UPDATERS['patient_import_keys'] = _add_to_patient_import_keys
 
 def get_next_id(data_list: List[Dict]) -> int:
     """Get the next available ID for a list of records"""
@@ -43,13 +527,115 @@ def get_next_id(data_list: List[Dict]) -> int:
         return 1
     return max(item.get('id', 0) for item in data_list) + 1
 
+def _build_max_id(records: List[Dict]) -> List[int]:
+    """Track the highest id in a file as a one-element list so it can be updated in place"""
+    return [get_next_id(records) - 1]
+
+def _add_to_max_id(max_id: List[int], record: Dict):
+    """Account for one appended record in the highest id"""
+    max_id[0] = max(max_id[0], record.get('id', 0))
+
+_INDEX_UPDATERS['max_id'] = _add_to_max_id
+
+def _next_record_id(filepath: str) -> int:
+    """Get the next available ID in a data file without scanning it"""
+    return _get_index(filepath, 'max_id', _build_max_id)[0] + 1
+
+def _is_active(record: Dict) -> bool:
+    """Whether a patient record is active"""
+    return record.get('status') == 'active'
+
+def _build_patient_by_id(patients: List[Dict]) -> Dict[int, Dict]:
+    """Map the id of every active patient to its record"""
+    index = {}
+    for patient in patients:
+        _add_to_patient_by_id(index, patient)
+    return index
+
+def _add_to_patient_by_id(index: Dict[int, Dict], patient: Dict):
+    """Add one patient record to the id map, keeping the first record for an id"""
+    if _is_active(patient):
+        index.setdefault(patient.get('id'), patient)
+
+_INDEX_UPDATERS['patient_by_id'] = _add_to_patient_by_id
+
+def _build_appointments_by_patient(appointments: List[Dict]) -> Dict[Any, List[Dict]]:
+    """Group appointments by patient id, each patient's newest appointment date first"""
+    index = {}
+    for appointment in appointments:
+        index.setdefault(appointment.get('patient_id'), []).append(appointment)
+    for patient_appointments in index.values():
+        patient_appointments.sort(key=lambda x: x.get('appointment_date', ''), reverse=True)
+    return index
+
+def _add_to_appointments_by_patient(index: Dict[Any, List[Dict]], appointment: Dict):
+    """Insert one appointment into its patient's list, after those on the same or a later date"""
+    patient_appointments = index.setdefault(appointment.get('patient_id'), [])
+    appointment_date = appointment.get('appointment_date', '')
+    position = len(patient_appointments)
+    while position > 0 and patient_appointments[position - 1].get('appointment_date', '') < appointment_date:
+        position -= 1
+    patient_appointments.insert(position, appointment)
+
+_INDEX_UPDATERS['appointments_by_patient'] = _add_to_appointments_by_patient
+
+# Listing orders for keyset pagination. Every sort key ends with the record
+# id, so keys are unique and a page can resume strictly after the last key
+# the client saw, however many records were added in between.
+PATIENT_ORDERS = {
+    'name': lambda p: (p.get('lastname') or '', p.get('firstname') or '', p.get('id', 0)),
+    'birthday': lambda p: (p.get('birthday') or '', p.get('id', 0)),
+    'created_at': lambda p: (p.get('created_at') or '', p.get('id', 0)),
+    'id': lambda p: (p.get('id', 0),)
+}
+APPOINTMENT_ORDERS = {
+    'date': lambda a: (a.get('appointment_date') or '', a.get('appointment_time') or '', a.get('id', 0)),
+    'created_at': lambda a: (a.get('created_at') or '', a.get('id', 0)),
+    'id': lambda a: (a.get('id', 0),)
+}
+
+def _build_sorted_index(records: List[Dict], key, include) -> Dict[str, list]:
+    """Records passing include, with their sort keys, both in key order"""
+    selected = sorted((record for record in records if include(record)), key=key)
+    return {'keys': [key(record) for record in selected], 'records': selected, 'generation': 0, 'totals': {}}
+
+def _add_to_sorted_index(index: Dict[str, list], record: Dict, key, include):
+    """Insert one record into a sorted index at its key position"""
+    if include(record):
+        record_key = key(record)
+        position = bisect.bisect_right(index['keys'], record_key)
+        index['keys'].insert(position, record_key)
+        index['records'].insert(position, record)
+        # Totals counted before this insert no longer apply
+        index['generation'] += 1
+
+for _order, _key in PATIENT_ORDERS.items():
+    _INDEX_UPDATERS[f'patient_order:{_order}'] = functools.partial(
+        _add_to_sorted_index, key=_key, include=_is_active)
+for _order, _key in APPOINTMENT_ORDERS.items():
+    _INDEX_UPDATERS[f'appointment_order:{_order}'] = functools.partial(
+        _add_to_sorted_index, key=_key, include=lambda record: True)
+
 def init_database():
     """Initialize the patient database with JSON files and dummy data"""
     ensure_data_directory()
     
+    # Fold any journal left over from the last run into its snapshot
+    for filepath in (PATIENTS_FILE, APPOINTMENTS_FILE):
+        compact_journal(filepath)
+    
+    # Seed empty files while holding both write locks, so concurrently
+    # starting workers cannot both insert the dummy data
+    with locked_data_file(PATIENTS_FILE), locked_data_file(APPOINTMENTS_FILE):
+        _insert_dummy_data()
+    
+    logger.info("Database initialized")
+
+def _insert_dummy_data():
+    """Insert dummy patients and appointments into empty data files"""
     # Load existing data
-    patients = load_json_file(PATIENTS_FILE, [])
-    appointments = load_json_file(APPOINTMENTS_FILE, [])
+    patients = load_json_file(PATIENTS_FILE, [], strict=True)
+    appointments = load_json_file(APPOINTMENTS_FILE, [], strict=True)
     imports = load_json_file(IMPORTS_FILE, [])
     
     # If patients file is empty, add dummy data
@@ -146,7 +732,7 @@ def init_database():
         ]
         
         save_json_file(PATIENTS_FILE, dummy_patients)
-        print(f"Inserted {len(dummy_patients)} dummy patient records")
+        logger.info("Inserted %d dummy patient records", len(dummy_patients))
     
     # If appointments file is empty, add dummy data
     if not appointments:
@@ -179,267 +765,901 @@ def init_database():
         ]
         
         save_json_file(APPOINTMENTS_FILE, dummy_appointments)
-        print(f"Inserted {len(dummy_appointments)} dummy appointment records")
-    
-    print("Database initialized successfully!")
+        logger.info("Inserted %d dummy appointment records", len(dummy_appointments))
 
+@_timed
 def add_patient(lastname, firstname, middlename=None, suffix=None, birthday=None, address=None, 
                 phone=None, email=None, emergency_contact_name=None, emergency_contact_phone=None,
                 medical_history=None, allergies=None, blood_type=None):
     """Add a new patient to the database with enhanced fields"""
     try:
-        patients = load_json_file(PATIENTS_FILE, [])
-        
-        # Create new patient record
-        new_patient = {
-            'id': get_next_id(patients),
-            'lastname': lastname,
-            'firstname': firstname,
-            'middlename': middlename,
-            'suffix': suffix,
-            'birthday': birthday,
-            'address': address,
-            'phone': phone,
-            'email': email,
-            'emergency_contact_name': emergency_contact_name,
-            'emergency_contact_phone': emergency_contact_phone,
-            'medical_history': medical_history,
-            'allergies': allergies,
-            'blood_type': blood_type,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat(),
-            'is_new': 1,
-            'status': 'active'
-        }
-        
-        patients.append(new_patient)
+        with locked_data_file(PATIENTS_FILE):
+            patients = load_json_file(PATIENTS_FILE, [], strict=True)
+            
+            # Create new patient record
+            now = datetime.now().isoformat()
+            new_patient = PatientRecord(
+                id=_next_record_id(PATIENTS_FILE),
+                lastname=lastname,
+                firstname=firstname,
+                middlename=middlename,
+                suffix=suffix,
+                birthday=birthday,
+                address=address,
+                phone=phone,
+                email=email,
+                emergency_contact_name=emergency_contact_name,
+                emergency_contact_phone=emergency_contact_phone,
+                medical_history=medical_history,
+                allergies=allergies,
+                blood_type=blood_type,
+                created_at=now,
+                updated_at=now,
+                is_new=1,
+                status='active'
+            )
+            
+            patients.append(new_patient)
+            
+            if append_json_records(PATIENTS_FILE, patients, [new_patient]):
+                logger.info("Added patient %s", new_patient['id'], extra={'patient_id': new_patient['id']})
+                return {'success': True, 'patient': new_patient, 'patient_id': new_patient['id']}
+            else:
+                return {'success': False, 'error': 'Failed to save patient data'}
         
-        if save_json_file(PATIENTS_FILE, patients):
-            print(f"Successfully added patient: {firstname} {lastname} (ID: {new_patient['id']})")
-            return {'success': True, 'patient': new_patient, 'patient_id': new_patient['id']}
-        else:
-            return {'success': False, 'error': 'Failed to save patient data'}
+    except Exception as e:
+        logger.error("Error adding patient: %s", e)
+        return {'success': False, 'error': str(e)}
+
+def _find_patient(index: Dict[str, Dict[tuple, List[Dict]]], fields: Dict) -> Optional[Dict]:
+    """The active patient in a name index that a new patient with these fields would duplicate.
+
+    Same test as the add-patient check: equal names and birthday, and equal
+    suffix when one is given.
+    """
+    name = (_normalize(fields.get('lastname')), _normalize(fields.get('firstname')),
+            _normalize(fields.get('middlename')))
+    birthday = (fields.get('birthday') or '').strip()
+    if fields.get('suffix'):
+        candidates = index['full'].get(name + (_normalize(fields['suffix']), birthday))
+    else:
+        candidates = index['birthday'].get(name + (birthday,))
+    return candidates[0] if candidates else None
+
+@_timed
+def add_patients(records: List[Dict]) -> Dict[str, Any]:
+    """Add several patients in one write, skipping any already on file or earlier in the batch.
+
+    Every record is checked against the same snapshot of the patients.
+    'results' has one entry per record, in order: the new patient and its
+    id, or the error and, for a duplicate, the id of the patient it
+    duplicates ('existing_id', which may be one added earlier in the batch).
+    """
+    try:
+        with locked_data_file(PATIENTS_FILE):
+            patients = load_json_file(PATIENTS_FILE, [], strict=True)
+            index = _get_index(PATIENTS_FILE, 'patient_name', _build_patient_name_index)
+            pending = _build_patient_name_index([])
+            next_id = _next_record_id(PATIENTS_FILE)
+            now = datetime.now().isoformat()
+            results = []
+            new_patients = []
+            
+            for fields in records:
+                with _cache_lock:
+                    existing = _find_patient(index, fields) or _find_patient(pending, fields)
+                if existing is not None:
+                    results.append({
+                        'success': False,
+                        'error': 'A patient with the same details already exists',
+                        'existing_id': existing['id']
+                    })
+                    continue
+                
+                new_patient = PatientRecord(fields, id=next_id, created_at=now, updated_at=now, is_new=1,
+                                            status='active')
+                _add_to_patient_name_index(pending, new_patient)
+                new_patients.append(new_patient)
+                results.append({'success': True, 'patient': new_patient, 'patient_id': next_id})
+                next_id += 1
+            
+            if new_patients:
+                patients.extend(new_patients)
+                if not append_json_records(PATIENTS_FILE, patients, new_patients):
+                    return {'success': False, 'error': 'Failed to save patient data'}
+                logger.info("Added %d patients", len(new_patients), extra={'patient_ids': [
+                    patient['id'] for patient in new_patients]})
+            return {'success': True, 'results': results, 'created': len(new_patients)}
         
     except Exception as e:
-        print(f"Error adding patient: {str(e)}")
+        logger.error("Error adding patients: %s", e)
         return {'success': False, 'error': str(e)}
 
-def import_patients_from_csv(file_path):
-    """Import patients from a CSV file"""
+@_timed
+def add_patient_if_absent(**fields) -> Dict[str, Any]:
+    """Add a patient unless the same person is already on file, as one locked check-and-insert.
+
+    Takes add_patient's arguments. The duplicate check is add_patients'
+    (equal names and birthday, equal suffix when one is given), looked up
+    in the name index while the write lock is held, so two concurrent
+    registrations of one person cannot both get in. A duplicate gives
+    'duplicate': True and the id of the patient on file.
+    """
+    outcome = add_patients([fields])
+    if not outcome['success']:
+        return outcome
+    result = outcome['results'][0]
+    if not result['success']:
+        return {'success': False, 'error': result['error'], 'duplicate': True, 'existing_id': result['existing_id']}
+    return result
+
+def csv_row_to_patient(row: Dict[str, str]) -> Dict[str, Any]:
+    """Map a CSV import row to patient fields"""
+    # Map CSV columns to database fields (flexible mapping)
+    return {
+        'lastname': row.get('lastname') or row.get('last_name') or row.get('LastName') or '',
+        'firstname': row.get('firstname') or row.get('first_name') or row.get('FirstName') or '',
+        'middlename': row.get('middlename') or row.get('middle_name') or row.get('MiddleName') or None,
+        'suffix': row.get('suffix') or row.get('Suffix') or None,
+        'birthday': row.get('birthday') or row.get('birth_date') or row.get('date_of_birth') or row.get('Birthday') or '',
+        'address': row.get('address') or row.get('Address') or '',
+        'phone': row.get('phone') or row.get('phone_number') or row.get('Phone') or None,
+        'email': row.get('email') or row.get('Email') or None,
+        'emergency_contact_name': row.get('emergency_contact_name') or row.get('emergency_contact') or None,
+        'emergency_contact_phone': row.get('emergency_contact_phone') or row.get('emergency_phone') or None,
+        'medical_history': row.get('medical_history') or row.get('Medical_History') or None,
+        'allergies': row.get('allergies') or row.get('Allergies') or None,
+        'blood_type': row.get('blood_type') or row.get('Blood_Type') or None
+    }
+
+# Uploads are parsed incrementally and committed in batches of this many
+# new patients, so an import holds at most one batch of parsed rows. Each
+# batch is a single append in journal mode and a full rewrite in snapshot mode.
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+IMPORT_CHUNK_SIZE = 64 * 1024
+# Per-row error messages kept for the response; total_errors still counts all
+MAX_IMPORT_ERRORS = 1000
+
+PATIENT_IMPORT_FIELDS = [
+    'lastname', 'firstname', 'middlename', 'suffix', 'birthday', 'address', 'phone', 'email',
+    'emergency_contact_name', 'emergency_contact_phone', 'medical_history', 'allergies', 'blood_type'
+]
+
+@contextmanager
+def _open_import_source(source):
+    """Yield a binary stream for a file path or an already open binary stream"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield f
+    else:
+        yield source
+
+def _source_name(source) -> str:
+    """File name recorded in the import history for a path or stream"""
+    return os.path.basename(str(getattr(source, 'name', source)))
+
+def _iter_text(stream):
+    """Decode a binary UTF-8 stream chunk by chunk"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = stream.read(IMPORT_CHUNK_SIZE)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def _iter_lines(stream):
+    """Yield the lines of a binary UTF-8 stream, keeping their line endings"""
+    pending = ''
+    for text in _iter_text(stream):
+        lines = (pending + text).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+def iter_csv_patients(stream):
+    """Yield (label, patient_data, error) for each row of a CSV upload, reading it incrementally"""
     import csv
     
-    try:
-        patients = load_json_file(PATIENTS_FILE, [])
-        imported_count = 0
-        errors = []
+    lines = _iter_lines(stream)
+    
+    # Try to detect the delimiter from the first 1024 characters
+    head = []
+    for line in lines:
+        head.append(line)
+        if sum(len(l) for l in head) >= 1024:
+            break
+    sample = ''.join(head)[:1024]
+    delimiter = csv.Sniffer().sniff(sample).delimiter
+    
+    reader = csv.DictReader(itertools.chain(head, lines), delimiter=delimiter)
+    for row_num, row in enumerate(reader, start=2):  # Start at 2 because row 1 is header
+        label = f"Row {row_num}"
+        try:
+            patient_data = csv_row_to_patient(row)
+        except Exception as e:
+            yield label, None, str(e)
+            continue
+        
+        # Validate required fields
+        if not patient_data['lastname'] or not patient_data['firstname'] or not patient_data['birthday'] or not patient_data['address']:
+            yield label, None, "Missing required fields (lastname, firstname, birthday, address)"
+            continue
         
-        with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            # Try to detect the delimiter
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
+        yield label, patient_data, None
+
+def _iter_json_array_items(stream):
+    """Yield the items of the patient array of a JSON upload without loading the whole document.
+
+    The document is either an array of patients or an object with a
+    'patients' array.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _iter_text(stream)
+    state = {'buf': '', 'pos': 0, 'eof': False}
+    
+    def fill():
+        text = next(chunks, None)
+        if text is None:
+            state['eof'] = True
+            return False
+        state['buf'] = state['buf'][state['pos']:] + text
+        state['pos'] = 0
+        return True
+    
+    def peek():
+        # Next non-whitespace character, or '' at the end of the document
+        while True:
+            buf, pos = state['buf'], state['pos']
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            state['pos'] = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ''
+    
+    def value():
+        peek()
+        while True:
+            try:
+                result, end = decoder.raw_decode(state['buf'], state['pos'])
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            tail = state['buf'][end:]
+            if (isinstance(result, (int, float)) and not state['eof']
+                    and all(c in '0123456789.eE+-' for c in tail) and fill()):
+                continue
+            state['pos'] = end
+            return result
+    
+    def expect(char):
+        if peek() != char:
+            raise ValueError('Invalid JSON structure')
+        state['pos'] += 1
+    
+    first = peek()
+    if first == '{':
+        # Skip to the value of the 'patients' key
+        state['pos'] += 1
+        while True:
+            if peek() != '"':
+                raise ValueError('Invalid JSON structure')
+            key = value()
+            expect(':')
+            if key == 'patients' and peek() == '[':
+                break
+            value()
+            if peek() != ',':
+                raise ValueError('Invalid JSON structure')
+            state['pos'] += 1
+    elif first != '[':
+        raise ValueError('Invalid JSON structure')
+    
+    expect('[')
+    if peek() == ']':
+        return
+    while True:
+        yield value()
+        separator = peek()
+        state['pos'] += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError('Invalid JSON structure')
+
+def iter_json_patients(stream):
+    """Yield (label, patient_data, error) for each patient of a JSON upload, reading it incrementally"""
+    for index, patient in enumerate(_iter_json_array_items(stream)):
+        label = f"Patient {index + 1}"
+        try:
+            # Validate required fields
+            required_fields = ['lastname', 'firstname', 'birthday', 'address']
+            missing_fields = [field for field in required_fields if not patient.get(field)]
             
-            reader = csv.DictReader(csvfile, delimiter=delimiter)
+            if missing_fields:
+                yield label, None, f"Missing required fields: {', '.join(missing_fields)}"
+                continue
             
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 because row 1 is header
-                try:
-                    # Map CSV columns to database fields (flexible mapping)
-                    patient_data = {
-                        'lastname': row.get('lastname') or row.get('last_name') or row.get('LastName') or '',
-                        'firstname': row.get('firstname') or row.get('first_name') or row.get('FirstName') or '',
-                        'middlename': row.get('middlename') or row.get('middle_name') or row.get('MiddleName') or None,
-                        'suffix': row.get('suffix') or row.get('Suffix') or None,
-                        'birthday': row.get('birthday') or row.get('birth_date') or row.get('date_of_birth') or row.get('Birthday') or '',
-                        'address': row.get('address') or row.get('Address') or '',
-                        'phone': row.get('phone') or row.get('phone_number') or row.get('Phone') or None,
-                        'email': row.get('email') or row.get('Email') or None,
-                        'emergency_contact_name': row.get('emergency_contact_name') or row.get('emergency_contact') or None,
-                        'emergency_contact_phone': row.get('emergency_contact_phone') or row.get('emergency_phone') or None,
-                        'medical_history': row.get('medical_history') or row.get('Medical_History') or None,
-                        'allergies': row.get('allergies') or row.get('Allergies') or None,
-                        'blood_type': row.get('blood_type') or row.get('Blood_Type') or None
-                    }
-                    
-                    # Validate required fields
-                    if not patient_data['lastname'] or not patient_data['firstname'] or not patient_data['birthday'] or not patient_data['address']:
-                        errors.append(f"Row {row_num}: Missing required fields (lastname, firstname, birthday, address)")
-                        continue
-                    
-                    # Check if patient already exists
-                    existing = any(
-                        p['lastname'].lower() == patient_data['lastname'].lower() and
-                        p['firstname'].lower() == patient_data['firstname'].lower() and
-                        (p.get('middlename') or '').lower() == (patient_data['middlename'] or '').lower() and
-                        p['birthday'] == patient_data['birthday']
-                        for p in patients
-                    )
-                    
-                    if existing:
-                        errors.append(f"Row {row_num}: Patient already exists")
-                        continue
-                    
-                    # Create new patient record
-                    new_patient = {
-                        'id': get_next_id(patients),
-                        'lastname': patient_data['lastname'],
-                        'firstname': patient_data['firstname'],
-                        'middlename': patient_data['middlename'],
-                        'suffix': patient_data['suffix'],
-                        'birthday': patient_data['birthday'],
-                        'address': patient_data['address'],
-                        'phone': patient_data['phone'],
-                        'email': patient_data['email'],
-                        'emergency_contact_name': patient_data['emergency_contact_name'],
-                        'emergency_contact_phone': patient_data['emergency_contact_phone'],
-                        'medical_history': patient_data['medical_history'],
-                        'allergies': patient_data['allergies'],
-                        'blood_type': patient_data['blood_type'],
-                        'created_at': datetime.now().isoformat(),
-                        'updated_at': datetime.now().isoformat(),
-                        'is_new': 0,
-                        'status': 'active'
-                    }
-                    
-                    patients.append(new_patient)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
+            patient_data = {field: patient.get(field) for field in PATIENT_IMPORT_FIELDS}
+        except Exception as e:
+            yield label, None, str(e)
+            continue
         
-        # Save updated patients data
-        save_json_file(PATIENTS_FILE, patients)
+        yield label, patient_data, None
+
+def _keep_import_errors(errors: List[tuple], new_errors: List[tuple]):
+    """Add (row number, message) errors, keeping only the MAX_IMPORT_ERRORS earliest rows.
+
+    Duplicates are only found when their batch commits, after the parse
+    errors of later rows, so errors are kept by row rather than arrival.
+    """
+    errors.extend(new_errors)
+    # Trimming only past twice the limit keeps the sorting amortized
+    if len(errors) > 2 * MAX_IMPORT_ERRORS:
+        errors.sort()
+        del errors[MAX_IMPORT_ERRORS:]
+
+def _import_error_messages(errors: List[tuple]) -> List[str]:
+    """The messages of the earliest kept import errors, in row order"""
+    return [message for row, message in sorted(errors)[:MAX_IMPORT_ERRORS]]
+
+def _commit_import_batch(batch: List[tuple], duplicate_message: str, errors: List[tuple]) -> int:
+    """De-duplicate and append one batch of parsed (row, label, patient_data) patients; returns how many were added"""
+    with locked_data_file(PATIENTS_FILE):
+        patients = load_json_file(PATIENTS_FILE, [], strict=True)
+        existing_keys = _get_index(PATIENTS_FILE, 'patient_import_keys', _build_patient_import_keys)
+        seen_keys = set()
+        next_id = _next_record_id(PATIENTS_FILE)
+        now = datetime.now().isoformat()
+        new_patients = []
         
-        # Record the import
-        imports = load_json_file(IMPORTS_FILE, [])
-        import_record = {
-            'id': get_next_id(imports),
-            'filename': os.path.basename(file_path),
-            'import_date': datetime.now().isoformat(),
-            'records_imported': imported_count,
-            'import_type': 'csv',
-            'status': 'completed'
-        }
-        imports.append(import_record)
-        save_json_file(IMPORTS_FILE, imports)
+        for row, label, patient_data in batch:
+            try:
+                # Check if patient already exists, on file or earlier in this batch
+                key = patient_import_key(patient_data)
+                if key in existing_keys or key in seen_keys:
+                    errors.append((row, f"{label}: {duplicate_message}"))
+                    continue
+                
+                new_patient = PatientRecord(patient_data, id=next_id, created_at=now, updated_at=now,
+                                            is_new=0, status='active')
+                new_patients.append(new_patient)
+                seen_keys.add(key)
+                next_id += 1
+                
+            except Exception as e:
+                errors.append((row, f"{label}: {str(e)}"))
         
+        if new_patients:
+            patients.extend(new_patients)
+            if not append_json_records(PATIENTS_FILE, patients, new_patients):
+                raise IOError('Failed to save patient data')
+        return len(new_patients)
+
+def _import_patient_rows(rows, reader, import_id: int, duplicate_message: str,
+                         batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Commit parsed (label, patient_data, error) rows in batches, reporting progress to the import history"""
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    imported_count = 0
+    rows_processed = 0
+    reported_rows = 0
+    total_errors = 0
+    errors = []
+    batch = []
+    
+    def add_errors(new_errors):
+        nonlocal total_errors
+        total_errors += len(new_errors)
+        _keep_import_errors(errors, new_errors)
+    
+    def progress():
         return {
-            'success': True,
-            'imported_count': imported_count,
-            'errors': errors,
-            'total_errors': len(errors)
+            'records_imported': imported_count,
+            'rows_processed': rows_processed,
+            'error_count': total_errors,
+            'bytes_read': reader.bytes_read
         }
+    
+    try:
+        for label, patient_data, error in rows:
+            rows_processed += 1
+            if error:
+                add_errors([(rows_processed, f"{label}: {error}")])
+            else:
+                batch.append((rows_processed, label, patient_data))
+            
+            if len(batch) >= batch_size:
+                batch_errors = []
+                imported_count += _commit_import_batch(batch, duplicate_message, batch_errors)
+                add_errors(batch_errors)
+                batch = []
+            if rows_processed - reported_rows >= batch_size:
+                update_import_record(import_id, **progress())
+                reported_rows = rows_processed
         
+        if batch:
+            batch_errors = []
+            imported_count += _commit_import_batch(batch, duplicate_message, batch_errors)
+            add_errors(batch_errors)
     except Exception as e:
+        # Batches committed before the failure stay imported
+        update_import_record(import_id, status='failed', error=str(e),
+                             finished_at=datetime.now().isoformat(), **progress())
         return {
             'success': False,
             'error': str(e),
-            'imported_count': 0,
-            'errors': []
+            'import_id': import_id,
+            'imported_count': imported_count,
+            'errors': _import_error_messages(errors)
         }
+    
+    update_import_record(import_id, status='completed', finished_at=datetime.now().isoformat(), **progress())
+    
+    return {
+        'success': True,
+        'import_id': import_id,
+        'imported_count': imported_count,
+        'errors': _import_error_messages(errors),
+        'total_errors': total_errors
+    }
 
-def import_patients_from_json(file_path):
-    """Import patients from a JSON file"""
+class _CountingReader:
+    """Binary stream wrapper counting the bytes read, for import progress"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+def _source_size(source, stream) -> Optional[int]:
+    """Size in bytes of an import source, or None when it cannot be told"""
     try:
-        patients = load_json_file(PATIENTS_FILE, [])
-        imported_count = 0
-        errors = []
-        
-        with open(file_path, 'r', encoding='utf-8') as jsonfile:
-            data = json.load(jsonfile)
-            
-            # Handle different JSON structures
-            if isinstance(data, list):
-                patients_data = data
-            elif isinstance(data, dict) and 'patients' in data:
-                patients_data = data['patients']
-            else:
-                return {'success': False, 'error': 'Invalid JSON structure'}
-            
-            for index, patient in enumerate(patients_data):
-                try:
-                    # Validate required fields
-                    required_fields = ['lastname', 'firstname', 'birthday', 'address']
-                    missing_fields = [field for field in required_fields if not patient.get(field)]
-                    
-                    if missing_fields:
-                        errors.append(f"Patient {index + 1}: Missing required fields: {', '.join(missing_fields)}")
-                        continue
-                    
-                    # Check if patient already exists
-                    existing = any(
-                        p['lastname'].lower() == patient['lastname'].lower() and
-                        p['firstname'].lower() == patient['firstname'].lower() and
-                        (p.get('middlename') or '').lower() == (patient.get('middlename') or '').lower() and
-                        p['birthday'] == patient['birthday']
-                        for p in patients
-                    )
-                    
-                    if existing:
-                        errors.append(f"Patient {index + 1}: Already exists")
-                        continue
-                    
-                    # Create new patient record
-                    new_patient = {
-                        'id': get_next_id(patients),
-                        'lastname': patient['lastname'],
-                        'firstname': patient['firstname'],
-                        'middlename': patient.get('middlename'),
-                        'suffix': patient.get('suffix'),
-                        'birthday': patient['birthday'],
-                        'address': patient['address'],
-                        'phone': patient.get('phone'),
-                        'email': patient.get('email'),
-                        'emergency_contact_name': patient.get('emergency_contact_name'),
-                        'emergency_contact_phone': patient.get('emergency_contact_phone'),
-                        'medical_history': patient.get('medical_history'),
-                        'allergies': patient.get('allergies'),
-                        'blood_type': patient.get('blood_type'),
-                        'created_at': datetime.now().isoformat(),
-                        'updated_at': datetime.now().isoformat(),
-                        'is_new': 0,
-                        'status': 'active'
-                    }
-                    
-                    patients.append(new_patient)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Patient {index + 1}: {str(e)}")
-        
-        # Save updated patients data
-        save_json_file(PATIENTS_FILE, patients)
-        
-        # Record the import
-        imports = load_json_file(IMPORTS_FILE, [])
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def create_import_record(filename: str, import_type: str, status: str = 'running',
+                         total_bytes: Optional[int] = None) -> int:
+    """Add an entry to the import history and return its id.
+
+    Imports are recorded as 'running' when they start (or 'queued' when
+    handed to the background job pool) and move to 'completed' or 'failed'
+    when they finish.
+    """
+    with locked_data_file(IMPORTS_FILE):
+        imports = load_json_file(IMPORTS_FILE, [], strict=True)
+        now = datetime.now().isoformat()
         import_record = {
             'id': get_next_id(imports),
-            'filename': os.path.basename(file_path),
-            'import_date': datetime.now().isoformat(),
-            'records_imported': imported_count,
-            'import_type': 'json',
-            'status': 'completed'
+            'filename': filename,
+            'import_date': now,
+            'records_imported': 0,
+            'import_type': import_type,
+            'status': status,
+            'rows_processed': 0,
+            'error_count': 0,
+            'bytes_read': 0,
+            'total_bytes': total_bytes,
+            'started_at': now if status == 'running' else None,
+            'updated_at': now,
+            'finished_at': None,
+            'error': None
         }
         imports.append(import_record)
-        save_json_file(IMPORTS_FILE, imports)
-        
-        return {
-            'success': True,
-            'imported_count': imported_count,
-            'errors': errors,
-            'total_errors': len(errors)
-        }
-        
+        if not save_json_file(IMPORTS_FILE, imports):
+            raise IOError('Failed to save import history')
+        return import_record['id']
+
+def update_import_record(import_id: int, **fields) -> bool:
+    """Update the status or progress fields of an import history entry"""
+    with locked_data_file(IMPORTS_FILE):
+        imports = load_json_file(IMPORTS_FILE, [], strict=True)
+        for import_record in imports:
+            if import_record.get('id') == import_id:
+                import_record.update(fields)
+                import_record['updated_at'] = datetime.now().isoformat()
+                return save_json_file(IMPORTS_FILE, imports)
+        return False
+
+def import_job_progress(import_record: Dict[str, Any]) -> Dict[str, Any]:
+    """An import history entry with its throughput and estimated time remaining"""
+    job = dict(import_record)
+    job['rows_per_sec'] = None
+    job['eta_seconds'] = None
+    if not job.get('started_at'):
+        return job
+    
+    end = job.get('finished_at') if job.get('status') != 'running' else None
+    end = datetime.fromisoformat(end) if end else datetime.now()
+    elapsed = (end - datetime.fromisoformat(job['started_at'])).total_seconds()
+    if elapsed > 0:
+        job['rows_per_sec'] = round((job.get('rows_processed') or 0) / elapsed, 1)
+    
+    bytes_read = job.get('bytes_read') or 0
+    total_bytes = job.get('total_bytes')
+    if job.get('status') == 'running' and bytes_read and total_bytes:
+        job['eta_seconds'] = round(max(0, elapsed * (total_bytes - bytes_read) / bytes_read), 1)
+    elif job.get('status') in ('completed', 'failed'):
+        job['eta_seconds'] = 0
+    return job
+
+@_timed
+def get_import_job(import_id):
+    """Get an import history entry with its progress, or None if it does not exist"""
+    try:
+        imports = load_json_file(IMPORTS_FILE, [])
+        for import_record in imports:
+            if import_record.get('id') == import_id:
+                return import_job_progress(import_record)
+        return None
     except Exception as e:
+        logger.error("Error getting import job: %s", e)
+        return None
+
+def _import_patients(source, parse, import_type: str, filename: Optional[str], duplicate_message: str,
+                     batch_size: Optional[int] = None, import_id: Optional[int] = None) -> Dict[str, Any]:
+    """Import patients from a file path or binary stream with one of the iter_*_patients parsers"""
+    try:
+        with _open_import_source(source) as stream:
+            total_bytes = _source_size(source, stream)
+            if import_id is None:
+                import_id = create_import_record(filename or _source_name(source), import_type,
+                                                 total_bytes=total_bytes)
+            else:
+                update_import_record(import_id, status='running', total_bytes=total_bytes,
+                                     started_at=datetime.now().isoformat())
+            reader = _CountingReader(stream)
+            return _import_patient_rows(parse(reader), reader, import_id, duplicate_message, batch_size)
+    except Exception as e:
+        if import_id is not None:
+            try:
+                update_import_record(import_id, status='failed', error=str(e),
+                                     finished_at=datetime.now().isoformat())
+            except Exception:
+                pass
         return {
             'success': False,
             'error': str(e),
+            'import_id': import_id,
             'imported_count': 0,
             'errors': []
         }
 
-def search_patients(lastname=None, firstname=None, middlename=None, suffix=None, birthday=None, address=None):
-    """Search for patients based on provided criteria"""
+@_timed
+def import_patients_from_csv(source, filename=None, batch_size=None, import_id=None):
+    """Import patients from a CSV file path or binary stream"""
+    return _import_patients(source, iter_csv_patients, 'csv', filename,
+                            'Patient already exists', batch_size, import_id)
+
+@_timed
+def import_patients_from_json(source, filename=None, batch_size=None, import_id=None):
+    """Import patients from a JSON file path or binary stream"""
+    return _import_patients(source, iter_json_patients, 'json', filename,
+                            'Already exists', batch_size, import_id)
+
+# Fuzzy name search. Names are compared "squashed": accents, case, spaces and
+# punctuation removed, so "Dela Cruz" and "Delacruz" are the same name. Each
+# name field keeps an inverted index from character trigrams to the distinct
+# squashed names containing them, plus a phonetic key per name that folds
+# common Spanish/Filipino spelling variants (z/s, c/k, v/b, ...) together.
+# A query first finds similar distinct lastnames and firstnames in these
+# vocabularies and only then looks up the patients carrying those names, so
+# its cost depends on the vocabulary, not on the number of patients.
+FUZZY_FIELDS = ('lastname', 'firstname')
+FUZZY_MIN_SCORE = 0.6
+FUZZY_MAX_NAMES = 30
+# Names up to this many letters are also compared by edit distance
+FUZZY_SHORT_NAME = 8
+FUZZY_EDIT_MIN_SCORE = 0.35
+FUZZY_PHONETIC_RULES = (
+    ('ph', 'f'), ('qu', 'k'), ('ll', 'y'), ('ce', 'se'), ('ci', 'si'),
+    ('z', 's'), ('c', 'k'), ('v', 'b'), ('j', 'h'), ('w', 'u')
+)
+
+def _squash(value: Optional[str]) -> str:
+    """Lowercase letters of a name without accents, spaces or punctuation"""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in decomposed.lower() if 'a' <= c <= 'z')
+
+def _trigrams(squashed: str) -> set:
+    """Character trigrams of a squashed name, padded so short names still have some"""
+    padded = f'$${squashed}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def phonetic_key(value: Optional[str]) -> str:
+    """Phonetic key of a name: first letter plus its consonant skeleton"""
+    key = _squash(value)
+    if not key:
+        return ''
+    for pattern, replacement in FUZZY_PHONETIC_RULES:
+        key = key.replace(pattern, replacement)
+    skeleton = [key[0]]
+    for c in key[1:]:
+        if c not in 'aeiouyh' and c != skeleton[-1]:
+            skeleton.append(c)
+    return ''.join(skeleton)
+
+def _build_patient_fuzzy_index(patients: List[Dict]) -> Dict[str, Any]:
+    """Trigram and phonetic vocabularies of active patients' names, and the patients by squashed name"""
+    index = {
+        'fields': {field: {'names': {}, 'trigrams': {}, 'phonetic': {}} for field in FUZZY_FIELDS},
+        'patients': {}
+    }
+    for patient in patients:
+        _add_to_patient_fuzzy_index(index, patient)
+    return index
+
+def _add_vocabulary_name(vocabulary: Dict[str, Dict], value: Optional[str]) -> str:
+    """Add a name to a field vocabulary and return its canonical squashed form"""
+    squashed = _squash(value)
+    canonical = vocabulary['names'].get(squashed)
+    if canonical is not None:
+        return canonical[0]
+    trigrams = _trigrams(squashed)
+    vocabulary['names'][squashed] = (squashed, len(trigrams), phonetic_key(squashed))
+    for trigram in trigrams:
+        vocabulary['trigrams'].setdefault(trigram, []).append(squashed)
+    vocabulary['phonetic'].setdefault(phonetic_key(squashed), []).append(squashed)
+    return squashed
+
+def _add_to_patient_fuzzy_index(index: Dict[str, Any], patient: Dict):
+    """Add one patient record to the fuzzy index"""
+    if not _is_active(patient):
+        return
+    lastname = _add_vocabulary_name(index['fields']['lastname'], patient.get('lastname'))
+    firstname = _add_vocabulary_name(index['fields']['firstname'], patient.get('firstname'))
+    index['patients'].setdefault(lastname, {}).setdefault(firstname, []).append(patient)
+
+_INDEX_UPDATERS['patient_fuzzy'] = _add_to_patient_fuzzy_index
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance counting an adjacent transposition as one edit"""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+def _name_similarity(query: str, query_trigrams: set, query_phonetic: str, name: str,
+                     trigram_count: int, shared: int, phonetic: str) -> float:
+    """Similarity of two squashed names in [0, 1].
+
+    The trigram Dice coefficient, lifted for phonetic matches. Short names
+    lose most of their trigrams to a single typo, so for those the edit
+    distance is used when it scores higher.
+    """
+    if query == name:
+        return 1.0
+    score = 2.0 * shared / (len(query_trigrams) + trigram_count)
+    if query_phonetic and query_phonetic == phonetic:
+        score = 0.5 + 0.5 * score
+    if (FUZZY_EDIT_MIN_SCORE <= score < FUZZY_MIN_SCORE and abs(len(query) - len(name)) <= 2
+            and len(query) <= FUZZY_SHORT_NAME and len(name) <= FUZZY_SHORT_NAME):
+        score = max(score, 1.0 - _edit_distance(query, name) / max(len(query), len(name)))
+    return score
+
+def _similar_names(vocabulary: Dict[str, Dict], value: str) -> List[tuple]:
+    """(score, squashed name) pairs of the vocabulary names most similar to value"""
+    query = _squash(value)
+    if not query:
+        return []
+    query_trigrams = _trigrams(query)
+    query_phonetic = phonetic_key(query)
+    shared = Counter()
+    for trigram in query_trigrams:
+        shared.update(vocabulary['trigrams'].get(trigram, ()))
+    phonetic_matches = vocabulary['phonetic'].get(query_phonetic, ())
+    for name in phonetic_matches:
+        shared.setdefault(name, 0)
+    
+    # Sharing a single trigram (usually just the first letter) is never
+    # enough to reach the minimum score without a phonetic match
+    phonetic_matches = set(phonetic_matches)
+    scored = []
+    for name, count in shared.items():
+        if count < 2 and name not in phonetic_matches:
+            continue
+        _, trigram_count, phonetic = vocabulary['names'][name]
+        score = _name_similarity(query, query_trigrams, query_phonetic, name, trigram_count, count, phonetic)
+        if score >= FUZZY_MIN_SCORE:
+            scored.append((score, name))
+    scored.sort(reverse=True)
+    return scored[:FUZZY_MAX_NAMES]
+
+def _field_similarity(query: Optional[str], value: Optional[str]) -> float:
+    """Similarity of a single pair of names, for fields without a vocabulary"""
+    query, value = _squash(query), _squash(value)
+    if query == value:
+        return 1.0
+    query_trigrams, value_trigrams = _trigrams(query), _trigrams(value)
+    return _name_similarity(query, query_trigrams, phonetic_key(query), value, len(value_trigrams),
+                            len(query_trigrams & value_trigrams), phonetic_key(value))
+
+@_timed
+def fuzzy_search_patients(lastname=None, firstname=None, middlename=None, suffix=None, birthday=None,
+                          address=None, limit=20):
+    """Find patients whose names are close to the given ones, best matches first.
+
+    Lastname and firstname are matched through the fuzzy index, middlename
+    only adds to the score; suffix, birthday and address filter the matches
+    as in search_patients. Each result is a copy of the patient record with
+    a 'match_score' between 0 and 1.
+    """
+    if not lastname and not firstname:
+        return []
+    index = _get_index(PATIENTS_FILE, 'patient_fuzzy', _build_patient_fuzzy_index)
+    return rank_fuzzy_matches(index, lastname, firstname, middlename, suffix, birthday, address, limit)
+
+def rank_fuzzy_matches(index, lastname=None, firstname=None, middlename=None, suffix=None, birthday=None,
+                       address=None, limit=20):
+    """Rank the patients of a fuzzy index against the search criteria, for fuzzy_search_patients"""
+    lastnames = _similar_names(index['fields']['lastname'], lastname) if lastname else None
+    firstnames = _similar_names(index['fields']['firstname'], firstname) if firstname else None
+    if lastnames is None:
+        # Only a firstname: every lastname carrying one of the similar firstnames
+        lastnames = [(None, name) for name in index['patients']]
+    
+    weights = {'lastname': 0.45, 'firstname': 0.4, 'middlename': 0.15}
+    candidates = []
+    for lastname_score, squashed_lastname in lastnames:
+        by_firstname = index['patients'].get(squashed_lastname, {})
+        if firstnames is None:
+            matches = [(None, patients) for patients in by_firstname.values()]
+        else:
+            matches = [(score, by_firstname[name]) for score, name in firstnames if name in by_firstname]
+        for firstname_score, patients in matches:
+            for patient in patients:
+                scores = {'lastname': lastname_score, 'firstname': firstname_score}
+                if middlename:
+                    scores['middlename'] = _field_similarity(middlename, patient.get('middlename'))
+                used = {field: score for field, score in scores.items() if score is not None}
+                total = sum(weights[field] * score for field, score in used.items())
+                candidates.append((total / sum(weights[field] for field in used), patient))
+    
+    results = []
+    for score, patient in sorted(candidates, key=lambda item: (-item[0], item[1].get('id', 0))):
+        if suffix and _normalize(patient.get('suffix')) != _normalize(suffix):
+            continue
+        if birthday and (patient.get('birthday') or '').strip() != birthday.strip():
+            continue
+        if address and address.lower().strip() not in (patient.get('address') or '').lower().strip():
+            continue
+        results.append(dict(patient, match_score=round(score, 3)))
+        if limit and len(results) >= limit:
+            break
+    return results
+
+# Name autocomplete. Each field keeps its distinct normalized names in a
+# sorted list, so the names starting with a prefix are one contiguous range
+# found by bisection. Suggestions are the most common names in the range.
+# Short prefixes cover large ranges and are typed the most, so their top
+# suggestions are cached on the index and dropped when a name under them is
+# added.
+AUTOCOMPLETE_FIELDS = ('lastname', 'firstname')
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_CACHED_PREFIX = 2
+
+def _build_name_prefix_index(patients: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """Sorted distinct names of active patients per field, with display forms and counts"""
+    index = {field: {'names': [], 'entries': {}, 'cache': {}, 'generation': 0} for field in AUTOCOMPLETE_FIELDS}
+    for patient in patients:
+        if not _is_active(patient):
+            continue
+        for field in AUTOCOMPLETE_FIELDS:
+            display = (patient.get(field) or '').strip()
+            entry = index[field]['entries'].setdefault(_normalize(display), [display, 0])
+            entry[1] += 1
+    for field in AUTOCOMPLETE_FIELDS:
+        index[field]['names'] = sorted(name for name in index[field]['entries'] if name)
+    return index
+
+def _add_to_name_prefix_index(index: Dict[str, Dict[str, Any]], patient: Dict):
+    """Count one patient record in the prefix index, dropping cached suggestions it changes"""
+    if not _is_active(patient):
+        return
+    for field in AUTOCOMPLETE_FIELDS:
+        display = (patient.get(field) or '').strip()
+        name = _normalize(display)
+        if not name:
+            continue
+        field_index = index[field]
+        entry = field_index['entries'].get(name)
+        if entry is None:
+            field_index['entries'][name] = [display, 1]
+            bisect.insort(field_index['names'], name)
+        else:
+            entry[1] += 1
+        field_index['generation'] += 1
+        for length in range(1, AUTOCOMPLETE_CACHED_PREFIX + 1):
+            field_index['cache'].pop(name[:length], None)
+
+_INDEX_UPDATERS['name_prefix'] = _add_to_name_prefix_index
+
+@_timed
+def autocomplete_patient_names(field: str, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Most common names of active patients starting with prefix, as {'name', 'count'} dicts"""
+    if field not in AUTOCOMPLETE_FIELDS:
+        raise ValueError(f"Autocomplete is not available for {field}")
+    prefix = _normalize(prefix)
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    if not prefix:
+        return []
+    
+    field_index = _get_index(PATIENTS_FILE, 'name_prefix', _build_name_prefix_index)[field]
+    cacheable = len(prefix) <= AUTOCOMPLETE_CACHED_PREFIX
+    with _cache_lock:
+        suggestions = field_index['cache'].get(prefix) if cacheable else None
+        if suggestions is not None:
+            return suggestions[:limit]
+        # Only the prefix range is copied under the lock; ranking it can take
+        # a while for a one-letter prefix, and every reader needs the lock
+        names = field_index['names']
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + '\uffff', start)
+        matching = names[start:end]
+        counted = [(name, display, count) for name, (display, count)
+                   in zip(matching, map(field_index['entries'].__getitem__, matching))]
+        generation = field_index['generation']
+    
+    top = heapq.nsmallest(AUTOCOMPLETE_MAX_LIMIT, counted, key=lambda item: (-item[2], item[0]))
+    suggestions = [{'name': display, 'count': count} for name, display, count in top]
+    if cacheable:
+        with _cache_lock:
+            # Unless a patient was counted in the meantime
+            if field_index['generation'] == generation:
+                field_index['cache'][prefix] = suggestions
+    return suggestions[:limit]
+
+@_timed
+def search_patients(lastname=None, firstname=None, middlename=None, suffix=None, birthday=None, address=None,
+                    fuzzy=False):
+    """Search for patients based on provided criteria.
+
+    With fuzzy=True names are matched approximately and results are ranked,
+    see fuzzy_search_patients.
+    """
+    if fuzzy:
+        return fuzzy_search_patients(lastname, firstname, middlename, suffix, birthday, address)
+    
+    if lastname and firstname and middlename:
+        # Exact name lookups are answered from the name index
+        index = _get_index(PATIENTS_FILE, 'patient_name', _build_patient_name_index)
+        name = (_normalize(lastname), _normalize(firstname), _normalize(middlename))
+        if suffix and birthday:
+            candidates = index['full'].get(name + (_normalize(suffix), birthday.strip()), [])
+        elif suffix:
+            candidates = index['suffix'].get(name + (_normalize(suffix),), [])
+        elif birthday:
+            candidates = index['birthday'].get(name + (birthday.strip(),), [])
+        else:
+            candidates = index['name'].get(name, [])
+        
+        if not address:
+            return list(candidates)
+        return [p for p in candidates if address.lower().strip() in p.get('address', '').lower().strip()]
+    
     patients = load_json_file(PATIENTS_FILE, [])
     
     # Filter active patients
@@ -468,105 +1688,525 @@ def search_patients(lastname=None, firstname=None, middlename=None, suffix=None,
     
     return results
 
+@_timed
 def get_all_patients():
     """Get all active patients from the database"""
     patients = load_json_file(PATIENTS_FILE, [])
     active_patients = [p for p in patients if p.get('status') == 'active']
     return sorted(active_patients, key=lambda x: (x.get('lastname', ''), x.get('firstname', '')))
 
+def _iter_sorted(index: Dict[str, Any], records: str, descending: bool = False, chunk: int = 500):
+    """Yield the records of a sorted index in key order without copying the index.
+
+    The index is read a chunk at a time under the cache lock, each chunk
+    resuming from the last key yielded, so records inserted in between are
+    neither repeated nor shift the walk.
+    """
+    last_key = None
+    while True:
+        with _cache_lock:
+            keys = index['keys']
+            if descending:
+                stop = len(keys) if last_key is None else bisect.bisect_left(keys, last_key)
+                start = max(0, stop - chunk)
+                batch = index[records][start:stop][::-1]
+                if batch:
+                    last_key = keys[start]
+            else:
+                start = 0 if last_key is None else bisect.bisect_right(keys, last_key)
+                batch = index[records][start:start + chunk]
+                if batch:
+                    last_key = keys[start + len(batch) - 1]
+        if not batch:
+            return
+        yield from batch
+
+def iter_all_patients():
+    """Iterate over the active patients in get_all_patients() order, straight from the name index.
+
+    The records are the cached ones, not copies.
+    """
+    index = _get_index(PATIENTS_FILE, 'patient_order:name',
+                       functools.partial(_build_sorted_index, key=PATIENT_ORDERS['name'], include=_is_active))
+    return _iter_sorted(index, 'records')
+
+@_timed
 def get_patient_by_id(patient_id):
     """Get a specific patient by ID"""
     try:
-        patients = load_json_file(PATIENTS_FILE, [])
-        for patient in patients:
-            if patient.get('id') == patient_id and patient.get('status') == 'active':
-                return patient
-        return None
+        return _get_index(PATIENTS_FILE, 'patient_by_id', _build_patient_by_id).get(patient_id)
     except Exception as e:
-        print(f"Error getting patient by ID: {str(e)}")
+        logger.error("Error getting patient by ID: %s", e)
         return None
 
+@_timed
 def get_import_history():
     """Get the history of data imports"""
     try:
         imports = load_json_file(IMPORTS_FILE, [])
         return sorted(imports, key=lambda x: x.get('import_date', ''), reverse=True)
     except Exception as e:
-        print(f"Error getting import history: {str(e)}")
+        logger.error("Error getting import history: %s", e)
         return []
 
+def _build_patient_summaries(appointments: List[Dict]) -> Dict[Any, Dict[str, Any]]:
+    """Appointment count and latest appointment date per patient id"""
+    index = {}
+    for appointment in appointments:
+        _add_to_patient_summaries(index, appointment)
+    return index
+
+def _add_to_patient_summaries(index: Dict[Any, Dict[str, Any]], appointment: Dict):
+    """Count one appointment in its patient's summary"""
+    summary = index.setdefault(appointment.get('patient_id'),
+                               {'appointment_count': 0, 'last_appointment_date': None})
+    summary['appointment_count'] += 1
+    appointment_date = appointment.get('appointment_date')
+    if appointment_date and (summary['last_appointment_date'] is None
+                             or appointment_date > summary['last_appointment_date']):
+        summary['last_appointment_date'] = appointment_date
+
+_INDEX_UPDATERS['patient_summaries'] = _add_to_patient_summaries
+
+@_timed
+def get_patient_summary(patient_id):
+    """An active patient with their appointment_count and last_appointment_date, or None.
+
+    The JSON counterpart of the patient_summary view; the aggregates are
+    kept up to date as appointments are added.
+    """
+    patient = _get_index(PATIENTS_FILE, 'patient_by_id', _build_patient_by_id).get(patient_id)
+    if patient is None:
+        return None
+    summaries = _get_index(APPOINTMENTS_FILE, 'patient_summaries', _build_patient_summaries)
+    with _cache_lock:
+        summary = summaries.get(patient_id, {'appointment_count': 0, 'last_appointment_date': None})
+        return dict(patient, **summary)
+
+@_timed
+def get_upcoming_appointments(limit=None, date_from=None, date_to=None):
+    """Scheduled appointments of active patients from today on, soonest first, with patient contact details.
+
+    The JSON counterpart of the upcoming_appointments view. date_from and
+    date_to narrow it to an inclusive window (never before today). Reads the
+    date-ordered appointment index from the window's start and stops after
+    `limit` appointments or past date_to.
+    """
+    today = datetime.now().date().isoformat()
+    start = max(date_from or today, today)
+    key = APPOINTMENT_ORDERS['date']
+    index = _get_index(APPOINTMENTS_FILE, 'appointment_order:date',
+                       functools.partial(_build_sorted_index, key=key, include=lambda record: True))
+    patient_lookup = _get_index(PATIENTS_FILE, 'patient_by_id', _build_patient_by_id)
+    
+    upcoming = []
+    with _cache_lock:
+        keys, records = index['keys'], index['records']
+        for position in range(bisect.bisect_left(keys, (start,)), len(keys)):
+            if limit is not None and len(upcoming) >= limit:
+                break
+            appointment = records[position]
+            if date_to and (appointment.get('appointment_date') or '') > date_to:
+                break
+            patient = patient_lookup.get(appointment.get('patient_id'))
+            if appointment.get('status') != 'scheduled' or patient is None:
+                continue
+            upcoming.append(dict(appointment, patient_name=_patient_full_name(patient),
+                                 patient_phone=patient.get('phone'), patient_email=patient.get('email')))
+    return upcoming
+
+# Dashboard counters over all patients and appointments; see stats.py
+_INDEX_UPDATERS['patient_stats'] = stats.add_patient
+_INDEX_UPDATERS['appointment_stats'] = stats.add_appointment
+
+@_timed
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Patient and appointment counts for the admin dashboard, read from counters kept on write"""
+    patient_counts = _get_index(PATIENTS_FILE, 'patient_stats', stats.build_patient_counts)
+    appointment_counts = _get_index(APPOINTMENTS_FILE, 'appointment_stats', stats.build_appointment_counts)
+    with _cache_lock:
+        return {
+            'patients': stats.patient_summary(patient_counts),
+            'appointments': stats.appointment_summary(appointment_counts)
+        }
+
+@_timed
 def get_appointments_by_patient_id(patient_id):
     """Get all appointments for a specific patient"""
     try:
-        appointments = load_json_file(APPOINTMENTS_FILE, [])
-        patient_appointments = [a for a in appointments if a.get('patient_id') == patient_id]
-        return sorted(patient_appointments, key=lambda x: x.get('appointment_date', ''), reverse=True)
+        index = _get_index(APPOINTMENTS_FILE, 'appointments_by_patient', _build_appointments_by_patient)
+        return list(index.get(patient_id, []))
     except Exception as e:
-        print(f"Error getting appointments: {str(e)}")
+        logger.error("Error getting appointments: %s", e)
         return []
 
+@_timed
 def create_appointment(patient_id, appointment_date, appointment_time='09:00', appointment_type='Consultation', 
                       reason='', doctor_name=''):
     """Create a new appointment for a patient"""
     try:
-        appointments = load_json_file(APPOINTMENTS_FILE, [])
-        
-        new_appointment = {
-            'id': get_next_id(appointments),
-            'patient_id': patient_id,
-            'appointment_date': appointment_date,
-            'appointment_time': appointment_time,
-            'type': appointment_type,
-            'reason': reason,
-            'status': 'scheduled',
-            'doctor_name': doctor_name,
-            'notes': '',
-            'created_at': datetime.now().isoformat()
-        }
-        
-        appointments.append(new_appointment)
+        with locked_data_file(APPOINTMENTS_FILE):
+            appointments = load_json_file(APPOINTMENTS_FILE, [], strict=True)
+            
+            schedule = _get_index(APPOINTMENTS_FILE, 'doctor_schedule', scheduling.build_index)
+            with _cache_lock:
+                conflict = scheduling.find_conflict(schedule, doctor_name, appointment_date, appointment_time,
+                                                    appointment_type)
+            if conflict:
+                return {'success': False, 'error': scheduling.conflict_message(conflict), 'conflict': conflict}
+            
+            new_appointment = AppointmentRecord(
+                id=_next_record_id(APPOINTMENTS_FILE),
+                patient_id=patient_id,
+                appointment_date=appointment_date,
+                appointment_time=appointment_time,
+                type=appointment_type,
+                reason=reason,
+                status='scheduled',
+                doctor_name=doctor_name,
+                notes='',
+                created_at=datetime.now().isoformat()
+            )
+            
+            appointments.append(new_appointment)
+            
+            if append_json_records(APPOINTMENTS_FILE, appointments, [new_appointment]):
+                return {'success': True, 'appointment_id': new_appointment['id']}
+            else:
+                return {'success': False, 'error': 'Failed to save appointment'}
         
-        if save_json_file(APPOINTMENTS_FILE, appointments):
-            return {'success': True, 'appointment_id': new_appointment['id']}
-        else:
-            return {'success': False, 'error': 'Failed to save appointment'}
+    except Exception as e:
+        logger.error("Error creating appointment: %s", e)
+        return {'success': False, 'error': str(e)}
+
+@_timed
+def create_appointments(records: List[Dict]) -> Dict[str, Any]:
+    """Create several appointments in one write.
+
+    Every record (patient_id, appointment_date, appointment_time, type,
+    reason, doctor_name) is checked against the same snapshot of patients
+    and doctor schedules, and against the records before it. 'results' has
+    one entry per record, in order: the new appointment's id, or the error
+    and, for a double booking, the conflict.
+    """
+    try:
+        with locked_data_file(APPOINTMENTS_FILE):
+            appointments = load_json_file(APPOINTMENTS_FILE, [], strict=True)
+            patients_by_id = _get_index(PATIENTS_FILE, 'patient_by_id', _build_patient_by_id)
+            schedule = _get_index(APPOINTMENTS_FILE, 'doctor_schedule', scheduling.build_index)
+            pending = scheduling.new_index()
+            next_id = _next_record_id(APPOINTMENTS_FILE)
+            now = datetime.now().isoformat()
+            results = []
+            new_appointments = []
+            
+            for fields in records:
+                error = scheduling.booking_error(fields)
+                if error:
+                    results.append({'success': False, 'error': error})
+                    continue
+                if fields['patient_id'] not in patients_by_id:
+                    results.append({'success': False, 'error': 'Patient not found'})
+                    continue
+                conflict_args = (fields.get('doctor_name'), fields['appointment_date'],
+                                 fields['appointment_time'], fields.get('type'))
+                with _cache_lock:
+                    conflict = (scheduling.find_conflict(schedule, *conflict_args)
+                                or scheduling.find_conflict(pending, *conflict_args))
+                if conflict:
+                    results.append({'success': False, 'error': scheduling.conflict_message(conflict),
+                                    'conflict': conflict})
+                    continue
+                
+                new_appointment = AppointmentRecord(fields, id=next_id, status='scheduled', notes='', created_at=now)
+                scheduling.add_appointment(pending, new_appointment)
+                new_appointments.append(new_appointment)
+                results.append({'success': True, 'appointment_id': next_id})
+                next_id += 1
+            
+            if new_appointments:
+                appointments.extend(new_appointments)
+                if not append_json_records(APPOINTMENTS_FILE, appointments, new_appointments):
+                    return {'success': False, 'error': 'Failed to save appointments'}
+            return {'success': True, 'results': results, 'created': len(new_appointments)}
         
     except Exception as e:
-        print(f"Error creating appointment: {str(e)}")
+        logger.error("Error creating appointments: %s", e)
         return {'success': False, 'error': str(e)}
 
+# Each doctor's booked intervals per day; see scheduling.py
+_INDEX_UPDATERS['doctor_schedule'] = scheduling.add_appointment
+
+@_timed
+def get_free_slots(date_from, date_to=None, doctor_name=None, appointment_type=None):
+    """Free start times for an appointment of the given type, per doctor and day.
+
+    Covers the named doctor, or else every doctor who takes the type (or
+    every doctor). Raises ValueError for an invalid date range.
+    """
+    dates = scheduling.date_range(date_from, date_to)
+    schedule = _get_index(APPOINTMENTS_FILE, 'doctor_schedule', scheduling.build_index)
+    with _cache_lock:
+        doctors = scheduling.candidate_doctors(schedule, doctor_name, appointment_type)
+        return scheduling.free_slots(schedule, dates, doctors, appointment_type)
+
+# The admin dashboard's joined, date-sorted appointment list is kept
+# materialized on the appointments cache entry. New appointments are inserted
+# in place as they are appended; new patients are joined in when the view is
+# next read, by walking the tail of the (append-only) patient list. A patients
+# file replaced by another process, e.g. to deactivate someone, is a new
+# object and rebuilds the view.
+def _appointment_view_key(appointment: Dict, seq: int) -> tuple:
+    """Ascending view key; reversed it gives newest date first, file order within a date"""
+    return (appointment.get('appointment_date', ''), -seq)
+
+def _build_appointment_view(appointments: List[Dict]) -> Dict[str, Any]:
+    """Join appointments with their active patients and sort them by date"""
+    patients = load_json_file(PATIENTS_FILE, [])
+    view = {
+        'patients': patients,
+        'patient_count': len(patients),
+        'lookup': _build_patient_by_id(patients),
+        'orphans': {},
+        'next_seq': len(appointments)
+    }
+    joined = []
+    for seq, appointment in enumerate(appointments):
+        row = _join_appointment(view, appointment, seq)
+        if row is not None:
+            joined.append((_appointment_view_key(appointment, seq), row))
+    joined.sort(key=lambda item: item[0])
+    view['keys'] = [key for key, row in joined]
+    view['rows'] = [row for key, row in joined]
+    return view
+
+def _join_appointment(view: Dict[str, Any], appointment: Dict, seq: int) -> Optional[Dict]:
+    """The appointment with its patient's name, or None (remembered as an orphan) if the patient is unknown"""
+    patient = view['lookup'].get(appointment.get('patient_id'))
+    if patient is None:
+        view['orphans'].setdefault(appointment.get('patient_id'), []).append((seq, appointment))
+        return None
+    appointment_copy = appointment.copy()
+    appointment_copy['patient_name'] = _patient_full_name(patient)
+    return appointment_copy
+
+def _insert_into_appointment_view(view: Dict[str, Any], appointment: Dict, seq: int):
+    """Join one appointment and insert it at its date position"""
+    row = _join_appointment(view, appointment, seq)
+    if row is not None:
+        key = _appointment_view_key(appointment, seq)
+        position = bisect.bisect_right(view['keys'], key)
+        view['keys'].insert(position, key)
+        view['rows'].insert(position, row)
+
+def _add_to_appointment_view(view: Dict[str, Any], appointment: Dict):
+    """Account for one appended appointment in the view"""
+    _insert_into_appointment_view(view, appointment, view['next_seq'])
+    view['next_seq'] += 1
+
+_INDEX_UPDATERS['appointment_view'] = _add_to_appointment_view
+
+def _current_appointment_view() -> Dict[str, Any]:
+    """The appointment view, joined against the current patient list"""
+    view = _get_index(APPOINTMENTS_FILE, 'appointment_view', _build_appointment_view)
+    patients = load_json_file(PATIENTS_FILE, [])
+    if view['patients'] is not patients:
+        # Joined against an older patient list: drop it and build it again the
+        # way every index is built, so appointments added meanwhile are kept
+        with _cache_lock:
+            entry = _cache.get(APPOINTMENTS_FILE)
+            if entry is not None and entry['indexes'].get('appointment_view') is view:
+                del entry['indexes']['appointment_view']
+        view = _get_index(APPOINTMENTS_FILE, 'appointment_view', _build_appointment_view)
+    
+    with _cache_lock:
+        for patient in patients[view['patient_count']:]:
+            patient_id = patient.get('id')
+            if _is_active(patient) and patient_id not in view['lookup']:
+                view['lookup'][patient_id] = patient
+                for seq, appointment in view['orphans'].pop(patient_id, []):
+                    _insert_into_appointment_view(view, appointment, seq)
+        view['patient_count'] = len(patients)
+    return view
+
+@_timed
 def get_all_appointments():
     """Get all appointments with patient information"""
     try:
-        appointments = load_json_file(APPOINTMENTS_FILE, [])
-        patients = load_json_file(PATIENTS_FILE, [])
-        
-        # Create a patient lookup dictionary
-        patient_lookup = {p['id']: p for p in patients if p.get('status') == 'active'}
-        
-        # Add patient names to appointments
-        enriched_appointments = []
-        for appointment in appointments:
-            patient_id = appointment.get('patient_id')
-            patient = patient_lookup.get(patient_id)
-            
-            if patient:
-                appointment_copy = appointment.copy()
-                patient_name_parts = [
-                    patient.get('firstname', ''),
-                    patient.get('middlename', ''),
-                    patient.get('lastname', ''),
-                    patient.get('suffix', '')
-                ]
-                appointment_copy['patient_name'] = ' '.join(filter(None, patient_name_parts))
-                enriched_appointments.append(appointment_copy)
-        
-        return sorted(enriched_appointments, key=lambda x: x.get('appointment_date', ''), reverse=True)
+        view = _current_appointment_view()
+        with _cache_lock:
+            return view['rows'][::-1]
         
     except Exception as e:
-        print(f"Error getting all appointments: {str(e)}")
+        logger.error("Error getting all appointments: %s", e)
         return []
 
+def iter_all_appointments():
+    """Iterate over the appointments in get_all_appointments() order, straight from the appointment view"""
+    return _iter_sorted(_current_appointment_view(), 'rows', descending=True)
+
+def _patient_full_name(patient: Dict) -> str:
+    """Display name of a patient: first, middle and last name plus suffix"""
+    patient_name_parts = [
+        patient.get('firstname', ''),
+        patient.get('middlename', ''),
+        patient.get('lastname', ''),
+        patient.get('suffix', '')
+    ]
+    return ' '.join(filter(None, patient_name_parts))
+
+def encode_cursor(key: tuple) -> str:
+    """Opaque page cursor for a sort key"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, like: Optional[tuple] = None) -> tuple:
+    """Sort key of a page cursor made by encode_cursor.
+
+    With like, a key of the order being paged (such as the order's key of an
+    empty record), the cursor must have the same length and element types.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, list):
+        raise ValueError('Invalid cursor')
+    if like is not None and (len(key) != len(like)
+                             or any(type(value) is not type(expected) for value, expected in zip(key, like))):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
+def _text_matches(record: Dict, fields: List[str], term: str) -> bool:
+    """Whether any of the fields contains term, ignoring case"""
+    return any(term in (record.get(field) or '').lower() for field in fields)
+
+# Filters whose matching totals are kept per sorted index
+MAX_CACHED_TOTALS = 64
+
+def _sorted_total(index: Dict[str, Any], matches, filter_key) -> int:
+    """Number of records in a sorted index passing matches.
+
+    filter_key identifies the filter, None meaning every record passes.
+    Counts are cached per filter until the next insert into the index, and
+    are taken over a snapshot of the records so writers are not held up.
+    """
+    with _cache_lock:
+        if filter_key is None:
+            return len(index['keys'])
+        generation = index['generation']
+        cached = index['totals'].get(filter_key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        records = list(index['records'])
+    
+    total = sum(1 for record in records if matches(record))
+    with _cache_lock:
+        if index['generation'] == generation:
+            if len(index['totals']) >= MAX_CACHED_TOTALS:
+                index['totals'].clear()
+            index['totals'][filter_key] = (generation, total)
+    return total
+
+def _sorted_page(index: Dict[str, Any], key, after: Optional[str], descending: bool,
+                 limit: Optional[int], matches, filter_key, render=None) -> Dict[str, Any]:
+    """Collect a page of matching records from a sorted index, starting after a cursor.
+
+    Only the records up to the end of the page are looked at; the total
+    comes from _sorted_total.
+    """
+    after_key = decode_cursor(after, key({})) if after else None
+    page = []
+    has_more = False
+    # Writers insert into the index under the cache lock
+    with _cache_lock:
+        keys, records = index['keys'], index['records']
+        try:
+            if descending:
+                stop = bisect.bisect_left(keys, after_key) if after else len(keys)
+                positions = range(stop - 1, -1, -1)
+            else:
+                start = bisect.bisect_right(keys, after_key) if after else 0
+                positions = range(start, len(keys))
+        except TypeError:
+            raise ValueError('Invalid cursor')
+        
+        for position in positions:
+            record = records[position]
+            if not matches(record):
+                continue
+            if limit is not None and len(page) >= limit:
+                has_more = True
+                break
+            page.append(record)
+    
+    return {
+        'data': [render(record) for record in page] if render else page,
+        'next_cursor': encode_cursor(key(page[-1])) if has_more and page else None,
+        'total': _sorted_total(index, matches, filter_key)
+    }
+
+PATIENT_SEARCH_FIELDS = ['lastname', 'firstname', 'middlename', 'address', 'phone', 'email']
+# Appointment searches also match the patient's name
+APPOINTMENT_SEARCH_FIELDS = ['type', 'reason', 'doctor_name']
+
+@_timed
+def get_patients_page(limit=None, after=None, q=None, order_by='name', descending=False):
+    """Get a page of active patients in a stable order, optionally filtered by a search term.
+
+    Returns the page under 'data', the cursor to pass as `after` for the next
+    page (None on the last page) and the number of matching patients.
+    """
+    if order_by not in PATIENT_ORDERS:
+        raise ValueError(f"Unknown sort order: {order_by}")
+    key = PATIENT_ORDERS[order_by]
+    index = _get_index(PATIENTS_FILE, f'patient_order:{order_by}',
+                       functools.partial(_build_sorted_index, key=key, include=_is_active))
+    term = (q or '').strip().lower()
+    
+    def matches(patient):
+        return not term or _text_matches(patient, PATIENT_SEARCH_FIELDS, term)
+    
+    return _sorted_page(index, key, after, descending, limit, matches, term or None)
+
+@_timed
+def get_appointments_page(limit=None, after=None, q=None, order_by='date', descending=True,
+                          status=None, date_from=None, date_to=None):
+    """Get a page of appointments of active patients with patient names, newest first by default.
+
+    Besides the search term, appointments can be filtered by status and by
+    an inclusive appointment_date range.
+    """
+    if order_by not in APPOINTMENT_ORDERS:
+        raise ValueError(f"Unknown sort order: {order_by}")
+    key = APPOINTMENT_ORDERS[order_by]
+    index = _get_index(APPOINTMENTS_FILE, f'appointment_order:{order_by}',
+                       functools.partial(_build_sorted_index, key=key, include=lambda record: True))
+    # Which appointments match also depends on the patients, so their
+    # version is part of the filter; it is read before the lookup it covers
+    patients_version = _file_version(PATIENTS_FILE)
+    patient_lookup = _get_index(PATIENTS_FILE, 'patient_by_id', _build_patient_by_id)
+    term = (q or '').strip().lower()
+    
+    def matches(appointment):
+        patient = patient_lookup.get(appointment.get('patient_id'))
+        if not patient:
+            return False
+        appointment_date = appointment.get('appointment_date') or ''
+        if status and appointment.get('status') != status:
+            return False
+        if (date_from and appointment_date < date_from) or (date_to and appointment_date > date_to):
+            return False
+        return (not term or term in _patient_full_name(patient).lower()
+                or _text_matches(appointment, APPOINTMENT_SEARCH_FIELDS, term))
+    
+    def render(appointment):
+        patient = patient_lookup[appointment['patient_id']]
+        return dict(appointment, patient_name=_patient_full_name(patient))
+    
+    filter_key = (patients_version, term, status, date_from, date_to)
+    return _sorted_page(index, key, after, descending, limit, matches, filter_key, render)
+
 if __name__ == '__main__':
     # Initialize database when script is run directly
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     init_database()
\ No newline at end of file
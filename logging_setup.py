@@ -0,0 +1,132 @@
+"""Structured, non-blocking logging for the web app.
+
+configure_logging() routes every log record through a bounded in-memory
+queue to a background thread that formats and writes it, so request
+threads never wait on stdout. Records are written one JSON object per
+line (or as plain text with LOG_FORMAT=text); anything passed in `extra`
+becomes a field of its own. When the queue is full, records are dropped
+and counted rather than blocking the caller.
+
+Settings, from the environment:
+
+- LOG_LEVEL: root level, INFO by default
+- LOG_FORMAT: 'json' (default) or 'text'
+- LOG_REQUESTS: set to 1 to log every request and the search parameters it
+  used at DEBUG on the 'hospital.requests' logger; off by default
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+REQUEST_LOGGER = 'hospital.requests'
+QUEUE_SIZE = 10000
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments into the message here; formatting is left
+        # to the listener thread. Exception info is rendered now, since
+        # tracebacks cannot cross to another thread.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: the stop signal must not be dropped on a full queue
+        self.queue.put(self._sentinel)
+
+
+def configure_logging(level=None, format=None, log_requests=None, stream=None) -> DroppingQueueHandler:
+    """Install the queue handler on the root logger and start the writer thread.
+
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    format = format or os.environ.get('LOG_FORMAT', 'json')
+    if log_requests is None:
+        log_requests = os.environ.get('LOG_REQUESTS', '').lower() in ('1', 'true', 'yes')
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if format == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger()
+        for existing in [h for h in root.handlers if isinstance(h, DroppingQueueHandler)]:
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        # Per-request output is opt-in, whatever the root level
+        logging.getLogger(REQUEST_LOGGER).setLevel(logging.DEBUG if log_requests else logging.WARNING)
+        _listener = _Listener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+    return handler
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,171 @@
+"""In-process metrics, rendered in the Prometheus text exposition format.
+
+Histograms are created once at import time with histogram() and observed
+from any thread. Values that already live elsewhere (cache counters, file
+sizes) are registered as callbacks with collector() and read when the
+metrics are rendered, so they cost nothing between scrapes.
+
+The metrics are per process: with several workers, each one reports its
+own and Prometheus sums them.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Seconds; from a cached lookup up to a full rewrite of a large data file
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List[Any] = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    """{name="value",...} with values escaped as the text format requires"""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        """Record one observation for the given label values"""
+        position = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            position += 1
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts, then the running sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the duration of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self) -> Dict[tuple, Dict[str, Any]]:
+        """Per label values: count, sum and the cumulative bucket counts"""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        result = {}
+        for labels, values in series.items():
+            cumulative, running = [], 0
+            for count in values[:-1]:
+                running += count
+                cumulative.append(running)
+            result[labels] = {'count': running, 'sum': values[-1], 'buckets': cumulative}
+        return result
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.snapshot().items()):
+            for bound, count in zip(self.buckets + (float('inf'),), series['buckets']):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, labels, le)} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, labels)} {series["count"]}')
+        return lines
+
+
+class Collector:
+    """A counter or gauge whose values are read from a callback at render time"""
+
+    def __init__(self, name: str, help: str, type: str, labels: Sequence[str],
+                 collect: Callable[[], Any]):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f'{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}')
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        for existing in _registry:
+            if existing.name == metric.name:
+                return existing
+        _registry.append(metric)
+    return metric
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """The registered histogram with this name, created on first use"""
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def collector(name: str, help: str, type: str = 'gauge', labels: Sequence[str] = (),
+              collect: Optional[Callable[[], Any]] = None) -> Collector:
+    """Register a callback-backed counter or gauge.
+
+    collect returns a single number, or a dict of label value tuples to
+    numbers.
+    """
+    return _register(Collector(name, help, type, labels, collect))
+
+
+def timed(metric: Histogram, *label_values):
+    """Decorator that observes every call's duration in metric"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start, *label_values)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        try:
+            lines.extend(metric.render())
+        except Exception as e:  # a failing callback must not take the endpoint down
+            lines.append(f'# {metric.name} unavailable: {e}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,189 @@
+"""Compact in-memory records for the JSON store.
+
+Patients and appointments are held as slotted objects instead of dicts: each
+known field is a slot, so a record costs a fixed handful of pointers rather
+than a hash table, and repeated strings (names, status, blood type,
+timestamps, ...) are interned so every record shares one copy. Records
+behave like dicts for reading and writing; they only become real dicts at
+the JSON boundary, through to_dict or the to_json hook.
+"""
+import operator
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Optional
+
+
+# Value of a slot whose field the record does not have, so that every slot
+# is always set and reads never go through AttributeError. Ellipsis never
+# occurs in JSON data, and marshal can store it, so the binary file format
+# keeps rows of slot values as they are.
+_ABSENT = ...
+
+
+class CompactRecord(MutableMapping):
+    """A dict-like record that keeps its known fields in slots.
+
+    Subclasses list their fields in __slots__ and, in INTERNED, the
+    categorical string fields whose few distinct values are worth sharing. A field that was never set is absent, just like a
+    missing dict key; keys outside the known fields go to a small overflow
+    dict.
+    """
+    __slots__ = ('_extra',)
+    FIELDS: tuple = ()
+    INTERNED: frozenset = frozenset()
+    _field_set: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__dict__.get('__slots__', ()))
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._values = operator.attrgetter(*cls.FIELDS)
+
+    def __init__(self, data: Any = (), **fields):
+        self._clear()
+        items = data.items() if hasattr(data, 'items') else data
+        for key, value in items:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def _clear(self):
+        for name in self.FIELDS:
+            setattr(self, name, _ABSENT)
+        self._extra = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CompactRecord':
+        """Build a record from a parsed JSON object"""
+        record = cls.__new__(cls)
+        interned = cls.INTERNED
+        get = data.get
+        for name in cls.FIELDS:
+            value = get(name, _ABSENT)
+            if type(value) is str and name in interned:
+                value = sys.intern(value)
+            setattr(record, name, value)
+        record._extra = None
+        if not cls._field_set.issuperset(data):
+            record._extra = {key: value for key, value in data.items() if key not in cls._field_set}
+        return record
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> 'CompactRecord':
+        """Build a record from its values in FIELDS order, Ellipsis marking an absent field"""
+        record = cls.__new__(cls)
+        for name, value in zip(cls.FIELDS, values):
+            setattr(record, name, value)
+        record._extra = None
+        return record
+
+    def to_values(self) -> Optional[tuple]:
+        """The record's values in FIELDS order, Ellipsis marking an absent field, or None if it has extra keys"""
+        return None if self._extra else self._values(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record as a plain dict, fields first and extra keys after"""
+        result = {name: value for name, value in zip(self.FIELDS, self._values(self)) if value is not _ABSENT}
+        if self._extra:
+            result.update(self._extra)
+        return result
+
+    def copy(self) -> 'CompactRecord':
+        """A shallow copy of the same record type"""
+        record = self.__class__.__new__(self.__class__)
+        for name, value in zip(self.FIELDS, self._values(self)):
+            setattr(record, name, value)
+        record._extra = dict(self._extra) if self._extra else None
+        return record
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is not _ABSENT:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is _ABSENT else value
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return getattr(self, key) is not _ABSENT
+        return self._extra is not None and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            if key in self.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._field_set and getattr(self, key) is not _ABSENT:
+            setattr(self, key, _ABSENT)
+        elif key not in self._field_set and self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for name, value in zip(self.FIELDS, self._values(self)):
+            if value is not _ABSENT:
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for value in self._values(self) if value is not _ABSENT) + len(self._extra or ())
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._clear()
+        for key, value in state.items():
+            self[key] = value
+
+
+class PatientRecord(CompactRecord):
+    """A patient in the JSON store"""
+    __slots__ = ('id', 'lastname', 'firstname', 'middlename', 'suffix', 'birthday', 'address',
+                 'phone', 'email', 'emergency_contact_name', 'emergency_contact_phone',
+                 'medical_history', 'allergies', 'blood_type', 'created_at', 'updated_at',
+                 'is_new', 'status')
+    INTERNED = frozenset(['suffix', 'blood_type', 'status'])
+
+
+class AppointmentRecord(CompactRecord):
+    """An appointment in the JSON store"""
+    __slots__ = ('id', 'patient_id', 'appointment_date', 'appointment_time', 'type', 'reason',
+                 'status', 'doctor_name', 'notes', 'created_at')
+    INTERNED = frozenset(['appointment_time', 'type', 'status', 'doctor_name'])
+
+
+def compact_records(record_type, records: Iterable[Any]) -> list:
+    """Convert the dicts in a list of records to record_type, in place"""
+    for i, record in enumerate(records):
+        if type(record) is dict:
+            records[i] = record_type.from_dict(record)
+    return records
+
+
+def to_json(value: Any) -> Dict[str, Any]:
+    """json.dump default hook that writes records as plain objects"""
+    if isinstance(value, CompactRecord):
+        return value.to_dict()
+    raise TypeError(f'Object of type {value.__class__.__name__} is not JSON serializable')
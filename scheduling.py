@@ -0,0 +1,209 @@
+"""Doctor schedules: appointment lengths, double-booking checks and free slots.
+
+Both storage backends keep their appointments in a schedule index: a dict
+of each doctor's booked intervals per day, keyed by (doctor key, date), so
+checking a booking or listing a day's free slots only looks at that one
+day however many years of appointments are on file. The index also
+remembers each doctor's display name and which doctors have taken each
+appointment type.
+
+Times are minutes since midnight. An appointment lasts
+APPOINTMENT_DURATIONS[type] minutes from its appointment_time; cancelled
+appointments and ones without a doctor or a readable time do not block
+anything.
+"""
+import bisect
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# One entry per type offered by the appointment screens (APPOINTMENT_TYPES
+# in src/screens/AppointmentDashboard.tsx)
+APPOINTMENT_DURATIONS = {
+    'Consultation': 30,
+    'Laboratory': 30,
+    'Follow-up': 30,
+    'Imaging': 60,
+    'Admission': 60,
+    'Vaccination': 30,
+    'Surgery': 120,
+    'Other': 30,
+}
+DEFAULT_DURATION = 30
+
+# Clinic hours and the grid free slots are offered on
+DAY_START = '08:00'
+DAY_END = '17:00'
+SLOT_MINUTES = 30
+WORKING_DAYS = {0, 1, 2, 3, 4, 5}  # Monday to Saturday
+
+# Longest date range one free-slot query may cover
+MAX_RANGE_DAYS = 62
+
+FREE_STATUSES = {'cancelled'}
+
+
+def doctor_key(name: Optional[str]) -> str:
+    """Normalized doctor name the index is keyed on, as lower(trim(name)) in SQL"""
+    return (name or '').lower().strip()
+
+
+def parse_time(value: str) -> int:
+    """Minutes since midnight of an HH:MM time; ValueError if it is not one"""
+    parsed = datetime.strptime(value.strip(), '%H:%M')
+    return parsed.hour * 60 + parsed.minute
+
+
+def format_time(minutes: int) -> str:
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def duration(appointment_type: Optional[str]) -> int:
+    """Length in minutes of an appointment of the given type"""
+    return APPOINTMENT_DURATIONS.get(appointment_type, DEFAULT_DURATION)
+
+
+def new_index() -> Dict[str, Any]:
+    return {'days': {}, 'doctors': {}, 'types': {}}
+
+
+def add_appointment(index: Dict[str, Any], appointment: Dict):
+    """Add an appointment's interval to the index, if it blocks its doctor's time"""
+    key = doctor_key(appointment.get('doctor_name'))
+    if not key:
+        return
+    index['doctors'].setdefault(key, appointment['doctor_name'].strip())
+    index['types'].setdefault(appointment.get('type'), set()).add(key)
+    if appointment.get('status') in FREE_STATUSES:
+        return
+    try:
+        start = parse_time(appointment.get('appointment_time') or '')
+    except ValueError:
+        return
+    day = index['days'].setdefault((key, appointment.get('appointment_date')), [])
+    bisect.insort(day, (start, start + duration(appointment.get('type')), appointment.get('id') or 0))
+
+
+def build_index(appointments) -> Dict[str, Any]:
+    index = new_index()
+    for appointment in appointments:
+        add_appointment(index, appointment)
+    return index
+
+
+def _overlapping(day: List[tuple], start: int, end: int) -> Optional[tuple]:
+    """The first booked interval of a day that overlaps [start, end), if any"""
+    # Intervals are sorted by start; only the ones starting before end can
+    # overlap, and an appointment is at most a few hours long
+    for interval in day[:bisect.bisect_left(day, (end,))]:
+        if interval[1] > start:
+            return interval
+    return None
+
+
+def find_conflict(index: Dict[str, Any], doctor_name: Optional[str], appointment_date: str,
+                  appointment_time: str, appointment_type: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The booked appointment a new one would overlap, or None if the doctor is free.
+
+    Raises ValueError for an unreadable time when a doctor is given.
+    """
+    key = doctor_key(doctor_name)
+    if not key:
+        return None
+    start = parse_time(appointment_time)
+    interval = _overlapping(index['days'].get((key, appointment_date), []), start,
+                            start + duration(appointment_type))
+    if interval is None:
+        return None
+    return {
+        'appointment_id': interval[2],
+        'doctor_name': index['doctors'].get(key, doctor_name),
+        'appointment_date': appointment_date,
+        'start': format_time(interval[0]),
+        'end': format_time(interval[1])
+    }
+
+
+def conflict_message(conflict: Dict[str, Any]) -> str:
+    return (f"{conflict['doctor_name']} is already booked from {conflict['start']} to {conflict['end']} "
+            f"on {conflict['appointment_date']}")
+
+
+# Appointment fields that must be text when given
+BOOKING_TEXT_FIELDS = ['appointment_date', 'appointment_time', 'type', 'reason', 'doctor_name']
+
+
+def booking_error(fields: Dict) -> Optional[str]:
+    """Why an appointment's fields cannot be booked as given, or None if they can"""
+    patient_id = fields.get('patient_id')
+    if not patient_id or not fields.get('appointment_date'):
+        return 'Missing patient_id or appointment_date'
+    if not isinstance(patient_id, int) or isinstance(patient_id, bool):
+        return 'patient_id must be an integer'
+    for field in BOOKING_TEXT_FIELDS:
+        if fields.get(field) is not None and not isinstance(fields[field], str):
+            return f'{field} must be a string'
+    try:
+        datetime.strptime(fields['appointment_date'], '%Y-%m-%d')
+    except ValueError:
+        return 'Invalid date format. Please use YYYY-MM-DD format.'
+    try:
+        parse_time(fields.get('appointment_time') or '')
+    except ValueError:
+        return 'Invalid time format. Please use HH:MM format.'
+    return None
+
+
+def date_range(date_from: str, date_to: Optional[str] = None) -> List[str]:
+    """The YYYY-MM-DD dates from date_from to date_to inclusive; ValueError if invalid"""
+    try:
+        first = date.fromisoformat(date_from)
+        last = date.fromisoformat(date_to) if date_to else first
+    except (TypeError, ValueError):
+        raise ValueError('Invalid date format. Please use YYYY-MM-DD format.')
+    if last < first:
+        raise ValueError('date_to is before date_from')
+    if (last - first).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'Date ranges are limited to {MAX_RANGE_DAYS} days')
+    return [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+
+def candidate_doctors(index: Dict[str, Any], doctor_name: Optional[str] = None,
+                      appointment_type: Optional[str] = None) -> List[tuple]:
+    """(key, display name) of the doctors a free-slot query covers.
+
+    The doctor named, else the doctors who have taken appointments of the
+    type, else every doctor on file.
+    """
+    if doctor_name:
+        key = doctor_key(doctor_name)
+        return [(key, index['doctors'].get(key, doctor_name.strip()))]
+    if appointment_type:
+        keys = index['types'].get(appointment_type, ())
+    else:
+        keys = index['doctors']
+    return sorted((key, index['doctors'][key]) for key in keys)
+
+
+def free_slots(index: Dict[str, Any], dates: List[str], doctors: List[tuple], appointment_type: Optional[str] = None,
+               now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Open start times per doctor and working day, for an appointment of the given type.
+
+    Slots start on the SLOT_MINUTES grid within clinic hours and must end by
+    DAY_END; slots already in the past are left out.
+    """
+    now = now or datetime.now()
+    today = now.date().isoformat()
+    length = duration(appointment_type)
+    grid = range(parse_time(DAY_START), parse_time(DAY_END) - length + 1, SLOT_MINUTES)
+    results = []
+    for day in dates:
+        if day < today or date.fromisoformat(day).weekday() not in WORKING_DAYS:
+            continue
+        earliest = now.hour * 60 + now.minute if day == today else 0
+        for key, name in doctors:
+            booked = index['days'].get((key, day), [])
+            slots = [format_time(start) for start in grid
+                     if start >= earliest and _overlapping(booked, start, start + length) is None]
+            if slots:
+                results.append({'doctor_name': name, 'date': day, 'slots': slots})
+    return results
@@ -0,0 +1,196 @@
+"""On-disk formats for the JSON store's data files.
+
+A data file is written in one of three formats, optionally gzip-compressed:
+
+- 'json': indented JSON, easy to read and edit by hand (the default)
+- 'compact': JSON without whitespace, written by the C encoder
+- 'binary': a marshal-encoded table of field names and value rows
+
+Readers never need to be told the format: gzip and binary files are
+recognized by their leading bytes, anything else is read as JSON. A store
+can therefore switch formats at any time; each file is converted the next
+time it is written.
+
+The binary format stores a list of records as one list of field names and
+one tuple of values per record, with Ellipsis for a field the record does
+not have. marshal keeps interned strings shared, so repeated names and
+statuses are written once, and loads them back interned. Anything that is
+not a list of objects is stored as its marshalled value. marshal's format
+is tied to the Python version that reads it; use 'json' or 'compact' for
+files that have to travel.
+"""
+import gc
+import gzip
+import io
+import json
+import marshal
+from contextlib import contextmanager
+from typing import Any, List
+
+FORMATS = ('json', 'compact', 'binary')
+COMPRESSIONS = ('none', 'gzip')
+
+BINARY_MAGIC = b'OIMSREC1'
+GZIP_MAGIC = b'\x1f\x8b'
+GZIP_LEVEL = 6
+CHUNK = 1000
+
+_indented_encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+_compact_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def to_plain(item: Any) -> Any:
+    """A record as a plain dict; anything else unchanged"""
+    to_dict = getattr(item, 'to_dict', None)
+    return to_dict() if to_dict is not None else item
+
+
+def _json_chunks(data: Any, encoder: json.JSONEncoder, separator: str, closing: str):
+    """Encode data as encoder.encode would, converting list items to dicts a chunk at a time.
+
+    Records are converted in chunks rather than through a default hook,
+    which would run every emitted token through extra generator layers, and
+    without holding dict copies of the whole list.
+    """
+    if not isinstance(data, list) or not data:
+        yield encoder.encode(data)
+        return
+    opening = '['
+    for start in range(0, len(data), CHUNK):
+        chunk = [to_plain(item) for item in data[start:start + CHUNK]]
+        # Drop the chunk's own brackets; its items are already laid out as
+        # items of a top-level list
+        yield opening + encoder.encode(chunk)[1:-len(closing)]
+        opening = separator
+    yield closing
+
+
+def _encode_binary(data: Any) -> bytes:
+    """Marshal data, as a field table when it is a list of records"""
+    if not isinstance(data, list) or not all(hasattr(item, 'keys') for item in data):
+        return BINARY_MAGIC + marshal.dumps({'value': data})
+    if data and hasattr(data[0], 'to_values'):
+        # Records of one type already hold their values as a row
+        record_type = type(data[0])
+        rows = [item.to_values() if type(item) is record_type else None for item in data]
+        if None not in rows:
+            return BINARY_MAGIC + marshal.dumps({'fields': list(record_type.FIELDS), 'rows': rows})
+    fields: List[str] = []
+    positions = {}
+    for item in data:
+        for key in item.keys():
+            if key not in positions:
+                positions[key] = len(fields)
+                fields.append(key)
+    rows = []
+    for item in data:
+        get = item.get
+        rows.append(tuple([get(field, ...) for field in fields]))
+    return BINARY_MAGIC + marshal.dumps({'fields': fields, 'rows': rows})
+
+
+def _decode_binary(payload: bytes, record_type=None) -> Any:
+    """Undo _encode_binary, building record_type objects for a field table when given"""
+    table = marshal.loads(payload[len(BINARY_MAGIC):])
+    if 'value' in table:
+        return table['value']
+    fields, rows = table['fields'], table['rows']
+    if record_type is not None:
+        if tuple(fields) == record_type.FIELDS:
+            return [record_type.from_values(row) for row in rows]
+        if set(fields) <= set(record_type.FIELDS):
+            order = [fields.index(name) if name in fields else None for name in record_type.FIELDS]
+            return [record_type.from_values([... if i is None else row[i] for i in order]) for row in rows]
+        return [record_type.from_dict({field: value for field, value in zip(fields, row) if value is not ...})
+                for row in rows]
+    return [{field: value for field, value in zip(fields, row) if value is not ...} for row in rows]
+
+
+def dump(data: Any, f, format: str = 'json', compression: str = 'none'):
+    """Write data to the binary file object f in the given format and compression"""
+    if format not in FORMATS:
+        raise ValueError(f'Unknown data format: {format}')
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'Unknown compression: {compression}')
+
+    out = f
+    if compression == 'gzip':
+        out = gzip.GzipFile(fileobj=f, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+    try:
+        if format == 'binary':
+            out.write(_encode_binary(data))
+        else:
+            if format == 'json':
+                chunks = _json_chunks(data, _indented_encoder, ',', '\n]')
+            else:
+                chunks = _json_chunks(data, _compact_encoder, ',', ']')
+            for chunk in chunks:
+                out.write(chunk.encode('utf-8'))
+    finally:
+        if out is not f:
+            out.close()
+
+
+def detect(f) -> tuple:
+    """The (format, compression) of the file object f, read from its first bytes.
+
+    JSON files are reported as 'json' whether indented or not.
+    """
+    head = f.read(len(BINARY_MAGIC))
+    f.seek(0)
+    if head.startswith(GZIP_MAGIC):
+        with gzip.GzipFile(fileobj=f, mode='rb') as inner:
+            head = inner.read(len(BINARY_MAGIC))
+        f.seek(0)
+        return ('binary' if head == BINARY_MAGIC else 'json'), 'gzip'
+    return ('binary' if head == BINARY_MAGIC else 'json'), 'none'
+
+
+@contextmanager
+def _gc_paused():
+    """Hold off cyclic garbage collection while building a large, acyclic structure.
+
+    Every object allocated while decoding survives, so the collections that
+    the allocations would trigger find nothing and only get slower as the
+    structure grows.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load(f, record_type=None) -> Any:
+    """Read data written by dump from the binary file object f, in whichever format it is.
+
+    Lists of objects come back as record_type objects when record_type is
+    given, as dicts otherwise.
+    """
+    payload = f.read()
+    if payload.startswith(GZIP_MAGIC):
+        payload = gzip.decompress(payload)
+    with _gc_paused():
+        if payload.startswith(BINARY_MAGIC):
+            return _decode_binary(payload, record_type)
+        data = json.loads(payload)
+        if record_type is not None and isinstance(data, list):
+            for i, item in enumerate(data):
+                if type(item) is dict:
+                    data[i] = record_type.from_dict(item)
+        return data
+
+
+def load_file(path: str, record_type=None) -> Any:
+    """load() the file at path"""
+    with open(path, 'rb') as f:
+        return load(f, record_type)
+
+
+def dumps(data: Any, format: str = 'json', compression: str = 'none') -> bytes:
+    """dump() to bytes"""
+    buffer = io.BytesIO()
+    dump(data, buffer, format, compression)
+    return buffer.getvalue()
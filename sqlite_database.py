@@ -0,0 +1,1113 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+import database
+import metrics
+import scheduling
+import stats
+
+logger = logging.getLogger(__name__)
+
+# SQLite storage backend. It implements the same functions as database.py on
+# top of an embedded database using the schema from
+# supabase/migrations/20250708020100_copper_truth.sql, so app.py can switch
+# between the two with the DATABASE_BACKEND setting.
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(database.DATA_DIR, 'hospital.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lastname TEXT NOT NULL,
+    firstname TEXT NOT NULL,
+    middlename TEXT,
+    suffix TEXT,
+    birthday TEXT NOT NULL,
+    address TEXT,
+    phone TEXT,
+    email TEXT,
+    emergency_contact_name TEXT,
+    emergency_contact_phone TEXT,
+    medical_history TEXT,
+    allergies TEXT,
+    blood_type TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    is_new INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'active'
+);
+
+-- Searches compare trimmed, lowercased names, so the name index is built on
+-- the same expressions for the planner to use it
+CREATE INDEX IF NOT EXISTS idx_name ON patients (
+    lower(trim(lastname)), lower(trim(firstname)), lower(trim(coalesce(middlename, '')))
+);
+CREATE INDEX IF NOT EXISTS idx_firstname ON patients (lower(trim(firstname)));
+CREATE INDEX IF NOT EXISTS idx_birthday ON patients (birthday);
+CREATE INDEX IF NOT EXISTS idx_patients_status ON patients (status);
+CREATE INDEX IF NOT EXISTS idx_phone ON patients (phone);
+CREATE INDEX IF NOT EXISTS idx_email ON patients (email);
+-- Keyset pagination walks these in listing order
+CREATE INDEX IF NOT EXISTS idx_patients_list_name ON patients (status, lastname, firstname, id);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER NOT NULL REFERENCES patients (id) ON DELETE CASCADE,
+    appointment_date TEXT NOT NULL,
+    appointment_time TEXT DEFAULT '09:00',
+    type TEXT DEFAULT 'Consultation',
+    reason TEXT,
+    status TEXT DEFAULT 'scheduled',
+    doctor_name TEXT,
+    notes TEXT,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_patient_id ON appointments (patient_id);
+-- A patient's appointments come back newest first straight from this index
+CREATE INDEX IF NOT EXISTS idx_patient_appointment_date ON appointments (patient_id, appointment_date);
+CREATE INDEX IF NOT EXISTS idx_appointment_date ON appointments (appointment_date);
+CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments (status);
+CREATE INDEX IF NOT EXISTS idx_doctor ON appointments (doctor_name);
+-- One doctor's appointments on one day, for the double-booking check
+CREATE INDEX IF NOT EXISTS idx_doctor_day ON appointments (lower(trim(doctor_name)), appointment_date);
+CREATE INDEX IF NOT EXISTS idx_appointments_list_date ON appointments (
+    appointment_date, coalesce(appointment_time, ''), id
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    import_date TEXT,
+    records_imported INTEGER DEFAULT 0,
+    import_type TEXT NOT NULL,
+    status TEXT DEFAULT 'completed',
+    rows_processed INTEGER DEFAULT 0,
+    error_count INTEGER DEFAULT 0,
+    bytes_read INTEGER DEFAULT 0,
+    total_bytes INTEGER,
+    started_at TEXT,
+    updated_at TEXT,
+    finished_at TEXT,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_date ON imports (import_date);
+
+-- Change counters for in-process caches and response ETags built from
+-- these tables. Inserts are detected from the AUTOINCREMENT sequence (or
+-- max(id)); updates and deletes bump the counter.
+CREATE TABLE IF NOT EXISTS generations (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO generations (name, value)
+    VALUES ('patients_changed', 0), ('appointments_changed', 0), ('imports_changed', 0);
+CREATE TRIGGER IF NOT EXISTS patients_updated AFTER UPDATE ON patients BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'patients_changed';
+END;
+CREATE TRIGGER IF NOT EXISTS patients_deleted AFTER DELETE ON patients BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'patients_changed';
+END;
+CREATE TRIGGER IF NOT EXISTS appointments_updated AFTER UPDATE ON appointments BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'appointments_changed';
+END;
+CREATE TRIGGER IF NOT EXISTS appointments_deleted AFTER DELETE ON appointments BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'appointments_changed';
+END;
+CREATE TRIGGER IF NOT EXISTS imports_updated AFTER UPDATE ON imports BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'imports_changed';
+END;
+CREATE TRIGGER IF NOT EXISTS imports_deleted AFTER DELETE ON imports BEGIN
+    UPDATE generations SET value = value + 1 WHERE name = 'imports_changed';
+END;
+CREATE INDEX IF NOT EXISTS idx_import_type ON imports (import_type);
+"""
+
+PATIENT_COLUMNS = [
+    'id', 'lastname', 'firstname', 'middlename', 'suffix', 'birthday', 'address', 'phone', 'email',
+    'emergency_contact_name', 'emergency_contact_phone', 'medical_history', 'allergies', 'blood_type',
+    'created_at', 'updated_at', 'is_new', 'status'
+]
+APPOINTMENT_COLUMNS = [
+    'id', 'patient_id', 'appointment_date', 'appointment_time', 'type', 'reason', 'status',
+    'doctor_name', 'notes', 'created_at'
+]
+IMPORT_COLUMNS = [
+    'id', 'filename', 'import_date', 'records_imported', 'import_type', 'status',
+    'rows_processed', 'error_count', 'bytes_read', 'total_bytes', 'started_at', 'updated_at',
+    'finished_at', 'error'
+]
+# Import progress columns added after the first schema, with their types
+IMPORT_PROGRESS_COLUMNS = {
+    'rows_processed': 'INTEGER DEFAULT 0',
+    'error_count': 'INTEGER DEFAULT 0',
+    'bytes_read': 'INTEGER DEFAULT 0',
+    'total_bytes': 'INTEGER',
+    'started_at': 'TEXT',
+    'updated_at': 'TEXT',
+    'finished_at': 'TEXT',
+    'error': 'TEXT'
+}
+
+# Statements are kept as constants and always run with bound parameters, so
+# sqlite3's per-connection statement cache prepares each of them only once.
+INSERT_PATIENT = (
+    f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS[1:])}) "
+    f"VALUES ({', '.join('?' for _ in PATIENT_COLUMNS[1:])})"
+)
+INSERT_APPOINTMENT = (
+    f"INSERT INTO appointments ({', '.join(APPOINTMENT_COLUMNS[1:])}) "
+    f"VALUES ({', '.join('?' for _ in APPOINTMENT_COLUMNS[1:])})"
+)
+INSERT_IMPORT = (
+    f"INSERT INTO imports ({', '.join(IMPORT_COLUMNS[1:])}) "
+    f"VALUES ({', '.join('?' for _ in IMPORT_COLUMNS[1:])})"
+)
+SELECT_PATIENT_BY_NAME = (
+    "SELECT * FROM patients WHERE status = 'active' "
+    "AND lower(trim(lastname)) = ? AND lower(trim(firstname)) = ? "
+    "AND lower(trim(coalesce(middlename, ''))) = ? ORDER BY id"
+)
+
+_local = threading.local()
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's connection to the SQLite database"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(SQLITE_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(SQLITE_PATH, timeout=30, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        _local.conn = conn
+    return conn
+
+def _timed(function):
+    """Record the durations of calls to a storage function"""
+    return metrics.timed(database.STORAGE_CALL_SECONDS, 'sqlite', function.__name__)(function)
+
+def _database_file_sizes() -> Dict[tuple, int]:
+    """Sizes of the database file and its write-ahead log, keyed by (file, kind)"""
+    sizes = {}
+    for kind, path in (('database', SQLITE_PATH), ('wal', SQLITE_PATH + '-wal')):
+        if os.path.exists(path):
+            sizes[(os.path.basename(SQLITE_PATH), kind)] = os.path.getsize(path)
+    return sizes
+
+metrics.collector('sqlite_file_size_bytes', 'Size of the SQLite database and its write-ahead log',
+                  labels=['file', 'kind'], collect=_database_file_sizes)
+
+def storage_status() -> Dict[str, Any]:
+    """Check that the database answers queries, timing a count of each table"""
+    problems = []
+    tables = {}
+    start = time.perf_counter()
+    try:
+        conn = get_connection()
+        for table in ('patients', 'appointments', 'imports'):
+            tables[table] = {'records': conn.execute(f'SELECT count(*) FROM {table}').fetchone()[0]}
+    except sqlite3.Error as e:
+        problems.append(f'{os.path.basename(SQLITE_PATH)}: {e}')
+    elapsed = time.perf_counter() - start
+    return {
+        'status': 'error' if problems else 'ok',
+        'backend': 'sqlite',
+        'problems': problems,
+        'files': {kind: size for (name, kind), size in _database_file_sizes().items()},
+        'tables': tables,
+        'last_load': {'seconds': round(elapsed, 6), 'finished_at': datetime.now().isoformat()}
+    }
+
+@_timed
+def data_version(*tables) -> Dict[str, Any]:
+    """Identify the current contents of the given tables without reading them.
+
+    Same result shape as database.data_version(): the etag is built from each
+    table's insert sequence and change counter.
+    """
+    for table in tables:
+        if table not in database.TABLE_FILES:
+            raise ValueError(f'Unknown table: {table}')
+    counters = dict(get_connection().execute(
+        'SELECT name, seq FROM sqlite_sequence UNION ALL SELECT name, value FROM generations'
+    ).fetchall())
+    versions = [(counters.get(table), counters.get(f'{table}_changed')) for table in tables]
+    # The inode tells a replaced database file apart from the one counted
+    stats = [os.stat(path) for path in (SQLITE_PATH, SQLITE_PATH + '-wal') if os.path.exists(path)]
+    digest = hashlib.blake2b(repr((stats[0].st_ino, versions)).encode(), digest_size=8).hexdigest()
+    return {'etag': f'sqlite-{digest}', 'last_modified': max(st.st_mtime for st in stats)}
+
+def _patient_values(patient: Dict[str, Any]) -> tuple:
+    """Column values of a patient record in INSERT_PATIENT order"""
+    return tuple(patient.get(column) for column in PATIENT_COLUMNS[1:])
+
+def init_database():
+    """Create the SQLite schema if it does not exist yet.
+
+    Unlike the JSON backend no dummy data is inserted; run
+    `python sqlite_database.py migrate` to copy the existing data/*.json
+    records over.
+    """
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        _add_import_progress_columns(conn)
+    logger.info("Database initialized")
+
+def _add_import_progress_columns(conn: sqlite3.Connection):
+    """Add the import progress columns to databases created before they existed"""
+    existing = {row['name'] for row in conn.execute('PRAGMA table_info(imports)')}
+    for column, definition in IMPORT_PROGRESS_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE imports ADD COLUMN {column} {definition}")
+
+@_timed
+def add_patient(lastname, firstname, middlename=None, suffix=None, birthday=None, address=None, 
+                phone=None, email=None, emergency_contact_name=None, emergency_contact_phone=None,
+                medical_history=None, allergies=None, blood_type=None):
+    """Add a new patient to the database with enhanced fields"""
+    try:
+        now = datetime.now().isoformat()
+        new_patient = {
+            'lastname': lastname,
+            'firstname': firstname,
+            'middlename': middlename,
+            'suffix': suffix,
+            'birthday': birthday,
+            'address': address,
+            'phone': phone,
+            'email': email,
+            'emergency_contact_name': emergency_contact_name,
+            'emergency_contact_phone': emergency_contact_phone,
+            'medical_history': medical_history,
+            'allergies': allergies,
+            'blood_type': blood_type,
+            'created_at': now,
+            'updated_at': now,
+            'is_new': 1,
+            'status': 'active'
+        }
+        
+        conn = get_connection()
+        with conn:
+            cursor = conn.execute(INSERT_PATIENT, _patient_values(new_patient))
+        new_patient = {'id': cursor.lastrowid, **new_patient}
+        logger.info("Added patient %s", new_patient['id'], extra={'patient_id': new_patient['id']})
+        return {'success': True, 'patient': new_patient, 'patient_id': new_patient['id']}
+        
+    except Exception as e:
+        logger.error("Error adding patient: %s", e)
+        return {'success': False, 'error': str(e)}
+
+def _find_patient(conn: sqlite3.Connection, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The active patient a new patient with these fields would duplicate; see database._find_patient"""
+    rows = conn.execute(SELECT_PATIENT_BY_NAME, (
+        _normalize(fields.get('lastname')), _normalize(fields.get('firstname')), _normalize(fields.get('middlename'))
+    ))
+    for row in rows:
+        if (row['birthday'] or '').strip() != (fields.get('birthday') or '').strip():
+            continue
+        if fields.get('suffix') and _normalize(row['suffix']) != _normalize(fields['suffix']):
+            continue
+        return dict(row)
+    return None
+
+@_timed
+def add_patients(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add several patients in one transaction; see database.add_patients"""
+    try:
+        conn = get_connection()
+        now = datetime.now().isoformat()
+        results = []
+        with conn:
+            # Hold the write lock from the first check to the commit
+            conn.execute('BEGIN IMMEDIATE')
+            for fields in records:
+                # Rows inserted earlier in the batch are visible to the query
+                existing = _find_patient(conn, fields)
+                if existing is not None:
+                    results.append({
+                        'success': False,
+                        'error': 'A patient with the same details already exists',
+                        'existing_id': existing['id']
+                    })
+                    continue
+                new_patient = {**fields, 'created_at': now, 'updated_at': now, 'is_new': 1, 'status': 'active'}
+                cursor = conn.execute(INSERT_PATIENT, _patient_values(new_patient))
+                new_patient = {'id': cursor.lastrowid, **new_patient}
+                results.append({'success': True, 'patient': new_patient, 'patient_id': new_patient['id']})
+        created = sum(result['success'] for result in results)
+        if created:
+            logger.info("Added %d patients", created, extra={'patient_ids': [
+                result['patient_id'] for result in results if result['success']]})
+        return {'success': True, 'results': results, 'created': created}
+        
+    except Exception as e:
+        logger.error("Error adding patients: %s", e)
+        return {'success': False, 'error': str(e)}
+
+@_timed
+def add_patient_if_absent(**fields) -> Dict[str, Any]:
+    """Add a patient unless the same person is on file, in one transaction; see database.add_patient_if_absent"""
+    outcome = add_patients([fields])
+    if not outcome['success']:
+        return outcome
+    result = outcome['results'][0]
+    if not result['success']:
+        return {'success': False, 'error': result['error'], 'duplicate': True, 'existing_id': result['existing_id']}
+    return result
+
+def _existing_import_keys(conn: sqlite3.Connection, birthdays: set) -> set:
+    """Collect the import keys of the stored patients, active or not, born on any of the given days.
+
+    The birthday index narrows the lookup; the keys themselves are compared
+    in Python because SQLite's lower() only folds ASCII letters.
+    """
+    if not birthdays:
+        return set()
+    rows = conn.execute(
+        f"SELECT lastname, firstname, middlename, birthday FROM patients "
+        f"WHERE birthday IN ({', '.join('?' for _ in birthdays)})",
+        list(birthdays)
+    )
+    return {database.patient_import_key(dict(row)) for row in rows}
+
+def _commit_import_batch(conn: sqlite3.Connection, batch: List[tuple], now: str, duplicate_message: str,
+                         add_error) -> int:
+    """De-duplicate and insert one batch of parsed (row, label, patient) patients in a single transaction.
+
+    Returns how many were added.
+    """
+    with conn:
+        # Hold the write lock from the duplicate check to the commit, so a
+        # concurrent import or registration cannot insert the same patient
+        conn.execute('BEGIN IMMEDIATE')
+        existing_keys = _existing_import_keys(conn, {patient.get('birthday') for row, label, patient in batch})
+        new_patients = []
+        for row, label, patient in batch:
+            try:
+                # Check if patient already exists, on file or earlier in this batch
+                key = database.patient_import_key(patient)
+                if key in existing_keys:
+                    add_error(row, f"{label}: {duplicate_message}")
+                    continue
+                new_patients.append(dict(patient, created_at=now, updated_at=now, is_new=0, status='active'))
+                existing_keys.add(key)
+            except Exception as e:
+                add_error(row, f"{label}: {str(e)}")
+        conn.executemany(INSERT_PATIENT, [_patient_values(record) for record in new_patients])
+    return len(new_patients)
+
+def _import_patients(conn: sqlite3.Connection, rows, reader, import_id: int, duplicate_message: str,
+                     batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Insert parsed, de-duplicated patient rows in batches, reporting progress to the import history.
+
+    `rows` yields the (label, patient_data, error) tuples produced by the
+    database.iter_*_patients parsers.
+    """
+    batch_size = batch_size or database.IMPORT_BATCH_SIZE
+    now = datetime.now().isoformat()
+    imported_count = 0
+    rows_processed = 0
+    reported_rows = 0
+    total_errors = 0
+    errors = []
+    batch = []
+    
+    def add_error(row, message):
+        nonlocal total_errors
+        total_errors += 1
+        database._keep_import_errors(errors, [(row, message)])
+    
+    def progress():
+        return {
+            'records_imported': imported_count,
+            'rows_processed': rows_processed,
+            'error_count': total_errors,
+            'bytes_read': reader.bytes_read
+        }
+    
+    try:
+        for label, patient, error in rows:
+            rows_processed += 1
+            if error:
+                add_error(rows_processed, f"{label}: {error}")
+            else:
+                batch.append((rows_processed, label, patient))
+            
+            if len(batch) >= batch_size:
+                imported_count += _commit_import_batch(conn, batch, now, duplicate_message, add_error)
+                batch = []
+            if rows_processed - reported_rows >= batch_size:
+                update_import_record(import_id, **progress())
+                reported_rows = rows_processed
+        
+        if batch:
+            imported_count += _commit_import_batch(conn, batch, now, duplicate_message, add_error)
+    except Exception as e:
+        # Batches committed before the failure stay imported
+        update_import_record(import_id, status='failed', error=str(e),
+                             finished_at=datetime.now().isoformat(), **progress())
+        return {
+            'success': False,
+            'error': str(e),
+            'import_id': import_id,
+            'imported_count': imported_count,
+            'errors': database._import_error_messages(errors)
+        }
+    
+    update_import_record(import_id, status='completed', finished_at=datetime.now().isoformat(), **progress())
+    
+    return {
+        'success': True,
+        'import_id': import_id,
+        'imported_count': imported_count,
+        'errors': database._import_error_messages(errors),
+        'total_errors': total_errors
+    }
+
+def create_import_record(filename: str, import_type: str, status: str = 'running',
+                         total_bytes: Optional[int] = None) -> int:
+    """Add an entry to the import history and return its id"""
+    conn = get_connection()
+    now = datetime.now().isoformat()
+    with conn:
+        cursor = conn.execute(INSERT_IMPORT, (
+            filename, now, 0, import_type, status, 0, 0, 0, total_bytes,
+            now if status == 'running' else None, now, None, None
+        ))
+    return cursor.lastrowid
+
+def update_import_record(import_id: int, **fields) -> bool:
+    """Update the status or progress fields of an import history entry"""
+    fields['updated_at'] = datetime.now().isoformat()
+    columns = [column for column in fields if column in IMPORT_COLUMNS[1:]]
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute(
+            f"UPDATE imports SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+            [fields[column] for column in columns] + [import_id]
+        )
+    return cursor.rowcount > 0
+
+@_timed
+def get_import_job(import_id):
+    """Get an import history entry with its progress, or None if it does not exist"""
+    try:
+        row = get_connection().execute('SELECT * FROM imports WHERE id = ?', (import_id,)).fetchone()
+        return database.import_job_progress(dict(row)) if row else None
+    except Exception as e:
+        logger.error("Error getting import job: %s", e)
+        return None
+
+def _run_import(source, parse, import_type: str, filename: Optional[str], duplicate_message: str,
+                batch_size: Optional[int] = None, import_id: Optional[int] = None) -> Dict[str, Any]:
+    """Import patients from a file path or binary stream with one of the database.iter_*_patients parsers"""
+    try:
+        with database._open_import_source(source) as stream:
+            total_bytes = database._source_size(source, stream)
+            if import_id is None:
+                import_id = create_import_record(filename or database._source_name(source), import_type,
+                                                 total_bytes=total_bytes)
+            else:
+                update_import_record(import_id, status='running', total_bytes=total_bytes,
+                                     started_at=datetime.now().isoformat())
+            reader = database._CountingReader(stream)
+            return _import_patients(get_connection(), parse(reader), reader, import_id,
+                                    duplicate_message, batch_size)
+    except Exception as e:
+        if import_id is not None:
+            try:
+                update_import_record(import_id, status='failed', error=str(e),
+                                     finished_at=datetime.now().isoformat())
+            except Exception:
+                pass
+        return {
+            'success': False,
+            'error': str(e),
+            'import_id': import_id,
+            'imported_count': 0,
+            'errors': []
+        }
+
+@_timed
+def import_patients_from_csv(source, filename=None, batch_size=None, import_id=None):
+    """Import patients from a CSV file path or binary stream"""
+    return _run_import(source, database.iter_csv_patients, 'csv', filename,
+                       'Patient already exists', batch_size, import_id)
+
+@_timed
+def import_patients_from_json(source, filename=None, batch_size=None, import_id=None):
+    """Import patients from a JSON file path or binary stream"""
+    return _run_import(source, database.iter_json_patients, 'json', filename,
+                       'Already exists', batch_size, import_id)
+
+# Fuzzy search runs on database.py's in-memory trigram/phonetic index, built
+# from the patients table and kept in sync with it: new rows (id above the
+# highest one indexed) are added incrementally, any update or delete
+# rebuilds it.
+_fuzzy_index = {'changed': None, 'max_id': 0, 'index': None}
+_fuzzy_lock = threading.Lock()
+
+def _patient_fuzzy_index(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """The fuzzy index over the current active patients"""
+    changed = conn.execute("SELECT value FROM generations WHERE name = 'patients_changed'").fetchone()[0]
+    with _fuzzy_lock:
+        if _fuzzy_index['index'] is None or _fuzzy_index['changed'] != changed:
+            _fuzzy_index.update(changed=changed, max_id=0, index=database._build_patient_fuzzy_index([]))
+        for row in conn.execute('SELECT * FROM patients WHERE id > ? ORDER BY id', (_fuzzy_index['max_id'],)):
+            database._add_to_patient_fuzzy_index(_fuzzy_index['index'], dict(row))
+            _fuzzy_index['max_id'] = row['id']
+        return _fuzzy_index['index']
+
+@_timed
+def fuzzy_search_patients(lastname=None, firstname=None, middlename=None, suffix=None, birthday=None,
+                          address=None, limit=20):
+    """Find patients whose names are close to the given ones, best matches first"""
+    if not lastname and not firstname:
+        return []
+    index = _patient_fuzzy_index(get_connection())
+    return database.rank_fuzzy_matches(index, lastname, firstname, middlename, suffix, birthday, address, limit)
+
+# Autocomplete suggestions come from a range scan of the normalized name
+# indexes. Results for short prefixes are cached until the patients table
+# changes (a new max id or a bump of the patients_changed counter).
+_autocomplete_cache = {'version': None, 'suggestions': {}}
+_autocomplete_lock = threading.Lock()
+
+@_timed
+def autocomplete_patient_names(field: str, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Most common names of active patients starting with prefix, as {'name', 'count'} dicts"""
+    if field not in database.AUTOCOMPLETE_FIELDS:
+        raise ValueError(f"Autocomplete is not available for {field}")
+    prefix = _normalize(prefix)
+    limit = max(1, min(limit, database.AUTOCOMPLETE_MAX_LIMIT))
+    if not prefix:
+        return []
+    
+    conn = get_connection()
+    cacheable = len(prefix) <= database.AUTOCOMPLETE_CACHED_PREFIX
+    if cacheable:
+        version = tuple(conn.execute(
+            "SELECT (SELECT max(id) FROM patients), value FROM generations WHERE name = 'patients_changed'"
+        ).fetchone())
+        with _autocomplete_lock:
+            if _autocomplete_cache['version'] != version:
+                _autocomplete_cache.update(version=version, suggestions={})
+            suggestions = _autocomplete_cache['suggestions'].get((field, prefix))
+        if suggestions is not None:
+            return suggestions[:limit]
+    
+    # field is one of AUTOCOMPLETE_FIELDS, so the statement text stays constant
+    # per field. The unary + keeps the planner on the name index range scan
+    # instead of walking every active patient through the status index.
+    normalized = f"lower(trim({field}))"
+    rows = conn.execute(
+        f"SELECT trim({field}) AS name, min(id), COUNT(*) AS count FROM patients "
+        f"WHERE +status = 'active' AND {normalized} >= ? AND {normalized} < ? "
+        f"GROUP BY {normalized} ORDER BY count DESC, {normalized} LIMIT ?",
+        (prefix, prefix + '\uffff', database.AUTOCOMPLETE_MAX_LIMIT)
+    )
+    suggestions = [{'name': row['name'], 'count': row['count']} for row in rows]
+    if cacheable:
+        with _autocomplete_lock:
+            if _autocomplete_cache['version'] == version:
+                _autocomplete_cache['suggestions'][(field, prefix)] = suggestions
+    return suggestions[:limit]
+
+@_timed
+def search_patients(lastname=None, firstname=None, middlename=None, suffix=None, birthday=None, address=None,
+                    fuzzy=False):
+    """Search for patients based on provided criteria"""
+    if fuzzy:
+        return fuzzy_search_patients(lastname, firstname, middlename, suffix, birthday, address)
+    if lastname and firstname and middlename:
+        sql = SELECT_PATIENT_BY_NAME
+        params = [_normalize(lastname), _normalize(firstname), _normalize(middlename)]
+    else:
+        clauses = ["status = 'active'"]
+        params = []
+        for column, value in (('lastname', lastname), ('firstname', firstname), ('middlename', middlename)):
+            if value:
+                clauses.append(f"lower(trim(coalesce({column}, ''))) = ?")
+                params.append(_normalize(value))
+        sql = f"SELECT * FROM patients WHERE {' AND '.join(clauses)} ORDER BY id"
+    
+    results = []
+    for row in get_connection().execute(sql, params):
+        patient = dict(row)
+        if suffix and _normalize(patient.get('suffix')) != _normalize(suffix):
+            continue
+        if birthday and (patient.get('birthday') or '').strip() != birthday.strip():
+            continue
+        if address and address.lower().strip() not in (patient.get('address') or '').lower().strip():
+            continue
+        results.append(patient)
+    return results
+
+def _normalize(value: Optional[str]) -> str:
+    """Normalize a name field the way patient searches compare it"""
+    return (value or '').lower().strip()
+
+@_timed
+def get_all_patients():
+    """Get all active patients from the database"""
+    return list(iter_all_patients())
+
+def iter_all_patients():
+    """Yield the active patients one at a time, in get_all_patients() order"""
+    rows = get_connection().execute(
+        "SELECT * FROM patients WHERE status = 'active' ORDER BY lastname, firstname"
+    )
+    for row in rows:
+        yield dict(row)
+
+@_timed
+def get_patient_by_id(patient_id):
+    """Get a specific patient by ID"""
+    try:
+        row = get_connection().execute(
+            "SELECT * FROM patients WHERE id = ? AND status = 'active'", (patient_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    except Exception as e:
+        logger.error("Error getting patient by ID: %s", e)
+        return None
+
+@_timed
+def get_import_history():
+    """Get the history of data imports"""
+    try:
+        rows = get_connection().execute('SELECT * FROM imports ORDER BY import_date DESC')
+        return [dict(row) for row in rows]
+    except Exception as e:
+        logger.error("Error getting import history: %s", e)
+        return []
+
+@_timed
+def get_appointments_by_patient_id(patient_id):
+    """Get all appointments for a specific patient"""
+    try:
+        rows = get_connection().execute(
+            'SELECT * FROM appointments WHERE patient_id = ? ORDER BY appointment_date DESC', (patient_id,)
+        )
+        return [dict(row) for row in rows]
+    except Exception as e:
+        logger.error("Error getting appointments: %s", e)
+        return []
+
+@_timed
+def get_patient_summary(patient_id):
+    """An active patient with their appointment_count and last_appointment_date, or None"""
+    row = get_connection().execute(
+        "SELECT p.*, (SELECT count(*) FROM appointments a WHERE a.patient_id = p.id) AS appointment_count, "
+        "(SELECT max(appointment_date) FROM appointments a WHERE a.patient_id = p.id) AS last_appointment_date "
+        "FROM patients p WHERE p.id = ? AND p.status = 'active'", (patient_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+@_timed
+def get_upcoming_appointments(limit=None, date_from=None, date_to=None):
+    """Scheduled appointments of active patients from today on; see database.get_upcoming_appointments"""
+    today = datetime.now().date().isoformat()
+    # The unary + keeps the planner off idx_appointments_status
+    conditions = ["a.appointment_date >= ?", "+a.status = 'scheduled'", "p.status = 'active'"]
+    params: List[Any] = [max(date_from or today, today)]
+    if date_to:
+        conditions.append("a.appointment_date <= ?")
+        params.append(date_to)
+    # CROSS JOIN keeps appointments as the outer loop; ordered like
+    # idx_appointments_list_date, the rows come straight off that index and
+    # reading stops at the limit
+    sql = (
+        "SELECT a.*, p.firstname, p.middlename, p.lastname, p.suffix, p.phone, p.email "
+        "FROM appointments a CROSS JOIN patients p ON p.id = a.patient_id "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY a.appointment_date, coalesce(a.appointment_time, ''), a.id"
+    )
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    upcoming = []
+    for row in get_connection().execute(sql, params):
+        appointment = {column: row[column] for column in APPOINTMENT_COLUMNS}
+        appointment.update(patient_name=_patient_name(row), patient_phone=row['phone'], patient_email=row['email'])
+        upcoming.append(appointment)
+    return upcoming
+
+@_timed
+def create_appointment(patient_id, appointment_date, appointment_time='09:00', appointment_type='Consultation', 
+                      reason='', doctor_name=''):
+    """Create a new appointment for a patient"""
+    try:
+        conn = get_connection()
+        with conn:
+            # Take the write lock before checking, so no other booking can
+            # land between the check and the insert
+            conn.execute('BEGIN IMMEDIATE')
+            if scheduling.doctor_key(doctor_name):
+                rows = conn.execute(
+                    f"SELECT {SCHEDULE_COLUMNS} FROM appointments "
+                    "WHERE lower(trim(doctor_name)) = ? AND appointment_date = ?",
+                    (scheduling.doctor_key(doctor_name), appointment_date)
+                )
+                conflict = scheduling.find_conflict(scheduling.build_index(dict(row) for row in rows), doctor_name,
+                                                    appointment_date, appointment_time, appointment_type)
+                if conflict:
+                    return {'success': False, 'error': scheduling.conflict_message(conflict), 'conflict': conflict}
+            cursor = conn.execute(INSERT_APPOINTMENT, (
+                patient_id, appointment_date, appointment_time, appointment_type, reason,
+                'scheduled', doctor_name, '', datetime.now().isoformat()
+            ))
+        return {'success': True, 'appointment_id': cursor.lastrowid}
+        
+    except Exception as e:
+        logger.error("Error creating appointment: %s", e)
+        return {'success': False, 'error': str(e)}
+
+# The doctors on file and the appointment types each has taken, for
+# free-slot queries that do not name a doctor. Kept in sync like the fuzzy
+# index: new rows are added incrementally, any update or delete rebuilds it.
+# Booked intervals are read per query from the date range asked for.
+SCHEDULE_COLUMNS = 'id, doctor_name, type, status, appointment_date, appointment_time'
+_doctor_index = {'changed': None, 'max_id': 0, 'index': None}
+_doctor_lock = threading.Lock()
+
+def _doctor_types(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """The scheduling index's doctors and types over the whole appointments table"""
+    changed = conn.execute("SELECT value FROM generations WHERE name = 'appointments_changed'").fetchone()[0]
+    with _doctor_lock:
+        if _doctor_index['index'] is None or _doctor_index['changed'] != changed:
+            _doctor_index.update(changed=changed, max_id=0, index=scheduling.new_index())
+        index = _doctor_index['index']
+        for row in conn.execute('SELECT id, doctor_name, type FROM appointments WHERE id > ? ORDER BY id',
+                                (_doctor_index['max_id'],)):
+            key = scheduling.doctor_key(row['doctor_name'])
+            if key:
+                index['doctors'].setdefault(key, row['doctor_name'].strip())
+                index['types'].setdefault(row['type'], set()).add(key)
+            _doctor_index['max_id'] = row['id']
+        return {'doctors': dict(index['doctors']), 'types': {t: set(keys) for t, keys in index['types'].items()}}
+
+@_timed
+def get_free_slots(date_from, date_to=None, doctor_name=None, appointment_type=None):
+    """Free start times for an appointment of the given type, per doctor and day"""
+    dates = scheduling.date_range(date_from, date_to)
+    conn = get_connection()
+    query = f"SELECT {SCHEDULE_COLUMNS} FROM appointments WHERE appointment_date BETWEEN ? AND ?"
+    params = [dates[0], dates[-1]]
+    if doctor_name:
+        query += " AND lower(trim(doctor_name)) = ?"
+        params.append(scheduling.doctor_key(doctor_name))
+    schedule = scheduling.build_index(dict(row) for row in conn.execute(query, params))
+    schedule.update(_doctor_types(conn))
+    doctors = scheduling.candidate_doctors(schedule, doctor_name, appointment_type)
+    return scheduling.free_slots(schedule, dates, doctors, appointment_type)
+
+@_timed
+def create_appointments(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create several appointments in one transaction; see database.create_appointments"""
+    try:
+        conn = get_connection()
+        now = datetime.now().isoformat()
+        results = []
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            errors = [scheduling.booking_error(record) for record in records]
+            bookable = [record for record, error in zip(records, errors) if not error]
+            patient_ids = {record['patient_id'] for record in bookable}
+            active = {row[0] for row in conn.execute(
+                f"SELECT id FROM patients WHERE status = 'active' AND id IN ({', '.join('?' for _ in patient_ids)})",
+                list(patient_ids)
+            )}
+            # The booked days of every doctor in the batch, read once
+            schedule = scheduling.new_index()
+            for key, appointment_date in {(scheduling.doctor_key(record.get('doctor_name')), record['appointment_date'])
+                                          for record in bookable}:
+                if key:
+                    for row in conn.execute(
+                        f"SELECT {SCHEDULE_COLUMNS} FROM appointments "
+                        "WHERE lower(trim(doctor_name)) = ? AND appointment_date = ?", (key, appointment_date)
+                    ):
+                        scheduling.add_appointment(schedule, dict(row))
+            
+            for record, error in zip(records, errors):
+                if error:
+                    results.append({'success': False, 'error': error})
+                    continue
+                if record['patient_id'] not in active:
+                    results.append({'success': False, 'error': 'Patient not found'})
+                    continue
+                conflict = scheduling.find_conflict(schedule, record.get('doctor_name'), record['appointment_date'],
+                                                    record['appointment_time'], record.get('type'))
+                if conflict:
+                    results.append({'success': False, 'error': scheduling.conflict_message(conflict),
+                                    'conflict': conflict})
+                    continue
+                cursor = conn.execute(INSERT_APPOINTMENT, (
+                    record['patient_id'], record['appointment_date'], record['appointment_time'], record.get('type'),
+                    record.get('reason'), 'scheduled', record.get('doctor_name'), '', now
+                ))
+                # Later records in the batch are checked against this one too
+                scheduling.add_appointment(schedule, {**record, 'id': cursor.lastrowid, 'status': 'scheduled'})
+                results.append({'success': True, 'appointment_id': cursor.lastrowid})
+        return {'success': True, 'results': results, 'created': sum(result['success'] for result in results)}
+        
+    except Exception as e:
+        logger.error("Error creating appointments: %s", e)
+        return {'success': False, 'error': str(e)}
+
+# Dashboard counters, kept in sync per table like the fuzzy index: new rows
+# are counted incrementally, any update or delete recounts the table.
+_stats_counts = {
+    'patients': {'changed': None, 'max_id': 0, 'counts': None, 'build': stats.new_patient_counts,
+                 'add': stats.add_patient, 'columns': 'id, status, is_new'},
+    'appointments': {'changed': None, 'max_id': 0, 'counts': None, 'build': stats.new_appointment_counts,
+                     'add': stats.add_appointment, 'columns': 'id, appointment_date, type, doctor_name, status'}
+}
+_stats_lock = threading.Lock()
+
+def _table_counts(conn: sqlite3.Connection, table: str) -> Dict[str, Any]:
+    """The current stats counters of a table; call with _stats_lock held"""
+    entry = _stats_counts[table]
+    changed = conn.execute("SELECT value FROM generations WHERE name = ?", (f'{table}_changed',)).fetchone()[0]
+    if entry['counts'] is None or entry['changed'] != changed:
+        entry.update(changed=changed, max_id=0, counts=entry['build']())
+    for row in conn.execute(f"SELECT {entry['columns']} FROM {table} WHERE id > ? ORDER BY id", (entry['max_id'],)):
+        entry['add'](entry['counts'], dict(row))
+        entry['max_id'] = row['id']
+    return entry['counts']
+
+@_timed
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Patient and appointment counts for the admin dashboard"""
+    conn = get_connection()
+    with _stats_lock:
+        return {
+            'patients': stats.patient_summary(_table_counts(conn, 'patients')),
+            'appointments': stats.appointment_summary(_table_counts(conn, 'appointments'))
+        }
+
+def _patient_name(row: sqlite3.Row) -> str:
+    """Full display name from the patient columns of a joined row"""
+    parts = [row['firstname'], row['middlename'], row['lastname'], row['suffix']]
+    return ' '.join(filter(None, parts))
+
+@_timed
+def get_all_appointments():
+    """Get all appointments with patient information"""
+    try:
+        return list(iter_all_appointments())
+        
+    except Exception as e:
+        logger.error("Error getting all appointments: %s", e)
+        return []
+
+def iter_all_appointments():
+    """Yield the appointments one at a time, in get_all_appointments() order"""
+    rows = get_connection().execute(
+        "SELECT a.*, p.firstname, p.middlename, p.lastname, p.suffix "
+        "FROM appointments a JOIN patients p ON p.id = a.patient_id "
+        "WHERE p.status = 'active' ORDER BY a.appointment_date DESC"
+    )
+    for row in rows:
+        appointment = {column: row[column] for column in APPOINTMENT_COLUMNS}
+        appointment['patient_name'] = _patient_name(row)
+        yield appointment
+
+# Sort expressions for the listing orders of database.PATIENT_ORDERS and
+# database.APPOINTMENT_ORDERS; NULLs sort as '' just like in the JSON backend.
+PATIENT_ORDER_COLUMNS = {
+    'name': ['lastname', 'firstname', 'id'],
+    'birthday': ['birthday', 'id'],
+    'created_at': ["coalesce(created_at, '')", 'id'],
+    'id': ['id']
+}
+APPOINTMENT_ORDER_COLUMNS = {
+    'date': ['a.appointment_date', "coalesce(a.appointment_time, '')", 'a.id'],
+    'created_at': ["coalesce(a.created_at, '')", 'a.id'],
+    'id': ['a.id']
+}
+PATIENT_FULL_NAME_SQL = (
+    "p.firstname || coalesce(' ' || nullif(p.middlename, ''), '') || ' ' || p.lastname "
+    "|| coalesce(' ' || nullif(p.suffix, ''), '')"
+)
+
+def _text_filter(expressions: List[str], term: str, conditions: List[str], params: List[Any]):
+    """Add a case-insensitive substring match of term against any of the expressions"""
+    conditions.append('(' + ' OR '.join(
+        f"instr(lower(coalesce({expression}, '')), ?) > 0" for expression in expressions
+    ) + ')')
+    params.extend([term] * len(expressions))
+
+# Totals of the paginated listings per count query, each kept until one of
+# the tables it reads changes (a new max id or a bump of its change counter)
+_page_totals = {}
+_page_totals_lock = threading.Lock()
+
+def _page_total(conn: sqlite3.Connection, tables: tuple, count: str, params: List[Any]) -> int:
+    """Run a COUNT query over tables, or return its result from before if they have not changed"""
+    counters = dict(conn.execute(
+        'SELECT name, seq FROM sqlite_sequence UNION ALL SELECT name, value FROM generations'
+    ).fetchall())
+    version = tuple((counters.get(table), counters.get(f'{table}_changed')) for table in tables)
+    cache_key = (count, tuple(params))
+    with _page_totals_lock:
+        cached = _page_totals.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    total = conn.execute(count, params).fetchone()[0]
+    with _page_totals_lock:
+        if len(_page_totals) >= database.MAX_CACHED_TOTALS:
+            _page_totals.clear()
+        _page_totals[cache_key] = (version, total)
+    return total
+
+def _keyset_page(conn: sqlite3.Connection, select: str, count: str, tables: tuple, conditions: List[str],
+                 params: List[Any], columns: List[str], key, after, descending, limit) -> Dict[str, Any]:
+    """Run a keyset-paginated query ordered by columns, resuming after a cursor"""
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if after:
+        after_key = database.decode_cursor(after, key({}))
+        page_conditions.append(
+            f"({', '.join(columns)}) {'<' if descending else '>'} ({', '.join('?' for _ in columns)})"
+        )
+        page_params.extend(after_key)
+    
+    where = f" WHERE {' AND '.join(page_conditions)}" if page_conditions else ''
+    direction = 'DESC' if descending else 'ASC'
+    sql = f"{select}{where} ORDER BY {', '.join(f'{column} {direction}' for column in columns)}"
+    if limit is not None:
+        sql += ' LIMIT ?'
+        page_params.append(limit + 1)
+    rows = conn.execute(sql, page_params).fetchall()
+    
+    has_more = limit is not None and len(rows) > limit
+    page = rows[:limit] if has_more else rows
+    total_where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return {
+        'rows': page,
+        'next_cursor': database.encode_cursor(key(dict(page[-1]))) if has_more and page else None,
+        'total': _page_total(conn, tables, f"{count}{total_where}", params)
+    }
+
+@_timed
+def get_patients_page(limit=None, after=None, q=None, order_by='name', descending=False):
+    """Get a page of active patients in a stable order, optionally filtered by a search term"""
+    if order_by not in PATIENT_ORDER_COLUMNS:
+        raise ValueError(f"Unknown sort order: {order_by}")
+    conditions = ["status = 'active'"]
+    params = []
+    term = (q or '').strip().lower()
+    if term:
+        _text_filter(database.PATIENT_SEARCH_FIELDS, term, conditions, params)
+    
+    page = _keyset_page(
+        get_connection(), 'SELECT * FROM patients', 'SELECT COUNT(*) FROM patients', ('patients',),
+        conditions, params,
+        PATIENT_ORDER_COLUMNS[order_by], database.PATIENT_ORDERS[order_by], after, descending, limit
+    )
+    return {
+        'data': [dict(row) for row in page['rows']],
+        'next_cursor': page['next_cursor'],
+        'total': page['total']
+    }
+
+@_timed
+def get_appointments_page(limit=None, after=None, q=None, order_by='date', descending=True,
+                          status=None, date_from=None, date_to=None):
+    """Get a page of appointments of active patients with patient names, newest first by default"""
+    if order_by not in APPOINTMENT_ORDER_COLUMNS:
+        raise ValueError(f"Unknown sort order: {order_by}")
+    conditions = ["p.status = 'active'"]
+    params = []
+    if status:
+        conditions.append('a.status = ?')
+        params.append(status)
+    if date_from:
+        conditions.append('a.appointment_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('a.appointment_date <= ?')
+        params.append(date_to)
+    term = (q or '').strip().lower()
+    if term:
+        expressions = [PATIENT_FULL_NAME_SQL] + [f'a.{field}' for field in database.APPOINTMENT_SEARCH_FIELDS]
+        _text_filter(expressions, term, conditions, params)
+    
+    joined = 'FROM appointments a JOIN patients p ON p.id = a.patient_id'
+    page = _keyset_page(
+        get_connection(), f"SELECT a.*, p.firstname, p.middlename, p.lastname, p.suffix {joined}",
+        f"SELECT COUNT(*) {joined}", ('patients', 'appointments'), conditions, params,
+        APPOINTMENT_ORDER_COLUMNS[order_by], database.APPOINTMENT_ORDERS[order_by], after, descending, limit
+    )
+    appointments = []
+    for row in page['rows']:
+        appointment = {column: row[column] for column in APPOINTMENT_COLUMNS}
+        appointment['patient_name'] = _patient_name(row)
+        appointments.append(appointment)
+    return {
+        'data': appointments,
+        'next_cursor': page['next_cursor'],
+        'total': page['total']
+    }
+
+def migrate_from_json(json_dir: str = database.DATA_DIR) -> Dict[str, int]:
+    """Copy patients, appointments and import history from the JSON files into SQLite.
+
+    Records keep their ids, so running the migration again updates rows in
+    place instead of duplicating them. Rows are upserted rather than
+    replaced: replacing a patient would delete it first and cascade to its
+    appointments, including ones that exist only in SQLite.
+    """
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        _add_import_progress_columns(conn)
+    
+    counts = {}
+    tables = (
+        ('patients', PATIENT_COLUMNS),
+        ('appointments', APPOINTMENT_COLUMNS),
+        ('imports', IMPORT_COLUMNS),
+    )
+    with conn:
+        for table, columns in tables:
+            # load_json_file also replays any journal next to the file
+            records = database.load_json_file(os.path.join(json_dir, f'{table}.json'), [], strict=True)
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT (id) DO UPDATE SET "
+                f"{', '.join(f'{column} = excluded.{column}' for column in columns[1:])}",
+                (tuple(record.get(column) for column in columns) for record in records)
+            )
+            counts[table] = len(records)
+    return counts
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Manage the SQLite patient database')
+    subcommands = parser.add_subparsers(dest='command')
+    subcommands.add_parser('init', help='create the schema')
+    migrate = subcommands.add_parser('migrate', help='copy the data/*.json records into SQLite')
+    migrate.add_argument('--json-dir', default=database.DATA_DIR, help='directory holding the JSON files')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    if args.command == 'migrate':
+        for table, count in migrate_from_json(args.json_dir).items():
+            print(f"Migrated {count} {table} records into {SQLITE_PATH}")
+    else:
+        init_database()
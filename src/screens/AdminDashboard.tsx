@@ -45,11 +45,25 @@ interface AdminDashboardProps {
   onLogout: () => void;
 }
 
+interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+  total: number;
+}
+
+// Rows fetched per request; the server filters and sorts, the dashboard only pages
+const PAGE_SIZE = 50;
+
+const emptyPage = <T,>(): Page<T> => ({ items: [], nextCursor: null, total: 0 });
+
 export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
-  const [patients, setPatients] = useState<Patient[]>([]);
-  const [appointments, setAppointments] = useState<Appointment[]>([]);
+  const [patients, setPatients] = useState<Page<Patient>>(emptyPage<Patient>());
+  const [appointments, setAppointments] = useState<Page<Appointment>>(emptyPage<Appointment>());
+  const [stats, setStats] = useState({ patients: 0, appointments: 0, upcoming: 0 });
+  const [patientAppointments, setPatientAppointments] = useState<Record<number, Appointment[]>>({});
   const [importHistory, setImportHistory] = useState<ImportRecord[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [activeTab, setActiveTab] = useState<'patients' | 'appointments' | 'import'>('patients');
   const [searchTerm, setSearchTerm] = useState('');
@@ -63,31 +77,86 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
     loadData();
   }, []);
 
+  // Search on the server, shortly after the clerk stops typing
+  useEffect(() => {
+    if (loading) return;
+    const timer = setTimeout(() => {
+      loadLists(searchTerm).catch(err => {
+        console.error('Error searching:', err);
+        setError('Failed to load data. Please try again.');
+      });
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const fetchPatientPage = async (query: string, after: string | null = null): Promise<Page<Patient>> => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (query) params.set('q', query);
+    if (after) params.set('after', after);
+    const response = await fetch(`/patients?${params}`);
+    const data = await response.json();
+    if (!data.success) {
+      throw new Error('Failed to load patients');
+    }
+    return { items: data.data, nextCursor: data.next_cursor, total: data.total };
+  };
+
+  const fetchAppointmentPage = async (query: string, after: string | null = null): Promise<Page<Appointment>> => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (query) params.set('q', query);
+    if (after) params.set('after', after);
+    const response = await fetch(`/admin/appointments?${params}`);
+    const data = await response.json();
+    if (!data.success) {
+      console.warn('Failed to load appointments:', data.message);
+      return emptyPage<Appointment>();
+    }
+    return { items: data.appointments, nextCursor: data.next_cursor, total: data.total };
+  };
+
+  const loadLists = async (query: string) => {
+    const [patientPage, appointmentPage] = await Promise.all([
+      fetchPatientPage(query),
+      fetchAppointmentPage(query)
+    ]);
+    setPatients(patientPage);
+    setAppointments(appointmentPage);
+  };
+
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      if (activeTab === 'patients' && patients.nextCursor) {
+        const page = await fetchPatientPage(searchTerm, patients.nextCursor);
+        setPatients(current => ({ ...page, items: [...current.items, ...page.items] }));
+      } else if (activeTab === 'appointments' && appointments.nextCursor) {
+        const page = await fetchAppointmentPage(searchTerm, appointments.nextCursor);
+        setAppointments(current => ({ ...page, items: [...current.items, ...page.items] }));
+      }
+    } catch (err) {
+      console.error('Error loading more:', err);
+      setError('Failed to load data. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadData = async () => {
     setLoading(true);
     setError(null);
+    setPatientAppointments({});
     
     try {
-      // Load patients
-      const patientsResponse = await fetch('/patients');
-      const patientsData = await patientsResponse.json();
-      
-      if (patientsData.success) {
-        setPatients(patientsData.data);
-      } else {
-        throw new Error('Failed to load patients');
-      }
-
-      // Load all appointments
-      const appointmentsResponse = await fetch('/admin/appointments');
-      const appointmentsData = await appointmentsResponse.json();
-      
-      if (appointmentsData.success) {
-        setAppointments(appointmentsData.appointments);
-      } else {
-        console.warn('Failed to load appointments:', appointmentsData.message);
-        setAppointments([]);
-      }
+      // Load the first page of patients and appointments
+      await loadLists(searchTerm);
+
+      // Totals for the stats cards, kept up to date by the server
+      const statsData = await fetch('/admin/stats').then(response => response.json());
+      setStats({
+        patients: statsData.success ? statsData.stats.patients.active : 0,
+        appointments: statsData.success ? statsData.stats.appointments.total : 0,
+        upcoming: statsData.success ? statsData.stats.appointments.upcoming : 0
+      });
 
       // Load import history
       const importResponse = await fetch('/import_history');
@@ -107,6 +176,25 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
     }
   };
 
+  const togglePatientDetails = async (patient: Patient) => {
+    if (selectedPatient?.id === patient.id) {
+      setSelectedPatient(null);
+      return;
+    }
+    setSelectedPatient(patient);
+    if (patientAppointments[patient.id]) return;
+
+    try {
+      const response = await fetch(`/appointments/${patient.id}`);
+      const data = await response.json();
+      if (data.success) {
+        setPatientAppointments(current => ({ ...current, [patient.id]: data.appointments }));
+      }
+    } catch (err) {
+      console.error('Error loading patient appointments:', err);
+    }
+  };
+
   const handleFileImport = async () => {
     if (!importFile) {
       alert('Please select a file to import');
@@ -164,24 +252,8 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
     });
   };
 
-  const filteredPatients = patients.filter(patient =>
-    patient.lastname.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    patient.firstname.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    patient.middlename?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    patient.address.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    patient.phone?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    patient.email?.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  const filteredAppointments = appointments.filter(appointment =>
-    appointment.patient_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    appointment.type.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    appointment.reason?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    appointment.doctor_name?.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   const getPatientAppointments = (patientId: number) => {
-    return appointments.filter(apt => apt.patient_id === patientId);
+    return patientAppointments[patientId] || [];
   };
 
   if (loading) {
@@ -246,7 +318,7 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
               </div>
               <div>
                 <p className="text-sm text-gray-600">Total Patients</p>
-                <p className="text-2xl font-bold text-gray-800">{patients.length}</p>
+                <p className="text-2xl font-bold text-gray-800">{stats.patients}</p>
               </div>
             </div>
           </div>
@@ -260,7 +332,7 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
               </div>
               <div>
                 <p className="text-sm text-gray-600">Total Appointments</p>
-                <p className="text-2xl font-bold text-gray-800">{appointments.length}</p>
+                <p className="text-2xl font-bold text-gray-800">{stats.appointments}</p>
               </div>
             </div>
           </div>
@@ -274,9 +346,7 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
               </div>
               <div>
                 <p className="text-sm text-gray-600">Upcoming Appointments</p>
-                <p className="text-2xl font-bold text-gray-800">
-                  {appointments.filter(apt => new Date(apt.appointment_date) > new Date()).length}
-                </p>
+                <p className="text-2xl font-bold text-gray-800">{stats.upcoming}</p>
               </div>
             </div>
           </div>
@@ -308,7 +378,7 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
                     : 'border-transparent text-gray-500 hover:text-gray-700 hover:border-gray-300'
                 }`}
               >
-                Patients ({patients.length})
+                Patients ({patients.total})
               </button>
               <button
                 onClick={() => setActiveTab('appointments')}
@@ -318,7 +388,7 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
                     : 'border-transparent text-gray-500 hover:text-gray-700 hover:border-gray-300'
                 }`}
               >
-                Appointments ({appointments.length})
+                Appointments ({appointments.total})
               </button>
               <button
                 onClick={() => setActiveTab('import')}
@@ -363,13 +433,13 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
           <div className="p-6">
             {activeTab === 'patients' && (
               <div className="space-y-4">
-                {filteredPatients.length === 0 ? (
+                {patients.items.length === 0 ? (
                   <div className="text-center py-8 text-gray-500">
                     <p className="text-lg">No patients found.</p>
                     {searchTerm && <p className="text-sm">Try adjusting your search terms.</p>}
                   </div>
                 ) : (
-                  filteredPatients.map(patient => (
+                  patients.items.map(patient => (
                     <div key={patient.id} className="border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow">
                       <div className="flex justify-between items-start">
                         <div className="flex-1">
@@ -398,13 +468,13 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
                               <p><span className="font-medium">Blood Type:</span> {patient.blood_type || 'N/A'}</p>
                               <p><span className="font-medium">Allergies:</span> {patient.allergies || 'None'}</p>
                               <p><span className="font-medium">Registered:</span> {formatDateTime(patient.created_at)}</p>
-                              <p><span className="font-medium">Appointments:</span> {getPatientAppointments(patient.id).length}</p>
+                              <p><span className="font-medium">Appointments:</span> {patientAppointments[patient.id] ? getPatientAppointments(patient.id).length : 'View details'}</p>
                             </div>
                           </div>
                         </div>
                         
                         <button
-                          onClick={() => setSelectedPatient(selectedPatient?.id === patient.id ? null : patient)}
+                          onClick={() => togglePatientDetails(patient)}
                           className="ml-4 text-[#05196a] hover:text-blue-800 font-medium text-sm"
                         >
                           {selectedPatient?.id === patient.id ? 'Hide Details' : 'View Details'}
@@ -464,18 +534,29 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
                     </div>
                   ))
                 )}
+                {patients.nextCursor && (
+                  <div className="text-center pt-2">
+                    <button
+                      onClick={loadMore}
+                      disabled={loadingMore}
+                      className="text-[#05196a] hover:text-blue-800 font-medium text-sm disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : `Load more (${patients.items.length} of ${patients.total})`}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
             {activeTab === 'appointments' && (
               <div className="space-y-4">
-                {filteredAppointments.length === 0 ? (
+                {appointments.items.length === 0 ? (
                   <div className="text-center py-8 text-gray-500">
                     <p className="text-lg">No appointments found.</p>
                     {searchTerm && <p className="text-sm">Try adjusting your search terms.</p>}
                   </div>
                 ) : (
-                  filteredAppointments.map(appointment => (
+                  appointments.items.map(appointment => (
                     <div key={appointment.id} className="border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow">
                       <div className="flex justify-between items-start">
                         <div className="flex-1">
@@ -516,6 +597,17 @@ export const AdminDashboard: React.FC<AdminDashboardProps> = ({ onLogout }) => {
                     </div>
                   ))
                 )}
+                {appointments.nextCursor && (
+                  <div className="text-center pt-2">
+                    <button
+                      onClick={loadMore}
+                      disabled={loadingMore}
+                      className="text-[#05196a] hover:text-blue-800 font-medium text-sm disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : `Load more (${appointments.items.length} of ${appointments.total})`}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -30,6 +30,8 @@ export const Desktop = (): JSX.Element => {
   const [selectedPatientForAppointment, setSelectedPatientForAppointment] = useState<any>(null);
   const [showAdminLogin, setShowAdminLogin] = useState(false);
   const [showAdminDashboard, setShowAdminDashboard] = useState(false);
+  const [suggestions, setSuggestions] = useState<Record<string, string[]>>({});
+  const suggestionRequests = useRef<Record<string, AbortController>>({});
 
   const days = Array.from({ length: 31 }, (_, i) => String(i + 1).padStart(2, '0'));
   const months = [
@@ -165,8 +167,34 @@ export const Desktop = (): JSX.Element => {
     }
   };
 
+  // Live name suggestions; a newer keystroke cancels the previous request
+  const loadSuggestions = async (field: string, prefix: string) => {
+    suggestionRequests.current[field]?.abort();
+    if (!prefix.trim()) {
+      setSuggestions(current => ({ ...current, [field]: [] }));
+      return;
+    }
+    const controller = new AbortController();
+    suggestionRequests.current[field] = controller;
+    try {
+      const params = new URLSearchParams({ field, prefix, limit: '8' });
+      const response = await fetch(`/autocomplete?${params}`, { signal: controller.signal });
+      const data = await response.json();
+      if (data.success) {
+        setSuggestions(current => ({ ...current, [field]: data.suggestions.map((s: { name: string }) => s.name) }));
+      }
+    } catch (error) {
+      if ((error as Error).name !== 'AbortError') {
+        console.error('Autocomplete error:', error);
+      }
+    }
+  };
+
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     setFormData({ ...formData, [e.target.id]: e.target.value });
+    if (e.target.id === 'lastname' || e.target.id === 'firstname') {
+      loadSuggestions(e.target.id, e.target.value);
+    }
   };
 
   const handleTryAgain = () => {
@@ -368,9 +396,18 @@ export const Desktop = (): JSX.Element => {
                 id={field.id}
                 value={formData[field.id as keyof typeof formData]}
                 onChange={handleInputChange}
+                list={suggestions[field.id] ? `${field.id}-suggestions` : undefined}
+                autoComplete="off"
                 className="w-[350px] h-[40px] text-[18px] bg-white/95 backdrop-blur-sm rounded-[16px] shadow-[0px_2px_2px_#00000040] px-4 placeholder:text-[#838383] placeholder:text-[18px]"
                 placeholder={field.placeholder}
               />
+              {suggestions[field.id] && (
+                <datalist id={`${field.id}-suggestions`}>
+                  {suggestions[field.id].map(name => (
+                    <option key={name} value={name} />
+                  ))}
+                </datalist>
+              )}
             </div>
           ))}
           <div className="flex gap-2 w-[350px] mb-2">
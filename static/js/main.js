@@ -69,6 +69,16 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Escape text from the server before it is put into results HTML
+    function escapeHtml(value) {
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
     // Function to display search results
     function displayResults(data) {
         let html = '<div class="search-results">';
@@ -100,6 +110,18 @@ document.addEventListener('DOMContentLoaded', function() {
             html += '<div class="result-item">';
             html += '<p>No patients match your search criteria. Please try different search terms.</p>';
             html += '</div>';
+            
+            // Close spellings of the name, to avoid registering a duplicate patient
+            if (data.similar_patients && data.similar_patients.length > 0) {
+                html += '<h3>Similar Patients</h3>';
+                data.similar_patients.forEach(function(patient) {
+                    html += '<div class="result-item">';
+                    html += '<p><strong>' + escapeHtml([patient.firstname, patient.middlename, patient.lastname, patient.suffix].filter(Boolean).join(' ')) + '</strong></p>';
+                    html += '<p><strong>Birthday:</strong> ' + escapeHtml(patient.birthday || 'N/A') + '</p>';
+                    html += '<p><strong>Patient ID:</strong> ' + escapeHtml(patient.id || 'N/A') + '</p>';
+                    html += '</div>';
+                });
+            }
         }
         
         html += '<div class="search-info">';
@@ -116,6 +138,51 @@ document.addEventListener('DOMContentLoaded', function() {
         resultsContent.innerHTML = html;
     }
 
+    // Live name suggestions while typing; a newer keystroke cancels the previous request
+    ['lastname', 'firstname'].forEach(function(field) {
+        const input = document.getElementById(field);
+        if (!input) {
+            return;
+        }
+        const datalist = document.createElement('datalist');
+        datalist.id = field + '-suggestions';
+        input.parentNode.appendChild(datalist);
+        input.setAttribute('list', datalist.id);
+        input.setAttribute('autocomplete', 'off');
+        
+        let pending = null;
+        input.addEventListener('input', function() {
+            if (pending) {
+                pending.abort();
+            }
+            const prefix = input.value.trim();
+            if (!prefix) {
+                datalist.innerHTML = '';
+                return;
+            }
+            pending = new AbortController();
+            const params = new URLSearchParams({ field: field, prefix: prefix, limit: '8' });
+            fetch('/autocomplete?' + params, { signal: pending.signal })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        return;
+                    }
+                    datalist.innerHTML = '';
+                    data.suggestions.forEach(function(suggestion) {
+                        const option = document.createElement('option');
+                        option.value = suggestion.name;
+                        datalist.appendChild(option);
+                    });
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Autocomplete error:', error);
+                    }
+                });
+        });
+    });
+
     // Add some interactive effects to form inputs
     const formInputs = document.querySelectorAll('.form-input');
     formInputs.forEach(input => {
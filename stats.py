@@ -0,0 +1,113 @@
+"""Counters behind the admin dashboard's statistics.
+
+Both storage backends keep these counts next to their other indexes and
+add each new record as it is written, so the statistics are read without
+looking at the records themselves.
+
+Appointments are also counted per day. Splitting them into past, today and
+upcoming is done against a boundary day with a running total on each side;
+when the date moves on, the days in between are moved across the
+boundary one bucket at a time, so each day is moved at most once.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+UNASSIGNED = '(unassigned)'
+
+
+def new_patient_counts() -> Dict[str, Any]:
+    return {'total': 0, 'by_status': Counter(), 'new': 0}
+
+
+def add_patient(counts: Dict[str, Any], patient: Dict):
+    counts['total'] += 1
+    counts['by_status'][patient.get('status') or 'unknown'] += 1
+    if patient.get('is_new'):
+        counts['new'] += 1
+
+
+def build_patient_counts(patients) -> Dict[str, Any]:
+    counts = new_patient_counts()
+    for patient in patients:
+        add_patient(counts, patient)
+    return counts
+
+
+def patient_summary(counts: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'total': counts['total'],
+        'active': counts['by_status']['active'],
+        'new': counts['new'],
+        'by_status': dict(counts['by_status'])
+    }
+
+
+def new_appointment_counts(today: Optional[date] = None) -> Dict[str, Any]:
+    return {
+        'total': 0,
+        'by_type': Counter(),
+        'by_doctor': Counter(),
+        'by_status': Counter(),
+        'by_day': Counter(),
+        # Appointments on or before the boundary day, and after it
+        'boundary': (today or date.today()).isoformat(),
+        'through_boundary': 0,
+        'after_boundary': 0
+    }
+
+
+def add_appointment(counts: Dict[str, Any], appointment: Dict):
+    day = appointment.get('appointment_date') or ''
+    counts['total'] += 1
+    counts['by_type'][appointment.get('type') or 'unknown'] += 1
+    counts['by_doctor'][(appointment.get('doctor_name') or '').strip() or UNASSIGNED] += 1
+    counts['by_status'][appointment.get('status') or 'unknown'] += 1
+    counts['by_day'][day] += 1
+    if day > counts['boundary']:
+        counts['after_boundary'] += 1
+    else:
+        counts['through_boundary'] += 1
+
+
+def build_appointment_counts(appointments, today: Optional[date] = None) -> Dict[str, Any]:
+    counts = new_appointment_counts(today)
+    for appointment in appointments:
+        add_appointment(counts, appointment)
+    return counts
+
+
+def _advance(counts: Dict[str, Any], today: date):
+    """Move the boundary forward to today, one day's bucket at a time"""
+    boundary = date.fromisoformat(counts['boundary'])
+    while boundary < today:
+        boundary += timedelta(days=1)
+        moved = counts['by_day'].get(boundary.isoformat(), 0)
+        counts['after_boundary'] -= moved
+        counts['through_boundary'] += moved
+    counts['boundary'] = boundary.isoformat()
+
+
+def appointment_summary(counts: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """Totals, past/today/upcoming counts and breakdowns; advances the boundary to today"""
+    today = today or date.today()
+    if today.isoformat() > counts['boundary']:
+        _advance(counts, today)
+    on_day = counts['by_day'].get(today.isoformat(), 0) if today.isoformat() == counts['boundary'] else None
+    if on_day is None:
+        # The clock went back; count the days in between directly
+        after = sum(n for day, n in counts['by_day'].items() if day > today.isoformat())
+        on_day = counts['by_day'].get(today.isoformat(), 0)
+        past = counts['total'] - after - on_day
+    else:
+        after = counts['after_boundary']
+        past = counts['through_boundary'] - on_day
+    return {
+        'total': counts['total'],
+        'past': past,
+        'today': on_day,
+        'upcoming': after,
+        'by_type': dict(counts['by_type']),
+        'by_doctor': dict(counts['by_doctor']),
+        'by_status': dict(counts['by_status'])
+    }
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import sqlite_database
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run a test against empty data files in a temporary directory.
+
+    The data paths are relative to the working directory, so moving into
+    tmp_path is enough; the in-process caches are emptied around the test.
+    """
+    monkeypatch.chdir(tmp_path)
+    database._cache.clear()
+    yield tmp_path
+    database._cache.clear()
+    conn = getattr(sqlite_database._local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        del sqlite_database._local.conn
@@ -0,0 +1,73 @@
+import database
+from records import PatientRecord
+
+
+def add(lastname):
+    result = database.add_patient(lastname=lastname, firstname='Ana', middlename='M',
+                                  birthday='1990-01-01', address='Imus, Cavite')
+    assert result['success']
+    return result['patient_id']
+
+
+def search(lastname):
+    return database.search_patients(lastname=lastname, firstname='Ana', middlename='M')
+
+
+def test_record_added_while_an_index_builds_is_in_it(data_dir, monkeypatch):
+    database.ensure_data_directory()
+    add('Santos')
+    build = database._build_patient_name_index
+    added = []
+    
+    def slow_build(patients):
+        # Another request registers a patient after the build has read the list
+        seen = list(patients)
+        if not added:
+            added.append(add('Racer'))
+        return build(seen)
+    
+    monkeypatch.setattr(database, '_build_patient_name_index', slow_build)
+    search('Santos')
+    
+    assert [patient['id'] for patient in search('Racer')] == added
+    database._cache.clear()
+    assert [patient['id'] for patient in search('Racer')] == added
+
+
+def test_index_built_between_an_append_and_its_write_has_the_record_once(data_dir):
+    database.ensure_data_directory()
+    add('Santos')
+    
+    with database.locked_data_file(database.PATIENTS_FILE):
+        patients = database.load_json_file(database.PATIENTS_FILE, [], strict=True)
+        new_patient = PatientRecord(id=2, lastname='Reyes', firstname='Ana', middlename='M',
+                                    birthday='1990-01-01', status='active')
+        patients.append(new_patient)
+        # A reader builds the index after the list grew but before the write
+        assert database.get_patients_page(limit=10)['total'] == 1
+        assert database.append_json_records(database.PATIENTS_FILE, patients, [new_patient])
+    
+    page = database.get_patients_page(limit=10)
+    assert [patient['id'] for patient in page['data']] == [2, 1]
+    assert page['total'] == 2
+
+
+def test_index_dropped_by_a_rewrite_during_its_build_is_rebuilt(data_dir, monkeypatch):
+    database.ensure_data_directory()
+    patient_id = add('Santos')
+    build = database._build_patient_by_id
+    
+    def build_during_rewrite(patients):
+        seen = list(patients)
+        if not rewritten:
+            rewritten.append(True)
+            # An edit rewrites the file and drops its indexes
+            current = database.load_json_file(database.PATIENTS_FILE, [], strict=True)
+            current[0] = PatientRecord(dict(current[0], lastname='Santos-Reyes'))
+            assert database.save_json_file(database.PATIENTS_FILE, current)
+        return build(seen)
+    
+    rewritten = []
+    monkeypatch.setattr(database, '_build_patient_by_id', build_during_rewrite)
+    
+    assert database.get_patient_by_id(patient_id)['lastname'] == 'Santos-Reyes'
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def journal_mode(data_dir, monkeypatch):
+    monkeypatch.setattr(database, 'STORAGE_MODE', 'journal')
+    database.ensure_data_directory()
+    assert database.save_json_file(database.PATIENTS_FILE, [{'id': 1, 'lastname': 'Santos'}])
+    return database._journal_path(database.PATIENTS_FILE)
+
+
+def reload_ids():
+    """Ids of the patients as a fresh process would load them"""
+    database._cache.clear()
+    return [record['id'] for record in database.load_json_file(database.PATIENTS_FILE, [], strict=True)]
+
+
+def write_journal(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def line(record):
+    return json.dumps(record) + '\n'
+
+
+def test_appended_records_are_replayed(journal_mode):
+    patients = database.load_json_file(database.PATIENTS_FILE, [], strict=True)
+    new = [{'id': 2, 'lastname': 'Reyes'}, {'id': 3, 'lastname': 'Cruz'}]
+    patients.extend(new)
+    assert database.append_json_records(database.PATIENTS_FILE, patients, new)
+    
+    assert os.path.exists(journal_mode)
+    assert reload_ids() == [1, 2, 3]
+
+
+def test_truncated_last_line_is_ignored(journal_mode):
+    write_journal(journal_mode, line({'id': 2}) + '{"id": 3, "lastna')
+    
+    assert reload_ids() == [1, 2]
+
+
+def test_torn_line_terminated_by_later_append_is_skipped(journal_mode):
+    write_journal(journal_mode, line({'id': 2}) + '{"id": 3, "lastna\n' + line({'id': 4}))
+    
+    assert reload_ids() == [1, 2, 4]
+
+
+def test_append_after_torn_write_starts_a_new_line(journal_mode):
+    write_journal(journal_mode, line({'id': 2}) + '{"id": 3, "lastna')
+    patients = database.load_json_file(database.PATIENTS_FILE, [], strict=True)
+    new = [{'id': 3, 'lastname': 'Cruz'}]
+    patients.extend(new)
+    assert database.append_json_records(database.PATIENTS_FILE, patients, new)
+    
+    assert reload_ids() == [1, 2, 3]
+
+
+def test_records_already_in_the_snapshot_are_not_replayed(journal_mode):
+    # A compaction that saved the snapshot but did not get to remove the journal
+    write_journal(journal_mode, line({'id': 1}) + line({'id': 2}))
+    assert database.save_json_file(database.PATIENTS_FILE, [{'id': 1}, {'id': 2}])
+    write_journal(journal_mode, line({'id': 1}) + line({'id': 2}) + line({'id': 3}))
+    
+    assert reload_ids() == [1, 2, 3]
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(journal_mode):
+    write_journal(journal_mode, line({'id': 2}) + '{"id": 3')
+    
+    assert database.compact_journal(database.PATIENTS_FILE)
+    assert not os.path.exists(journal_mode)
+    assert reload_ids() == [1, 2]
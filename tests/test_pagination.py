@@ -0,0 +1,89 @@
+import pytest
+
+import database
+import sqlite_database
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def backend(request, data_dir):
+    module = database if request.param == 'json' else sqlite_database
+    module.init_database() if module is sqlite_database else database.ensure_data_directory()
+    return module
+
+
+def add(backend, lastname, firstname='Ana'):
+    result = backend.add_patient(lastname=lastname, firstname=firstname, middlename='M',
+                                 birthday='1990-01-01', address='Imus, Cavite')
+    assert result['success']
+    return result['patient_id']
+
+
+def walk(backend, between_pages=None, **kwargs):
+    """Ids of every page in order, calling between_pages(page number) after each page but the last"""
+    ids = []
+    page = backend.get_patients_page(limit=3, **kwargs)
+    pages = 1
+    while True:
+        ids.extend(patient['id'] for patient in page['data'])
+        if not page['next_cursor']:
+            return ids, page['total']
+        if between_pages:
+            between_pages(pages)
+        page = backend.get_patients_page(limit=3, after=page['next_cursor'], **kwargs)
+        pages += 1
+
+
+def test_cursor_round_trip():
+    key = ('Dela Cruz', 'Juan', 42)
+    assert database.decode_cursor(database.encode_cursor(key)) == key
+
+
+def test_pages_cover_every_patient_once(backend):
+    ids = [add(backend, name) for name in ['Reyes', 'Bautista', 'Santos', 'Cruz', 'Ocampo', 'Garcia', 'Lim']]
+    
+    seen, total = walk(backend)
+    assert sorted(seen) == sorted(ids)
+    assert total == len(ids)
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_inserts_between_pages_do_not_repeat_or_skip_records(backend, descending):
+    ids = [add(backend, name) for name in ['Bautista', 'Cruz', 'Garcia', 'Lim', 'Ocampo', 'Reyes', 'Santos']]
+    added = {}
+    
+    def insert(page_number):
+        if page_number == 1:
+            # One before the pages already seen, one in what is still to come
+            added['before'] = add(backend, 'Aquino' if not descending else 'Villanueva')
+            added['after'] = add(backend, 'Mendoza')
+    
+    seen, total = walk(backend, insert, descending=descending)
+    assert len(seen) == len(set(seen))
+    assert set(ids) <= set(seen)
+    assert added['after'] in seen
+    assert added['before'] not in seen
+    assert total == len(ids) + 2
+
+
+def test_filtered_total_follows_inserts(backend):
+    for name in ['Santos', 'Santiago', 'Reyes']:
+        add(backend, name)
+    assert backend.get_patients_page(limit=1, q='sant')['total'] == 2
+    
+    add(backend, 'Santos', 'Maria')
+    assert backend.get_patients_page(limit=1, q='sant')['total'] == 3
+    assert backend.get_patients_page(limit=1)['total'] == 4
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    database.encode_cursor(('Santos',)),
+    database.encode_cursor((1, 2, 3)),
+    'eyJpZCI6IDF9',  # a JSON object, not a key
+])
+def test_bad_cursors_are_rejected(backend, cursor):
+    for name in ['Reyes', 'Santos']:
+        add(backend, name)
+    
+    with pytest.raises(ValueError):
+        backend.get_patients_page(limit=1, after=cursor)
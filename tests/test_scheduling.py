@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import pytest
+
+import database
+import scheduling
+import sqlite_database
+
+MONDAY = '2030-01-07'
+SUNDAY = '2030-01-06'
+
+
+def booked(*appointments):
+    """A schedule index of Dr. Santos's appointments, given as (time, type[, status])"""
+    return scheduling.build_index([
+        {'id': number, 'doctor_name': 'Dr. Santos', 'appointment_date': MONDAY, 'appointment_time': time,
+         'type': appointment_type, 'status': status[0] if status else 'scheduled'}
+        for number, (time, appointment_type, *status) in enumerate(appointments, 1)
+    ])
+
+
+def test_every_seeded_appointment_type_has_a_duration(data_dir):
+    database.init_database()
+    types = {appointment['type'] for appointment in database.load_json_file(database.APPOINTMENTS_FILE, [])}
+    
+    assert types
+    assert types <= set(scheduling.APPOINTMENT_DURATIONS)
+
+
+@pytest.mark.parametrize('time, appointment_type', [
+    ('08:30', 'Consultation'),  # ends as the booking starts
+    ('09:30', 'Consultation'),  # starts as the booking ends
+    ('08:00', 'Imaging'),      # an hour ending at 09:00
+])
+def test_touching_intervals_do_not_conflict(time, appointment_type):
+    index = booked(('09:00', 'Consultation'))
+    
+    assert scheduling.find_conflict(index, 'Dr. Santos', MONDAY, time, appointment_type) is None
+
+
+@pytest.mark.parametrize('time, appointment_type', [
+    ('09:00', 'Consultation'),
+    ('08:31', 'Consultation'),
+    ('09:29', 'Consultation'),
+    ('08:30', 'Imaging'),  # covers the whole booking
+])
+def test_overlapping_intervals_conflict(time, appointment_type):
+    index = booked(('09:00', 'Consultation'))
+    
+    conflict = scheduling.find_conflict(index, 'Dr. Santos', MONDAY, time, appointment_type)
+    assert conflict == {'appointment_id': 1, 'doctor_name': 'Dr. Santos', 'appointment_date': MONDAY,
+                        'start': '09:00', 'end': '09:30'}
+
+
+def test_booking_inside_a_longer_one_conflicts():
+    index = booked(('08:00', 'Consultation'), ('09:00', 'Surgery'))
+    
+    conflict = scheduling.find_conflict(index, 'Dr. Santos', MONDAY, '10:30', 'Consultation')
+    assert (conflict['start'], conflict['end']) == ('09:00', '11:00')
+
+
+def test_conflicts_match_doctor_names_loosely_and_only_on_the_same_day():
+    index = booked(('09:00', 'Consultation'))
+    
+    assert scheduling.find_conflict(index, '  dr. SANTOS ', MONDAY, '09:00', 'Consultation')
+    assert scheduling.find_conflict(index, 'Dr. Reyes', MONDAY, '09:00', 'Consultation') is None
+    assert scheduling.find_conflict(index, 'Dr. Santos', '2030-01-08', '09:00', 'Consultation') is None
+    assert scheduling.find_conflict(index, '', MONDAY, '09:00', 'Consultation') is None
+
+
+def test_cancelled_appointments_do_not_block():
+    index = booked(('09:00', 'Consultation', 'cancelled'))
+    
+    assert scheduling.find_conflict(index, 'Dr. Santos', MONDAY, '09:00', 'Consultation') is None
+
+
+def slots(index, appointment_type='Consultation', dates=(MONDAY,), now=datetime(2030, 1, 1, 12, 0)):
+    doctors = scheduling.candidate_doctors(index, 'Dr. Santos')
+    return scheduling.free_slots(index, list(dates), doctors, appointment_type, now)
+
+
+def grid(start, end, step=30):
+    return [scheduling.format_time(minutes)
+            for minutes in range(scheduling.parse_time(start), scheduling.parse_time(end) + 1, step)]
+
+
+def test_free_slots_leave_out_booked_time():
+    index = booked(('09:00', 'Consultation'), ('13:00', 'Imaging'))
+    
+    assert slots(index) == [{'doctor_name': 'Dr. Santos', 'date': MONDAY,
+                             'slots': grid('08:00', '08:30') + grid('09:30', '12:30') + grid('14:00', '16:30')}]
+
+
+def test_longer_appointments_need_the_whole_interval_free():
+    index = booked(('09:00', 'Consultation'))
+    
+    # An hour from 08:30 would run into 09:00, and the last one must end by 17:00
+    assert slots(index, 'Imaging')[0]['slots'] == ['08:00'] + grid('09:30', '16:00')
+
+
+def test_free_slots_skip_the_past_and_days_off():
+    index = booked()
+    
+    assert slots(index, dates=(SUNDAY, MONDAY), now=datetime(2030, 1, 7, 15, 10)) == [
+        {'doctor_name': 'Dr. Santos', 'date': MONDAY, 'slots': ['15:30', '16:00', '16:30']}
+    ]
+    assert slots(index, now=datetime(2030, 1, 8, 8, 0)) == []
+
+
+def test_date_range_limits():
+    assert scheduling.date_range(SUNDAY, MONDAY) == [SUNDAY, MONDAY]
+    with pytest.raises(ValueError):
+        scheduling.date_range(MONDAY, SUNDAY)
+    with pytest.raises(ValueError):
+        scheduling.date_range('2030-01-01', '2030-12-31')
+    with pytest.raises(ValueError):
+        scheduling.date_range('07/01/2030')
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def backend(request, data_dir):
+    module = database if request.param == 'json' else sqlite_database
+    module.init_database() if module is sqlite_database else database.ensure_data_directory()
+    patient = module.add_patient(lastname='Reyes', firstname='Ana', middlename='M',
+                                 birthday='1990-01-01', address='Imus, Cavite')
+    return module, patient['patient_id']
+
+
+def test_backends_refuse_double_bookings(backend):
+    module, patient_id = backend
+    assert module.create_appointment(patient_id, MONDAY, '09:00', 'Imaging', '', 'Dr. Santos')['success']
+    
+    refused = module.create_appointment(patient_id, MONDAY, '09:30', 'Consultation', '', 'dr. santos')
+    assert not refused['success']
+    assert (refused['conflict']['start'], refused['conflict']['end']) == ('09:00', '10:00')
+    assert module.create_appointment(patient_id, MONDAY, '10:00', 'Consultation', '', 'Dr. Santos')['success']
+    
+    results = module.create_appointments([
+        {'patient_id': patient_id, 'appointment_date': MONDAY, 'appointment_time': '11:00',
+         'type': 'Consultation', 'reason': '', 'doctor_name': 'Dr. Santos'},
+        {'patient_id': patient_id, 'appointment_date': MONDAY, 'appointment_time': '11:15',
+         'type': 'Consultation', 'reason': '', 'doctor_name': 'Dr. Santos'},
+    ])['results']
+    assert [result['success'] for result in results] == [True, False]